@@ -1,9 +1,10 @@
 from pymycobot import MechArm270
 import cv2
-import numpy as np
 import time
 import threading
 from flask import Flask, Response, render_template_string
+from server import vision
+from server.trajectory import MAX_VELOCITY, plan, stream
 
 app = Flask(__name__)
 
@@ -12,6 +13,8 @@ camera = None
 mc = None
 status_message = "准备就绪"
 task_running = False
+SETTLE_TOL = 2.0      # 到位判定误差（度）
+SETTLE_TIMEOUT = 1.5  # 轨迹发完后最长等待到位时间（秒）
 
 # ... [HTML 代码保持不变，这里省略] ...
 HTML = '''
@@ -109,6 +112,7 @@ class BoxTapper:
         status_message = "⚙️ 初始化机械臂..."
         
         mc = MechArm270('/dev/ttyAMA0', 1000000)
+        mc.set_fresh_mode(1)  # 跟踪最新目标，轨迹逐点发送
         
         print("初始化摄像头...")
         camera = cv2.VideoCapture(0)
@@ -129,57 +133,44 @@ class BoxTapper:
             print("❌ 摄像头无法读取帧")
         
         self.home_position = [0, -45, 45, 0, 90, 0]
+        angles = mc.get_angles()
+        self.pose = angles if isinstance(angles, list) and len(angles) == 6 else list(self.home_position)
         
         status_message = "🏠 移动到初始位置..."
         print(status_message)
-        mc.send_angles(self.home_position, 30)
-        time.sleep(3)
+        self.move_to(self.home_position, 30)
         
         status_message = "✅ 就绪 - 点击开始任务按钮"
         print("✅ 初始化完成")
         
-    def detect_red_box(self, frame):
-        """检测红色盒子"""
-        try:
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            
-            lower_red1 = np.array([0, 100, 100])
-            upper_red1 = np.array([10, 255, 255])
-            lower_red2 = np.array([160, 100, 100])
-            upper_red2 = np.array([180, 255, 255])
-            
-            mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-            mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-            mask = mask1 + mask2
-            
-            kernel = np.ones((5,5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest_contour)
-                
-                if area > 2000:
-                    M = cv2.moments(largest_contour)
-                    if M["m00"] > 0:
-                        cx = int(M["m10"] / M["m00"])
-                        cy = int(M["m01"] / M["m00"])
-                        
-                        cv2.drawContours(frame, [largest_contour], -1, (0, 255, 0), 3)
-                        cv2.circle(frame, (cx, cy), 8, (0, 0, 255), -1)
-                        cv2.putText(frame, f"RED BOX", (cx-60, cy-25),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                        cv2.putText(frame, f"({cx},{cy})", (cx-40, cy+25),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                        
-                        return (cx, cy), area, frame
-        except Exception as e:
-            print(f"检测错误: {e}")
-        
-        return None, None, frame
+    def move_to(self, target, speed=30):
+        """按轨迹平滑移动到目标姿态，实际到位后返回（不再靠 sleep 估时）"""
+        scale = min(1.0, speed / 30.0)
+        traj = plan([self.pose, target], max_velocity=MAX_VELOCITY * scale)
+        stream(traj, lambda q: mc.send_angles(q, 100))
+        self.pose = list(target)
+        self.wait_settled(target)
+
+    def wait_settled(self, target):
+        """最后一个采样发出时舵机还在追赶，轮询实际角度直到到位（或超时），之后的相机读数才对应目标姿态"""
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        while time.monotonic() < deadline:
+            angles = mc.get_angles()
+            if isinstance(angles, list) and len(angles) == 6 and \
+                    max(abs(a - t) for a, t in zip(angles, target)) <= SETTLE_TOL:
+                return
+            time.sleep(0.05)
+
+    def detect_red_box(self, frame, tracker=None):
+        """检测红色盒子（server.vision 共享检测），并在画面上标注
+
+        连续视频帧传入 tracker（vision.red_box_tracker()），只在上次位置附近搜索
+        """
+        box = vision.detect_red_box(frame, tracker)
+        if box is None:
+            return None, None, frame
+        vision.draw_detections(frame, [box])
+        return box.center, box.area, frame
     
     def scan_for_box(self):
         """扫描寻找红色盒子"""
@@ -195,8 +186,7 @@ class BoxTapper:
             print(status_message)
             
             scan_position = [angle, -45, 45, 0, 90, 0]
-            mc.send_angles(scan_position, 30)
-            time.sleep(2)
+            self.move_to(scan_position, 30)
             
             for _ in range(3):
                 ret, frame = camera.read()
@@ -226,31 +216,26 @@ class BoxTapper:
         status_message = "🎯 对准盒子..."
         print(status_message)
         align_position = [adjusted_angle, -45, 45, 0, 90, 0]
-        mc.send_angles(align_position, 20)
-        time.sleep(2)
+        self.move_to(align_position, 20)
         
         status_message = "➡️ 伸出手臂..."
         print(status_message)
         reach_position = [adjusted_angle, -30, 30, 0, 60, 0]
-        mc.send_angles(reach_position, 20)
-        time.sleep(2)
+        self.move_to(reach_position, 20)
         
         status_message = "⬇️ 下降接近..."
         print(status_message)
         down_position = [adjusted_angle, -20, 20, 0, 40, 0]
-        mc.send_angles(down_position, 15)
-        time.sleep(2)
+        self.move_to(down_position, 15)
         
         status_message = "👆 轻点盒子！"
         print(status_message)
         tap_position = [adjusted_angle, -15, 15, 0, 30, 0]
-        mc.send_angles(tap_position, 10)
-        time.sleep(1.5)
+        self.move_to(tap_position, 10)
         
         status_message = "⬆️ 收回手臂..."
         print(status_message)
-        mc.send_angles(self.home_position, 30)
-        time.sleep(3)
+        self.move_to(self.home_position, 30)
     
     def run(self):
         """执行完整任务"""
@@ -274,8 +259,7 @@ class BoxTapper:
                 print("\n" + status_message)
             
             print("返回初始位置...")
-            mc.send_angles(self.home_position, 30)
-            time.sleep(2)
+            self.move_to(self.home_position, 30)
             
         except Exception as e:
             status_message = f"❌ 错误: {str(e)}"
@@ -314,6 +298,7 @@ def generate_frames():
     global camera
     
     print("视频流线程启动")
+    tracker = vision.red_box_tracker()
     
     while True:
         try:
@@ -330,7 +315,7 @@ def generate_frames():
                 continue
             
             # 检测并标注
-            _, _, annotated_frame = bot.detect_red_box(frame)
+            _, _, annotated_frame = bot.detect_red_box(frame, tracker)
             
             # 添加状态文字
             status_text = status_message[:60] if status_message else "运行中"
@@ -1,9 +1,10 @@
 from pymycobot import MechArm270
 import cv2
-import numpy as np
 import time
 import threading
 from flask import Flask, Response, render_template_string
+from server import vision
+from server.trajectory import MAX_VELOCITY, plan, stream
 
 app = Flask(__name__)
 
@@ -12,6 +13,8 @@ camera = None
 mc = None
 status_message = "准备就绪"
 task_running = False
+SETTLE_TOL = 2.0      # 到位判定误差（度）
+SETTLE_TIMEOUT = 1.5  # 轨迹发完后最长等待到位时间（秒）
 
 HTML = '''
 <!DOCTYPE html>
@@ -100,6 +103,7 @@ class BoxTapper:
         status_message = "⚙️ 初始化中..."
         print("初始化机械臂...")
         mc = MechArm270('/dev/ttyAMA0', 1000000)
+        mc.set_fresh_mode(1)  # 跟踪最新目标，轨迹逐点发送
         
         print("初始化摄像头...")
         camera = cv2.VideoCapture(0)
@@ -107,52 +111,43 @@ class BoxTapper:
         camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         
         self.home_position = [0, -45, 45, 0, 90, 0]
+        angles = mc.get_angles()
+        self.pose = angles if isinstance(angles, list) and len(angles) == 6 else list(self.home_position)
         
         status_message = "🏠 移动到初始位置..."
-        mc.send_angles(self.home_position, 30)
-        time.sleep(3)
+        self.move_to(self.home_position, 30)
         
         status_message = "✅ 就绪 - 点击开始任务"
         print("✅ 初始化完成")
         
-    def detect_red_box(self, frame):
-        """检测红色盒子"""
-        try:
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            
-            lower_red1 = np.array([0, 100, 100])
-            upper_red1 = np.array([10, 255, 255])
-            lower_red2 = np.array([160, 100, 100])
-            upper_red2 = np.array([180, 255, 255])
-            
-            mask = cv2.inRange(hsv, lower_red1, upper_red1) + cv2.inRange(hsv, lower_red2, upper_red2)
-            
-            kernel = np.ones((5,5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            if contours:
-                largest = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest)
-                
-                if area > 2000:
-                    M = cv2.moments(largest)
-                    if M["m00"] > 0:
-                        cx = int(M["m10"] / M["m00"])
-                        cy = int(M["m01"] / M["m00"])
-                        
-                        cv2.drawContours(frame, [largest], -1, (0, 255, 0), 3)
-                        cv2.circle(frame, (cx, cy), 8, (0, 0, 255), -1)
-                        cv2.putText(frame, f"RED BOX ({cx},{cy})", (cx-80, cy-25),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        return (cx, cy), area
-        except:
-            pass
-        
-        return None, None
+    def move_to(self, target, speed=30):
+        """按轨迹平滑移动到目标姿态，实际到位后返回（不再靠 sleep 估时）"""
+        scale = min(1.0, speed / 30.0)
+        traj = plan([self.pose, target], max_velocity=MAX_VELOCITY * scale)
+        stream(traj, lambda q: mc.send_angles(q, 100))
+        self.pose = list(target)
+        self.wait_settled(target)
+
+    def wait_settled(self, target):
+        """最后一个采样发出时舵机还在追赶，轮询实际角度直到到位（或超时），之后的相机读数才对应目标姿态"""
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        while time.monotonic() < deadline:
+            angles = mc.get_angles()
+            if isinstance(angles, list) and len(angles) == 6 and \
+                    max(abs(a - t) for a, t in zip(angles, target)) <= SETTLE_TOL:
+                return
+            time.sleep(0.05)
+
+    def detect_red_box(self, frame, tracker=None):
+        """检测红色盒子（server.vision 共享检测），并在画面上标注
+
+        连续视频帧传入 tracker（vision.red_box_tracker()），只在上次位置附近搜索
+        """
+        box = vision.detect_red_box(frame, tracker)
+        if box is None:
+            return None, None
+        vision.draw_detections(frame, [box])
+        return box.center, box.area
     
     def scan_for_box(self):
         """扫描寻找红色盒子"""
@@ -167,8 +162,7 @@ class BoxTapper:
             status_message = f"🔄 扫描 ({i+1}/5) 角度:{angle}°"
             print(status_message)
             
-            mc.send_angles([angle, -45, 45, 0, 90, 0], 30)
-            time.sleep(2)
+            self.move_to([angle, -45, 45, 0, 90, 0], 30)
             
             for _ in range(3):
                 ret, frame = camera.read()
@@ -192,24 +186,19 @@ class BoxTapper:
         adjusted_angle = base_angle + offset_x * 15
         
         status_message = "🎯 对准..."
-        mc.send_angles([adjusted_angle, -45, 45, 0, 90, 0], 20)
-        time.sleep(2)
+        self.move_to([adjusted_angle, -45, 45, 0, 90, 0], 20)
         
         status_message = "➡️ 伸出..."
-        mc.send_angles([adjusted_angle, -30, 30, 0, 60, 0], 20)
-        time.sleep(2)
+        self.move_to([adjusted_angle, -30, 30, 0, 60, 0], 20)
         
         status_message = "⬇️ 下降..."
-        mc.send_angles([adjusted_angle, -20, 20, 0, 40, 0], 15)
-        time.sleep(2)
+        self.move_to([adjusted_angle, -20, 20, 0, 40, 0], 15)
         
         status_message = "👆 轻点！"
-        mc.send_angles([adjusted_angle, -15, 15, 0, 30, 0], 10)
-        time.sleep(1.5)
+        self.move_to([adjusted_angle, -15, 15, 0, 30, 0], 10)
         
         status_message = "⬆️ 收回..."
-        mc.send_angles(self.home_position, 30)
-        time.sleep(3)
+        self.move_to(self.home_position, 30)
     
     def run(self):
         """执行任务"""
@@ -230,8 +219,7 @@ class BoxTapper:
             else:
                 status_message = "❌ 未找到红色盒子"
             
-            mc.send_angles(self.home_position, 30)
-            time.sleep(2)
+            self.move_to(self.home_position, 30)
             
         except Exception as e:
             status_message = f"❌ 错误: {str(e)}"
@@ -260,6 +248,7 @@ def start_task():
 def generate_video():
     """视频流生成器 - 使用测试成功的方式"""
     print("视频流启动")
+    tracker = vision.red_box_tracker()
     
     while True:
         if camera is None:
@@ -271,7 +260,7 @@ def generate_video():
             continue
         
         # 检测红色盒子并标注
-        bot.detect_red_box(frame)
+        bot.detect_red_box(frame, tracker)
         
         # 添加状态文字
         cv2.putText(frame, status_message[:50], (10, 30),
@@ -19,8 +19,9 @@ else
     echo ""
 
     # Deploy the FastAPI server package + built frontend
-    ssh "$REMOTE" "mkdir -p ~/server/static/assets"
-    scp server/__init__.py server/app.py server/arm.py server/camera.py server/wifi.py "$REMOTE:~/server/"
+    ssh "$REMOTE" "mkdir -p ~/server/static/assets ~/server/vision"
+    scp server/*.py "$REMOTE:~/server/"
+    scp server/vision/*.py "$REMOTE:~/server/vision/"
     scp server/static/index.html "$REMOTE:~/server/static/"
     scp server/static/assets/* "$REMOTE:~/server/static/assets/"
     echo "Deployed server/ to Pi"
@@ -5,9 +5,16 @@ import {
   DETECT_INTERVAL_MS,
   DETECT_MIN_SCORE,
 } from "../constants";
-import type { Detection, TargetSelection, WsOutgoing } from "../types";
+import type {
+  Detection,
+  DetectorResult,
+  TargetSelection,
+  WsOutgoing,
+} from "../types";
 
-// TF.js + COCO-SSD loaded from CDN, declared on window
+// Detection runs on the server when it has a model (GET /api/detector/stream:
+// one inference per camera frame shared by every viewer). Otherwise each
+// browser falls back to TF.js + COCO-SSD from a CDN, declared on window.
 declare global {
   interface Window {
     cocoSsd: {
@@ -36,6 +43,29 @@ function loadScript(src: string): Promise<void> {
   });
 }
 
+async function serverDetectorAvailable(): Promise<boolean> {
+  try {
+    const res = await fetch("/api/detector");
+    return res.ok && (await res.json()).config.available;
+  } catch {
+    return false;
+  }
+}
+
+// Server detections are in analysed-frame pixels; the overlay is fixed size
+function toCanvas(result: DetectorResult): Detection[] {
+  const sx = DETECT_CANVAS_W / result.size[0];
+  const sy = DETECT_CANVAS_H / result.size[1];
+  return result.detections.map((d) => {
+    const [x, y, w, h] = d.bbox;
+    return {
+      class: d.label,
+      score: d.score,
+      bbox: [x * sx, y * sy, w * sx, h * sy],
+    };
+  });
+}
+
 export function useDetection(send: (msg: WsOutgoing) => boolean) {
   const [isActive, setIsActive] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
@@ -45,13 +75,14 @@ export function useDetection(send: (msg: WsOutgoing) => boolean) {
   );
   const [inferenceMs, setInferenceMs] = useState(0);
 
+  const sourceRef = useRef<EventSource | null>(null);
   const modelRef = useRef<CocoModel | null>(null);
   const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const inferenceRunning = useRef(false);
   const detectCanvasRef = useRef<HTMLCanvasElement | null>(null);
   const videoRef = useRef<HTMLImageElement | null>(null);
 
-  // Called by VideoFeed to register canvas/video refs
+  // Called by VideoFeed to register canvas/video refs (browser fallback)
   const setRefs = useCallback(
     (video: HTMLImageElement, canvas: HTMLCanvasElement) => {
       videoRef.current = video;
@@ -81,9 +112,11 @@ export function useDetection(send: (msg: WsOutgoing) => boolean) {
     }
   }, []);
 
-  // Preload model in background so "Enable Detection" is instant
+  // Preload the browser model in the background, only if the server has none
   useEffect(() => {
-    loadModel(true);
+    serverDetectorAvailable().then((available) => {
+      if (!available) loadModel(true);
+    });
   }, [loadModel]);
 
   const runInference = useCallback(async () => {
@@ -114,30 +147,73 @@ export function useDetection(send: (msg: WsOutgoing) => boolean) {
     inferenceRunning.current = false;
   }, []);
 
-  const startDetection = useCallback(() => {
-    setIsActive(true);
-    intervalRef.current = setInterval(runInference, DETECT_INTERVAL_MS);
-  }, [runInference]);
-
   const stopDetection = useCallback(() => {
-    setIsActive(false);
+    sourceRef.current?.close();
+    sourceRef.current = null;
     if (intervalRef.current) {
       clearInterval(intervalRef.current);
       intervalRef.current = null;
     }
+    setIsActive(false);
+    setIsLoading(false);
     setDetections([]);
     setSelectedTarget(null);
     setInferenceMs(0);
   }, []);
 
+  const startBrowserDetection = useCallback(async () => {
+    const model = await loadModel();
+    if (!model) return;
+    setIsActive(true);
+    intervalRef.current = setInterval(runInference, DETECT_INTERVAL_MS);
+  }, [loadModel, runInference]);
+
+  // The stream keeps the server detector running; opening it waits for the
+  // model to load. If it cannot open (503: no model, or it failed to load)
+  // detection falls back to the browser.
+  const startServerDetection = useCallback(() => {
+    setIsLoading(true);
+    const source = new EventSource("/api/detector/stream");
+    sourceRef.current = source;
+    let opened = false;
+    source.onopen = () => {
+      opened = true;
+      setIsLoading(false);
+      setIsActive(true);
+    };
+    source.onmessage = (e) => {
+      const result: DetectorResult = JSON.parse(e.data);
+      setDetections(toCanvas(result));
+      setInferenceMs(Math.round(result.detect_ms));
+    };
+    source.onerror = () => {
+      stopDetection();
+      if (!opened) {
+        console.warn("Server detector unavailable, detecting in the browser");
+        startBrowserDetection();
+      } else {
+        console.error("Detector stream lost");
+      }
+    };
+  }, [startBrowserDetection, stopDetection]);
+
+  useEffect(
+    () => () => {
+      sourceRef.current?.close();
+      if (intervalRef.current) clearInterval(intervalRef.current);
+    },
+    [],
+  );
+
   const toggleDetection = useCallback(async () => {
-    if (isActive) {
+    if (isActive || sourceRef.current) {
       stopDetection();
+    } else if (await serverDetectorAvailable()) {
+      startServerDetection();
     } else {
-      const model = await loadModel();
-      if (model) startDetection();
+      await startBrowserDetection();
     }
-  }, [isActive, loadModel, startDetection, stopDetection]);
+  }, [isActive, startBrowserDetection, startServerDetection, stopDetection]);
 
   const selectDetection = useCallback(
     (canvasX: number, canvasY: number) => {
@@ -16,6 +16,20 @@ export interface Detection {
   bbox: [number, number, number, number]; // x, y, w, h
 }
 
+// One result from /api/detector/stream (server/vision/pipeline.py VisionResult)
+export interface DetectorResult {
+  seq: number;
+  frame_seq: number;
+  detect_ms: number;
+  latency_ms: number;
+  size: [number, number]; // analysed frame width, height
+  detections: {
+    label: string;
+    score: number;
+    bbox: [number, number, number, number]; // x, y, w, h in frame pixels
+  }[];
+}
+
 export interface TargetSelection {
   detection: Detection;
   center: [number, number];
@@ -47,6 +47,8 @@ async def get_arm_state() -> str:
             gripper = data["g"]
             lines = [f"J{i+1}: {a}°" for i, a in enumerate(angles)]
             lines.append(f"Gripper: {gripper}%")
+            if data.get("age_ms") is not None:
+                lines.append(f"(read {data['age_ms']} ms ago)")
             return "\n".join(lines)
     except Exception as e:
         return _api_error(e)
@@ -104,23 +106,19 @@ async def reset_arm() -> str:
 
 
 @mcp.tool()
-async def capture_image():
-    """Capture a single frame from the arm's camera. Returns a JPEG image."""
+async def capture_image(width: int | None = None, quality: int | None = None):
+    """Capture a single frame from the arm's camera. Returns a JPEG image.
+
+    Optional ``width`` (pixels, aspect kept) and ``quality`` (1-100) shrink the image.
+    """
+    params = {k: v for k, v in (("width", width), ("quality", quality)) if v is not None}
     try:
         async with _client() as client:
-            async with client.stream("GET", "/video") as stream:
-                buf = bytearray()
-                soi = -1
-                async for chunk in stream.aiter_bytes(4096):
-                    buf.extend(chunk)
-                    if soi < 0:
-                        soi = buf.find(b"\xff\xd8")
-                    if soi >= 0:
-                        eoi = buf.find(b"\xff\xd9", soi + 2)
-                        if eoi >= 0:
-                            jpeg_data = bytes(buf[soi : eoi + 2])
-                            return Image(data=jpeg_data, format="jpeg")
-                return "No complete JPEG frame found in stream."
+            r = await client.get("/api/snapshot", params=params)
+            if r.status_code == 503:
+                return "No camera frame available."
+            r.raise_for_status()
+            return Image(data=r.content, format="jpeg")
     except Exception as e:
         return _api_error(e)
 
@@ -1,11 +1,13 @@
 from pymycobot import MechArm270
 import cv2
-import numpy as np
 from flask import Flask, Response, render_template_string
+from server import vision
 
 app = Flask(__name__)
 mc = MechArm270('/dev/ttyAMA0', 1000000)
 camera = cv2.VideoCapture(0)
+# Every red blob over 500 px², no morphology - as this demo always did
+RED_OBJECTS = [vision.ColorBlobs("red", min_area=500, morph=0)]
 
 HTML = '''
 <!DOCTYPE html>
@@ -37,26 +39,8 @@ def generate_frames():
         if not success:
             break
         
-        # 红色物体检测
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        mask1 = cv2.inRange(hsv, np.array([0, 100, 100]), np.array([10, 255, 255]))
-        mask2 = cv2.inRange(hsv, np.array([160, 100, 100]), np.array([180, 255, 255]))
-        mask = mask1 + mask2
-        
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # 标注检测结果
-        for contour in contours:
-            if cv2.contourArea(contour) > 500:
-                x, y, w, h = cv2.boundingRect(contour)
-                M = cv2.moments(contour)
-                if M["m00"] > 0:
-                    cx = int(M["m10"] / M["m00"])
-                    cy = int(M["m01"] / M["m00"])
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    cv2.circle(frame, (cx, cy), 5, (0, 0, 255), -1)
-                    cv2.putText(frame, f"({cx},{cy})", (x, y-10), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        # 红色物体检测并标注（server.vision 共享检测）
+        vision.draw_detections(frame, vision.run_stages(RED_OBJECTS, frame))
         
         ret, buffer = cv2.imencode('.jpg', frame)
         frame = buffer.tobytes()
@@ -1,28 +1,70 @@
 """FastAPI server for MechArm 270 remote control."""
 
+import argparse
 import atexit
 import asyncio
+import json
+import os
 import subprocess
 import threading
 import time
 from pathlib import Path
+from typing import Annotated
 
-import cv2
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, conlist
 
 from .arm import ArmController
+from .recording import list_recordings
 from .camera import CameraManager
+from .sim import MjpegFileCamera, SimulatedCamera, SimulatedMechArm
+from .osd import CYAN, OsdCompositor, arm_primitives, circle, rect, text
+from .snapshot import SnapshotCache
+from .stream import MjpegBroadcaster
+from .trajectory import MAX_WAYPOINTS
+from .video_recorder import VideoRecorder
+from .vision import DnnPipeline, VisionPipeline
+from .vision.detectors import DEFAULT_MIN_AREA
 from .wifi import WiFiManager
 
 STATIC_DIR = Path(__file__).parent / "static"
 HEARTBEAT_TIMEOUT = 5.0  # seconds without ping → safe position
 
+# Arm backend: "serial" (real MechArm on /dev/ttyAMA0) or "sim" (no hardware).
+# Overridable with --backend / --sim-* flags in main().
+ARM_BACKEND = os.environ.get("MECHARM_BACKEND", "serial")
+SIM_OPTIONS = {
+    "write_latency_ms": float(os.environ.get("MECHARM_SIM_WRITE_MS", 3.0)),
+    "read_latency_ms": float(os.environ.get("MECHARM_SIM_READ_MS", 10.0)),
+    "jitter_ms": float(os.environ.get("MECHARM_SIM_JITTER_MS", 1.0)),
+    "failure_rate": float(os.environ.get("MECHARM_SIM_FAIL_RATE", 0.0)),
+}
+# Camera backend: "v4l2" (/dev/video0), "sim" (synthetic frames) or "file" (a
+# recorded MJPEG clip standing in for the camera). --camera / --camera-file in main().
+CAMERA_BACKEND = os.environ.get("MECHARM_CAMERA", "v4l2")
+CAMERA_FILE = os.environ.get("MECHARM_CAMERA_FILE", "")
+# Ask the camera for native MJPEG and forward it without re-encoding when possible
+CAMERA_MJPEG = os.environ.get("MECHARM_CAMERA_MJPEG", "0") == "1"
+# Run the server-side detector pipeline from startup (else enable via POST /api/vision)
+VISION_ENABLED = os.environ.get("MECHARM_VISION", "0") == "1"
+# Neural-network detector run in a worker process (GET /api/detector/stream); none
+# shipped. An .onnx file (int8 SSD / YOLOv8 exports suit the Pi), or a TF/Caffe
+# model plus its config; labels default to COCO. --dnn-* flags in main().
+DNN_MODEL = os.environ.get("MECHARM_DNN_MODEL", "")
+DNN_CONFIG = os.environ.get("MECHARM_DNN_CONFIG", "")
+DNN_LABELS = os.environ.get("MECHARM_DNN_LABELS", "")
+
 app = FastAPI()
 arm: ArmController = None
 cam: CameraManager = None
+video: MjpegBroadcaster = None
+snapshots: SnapshotCache = None
+recorder: VideoRecorder = None
+vision: VisionPipeline = None
+detector: DnnPipeline = None
+osd = OsdCompositor()
 wifi: WiFiManager = None
 _shutting_down = threading.Event()
 
@@ -34,13 +76,28 @@ _clients: dict[WebSocket, float] = {}
 
 @app.on_event("startup")
 async def startup():
-    global arm, cam, wifi
-    print("Initializing arm controller...")
-    arm = ArmController()
+    global arm, cam, video, snapshots, recorder, vision, detector, wifi
+    print(f"Initializing arm controller ({ARM_BACKEND} backend)...")
+    if ARM_BACKEND == "sim":
+        arm = ArmController(mc=SimulatedMechArm(**SIM_OPTIONS))
+    else:
+        arm = ArmController()
     print(f"  Angles: {arm.current_angles}")
     print(f"  Gripper: {arm.gripper_value}%")
-    print("Initializing camera...")
-    cam = CameraManager()
+    print(f"Initializing camera ({CAMERA_BACKEND})...")
+    if CAMERA_BACKEND == "sim":
+        cam = CameraManager(cap=SimulatedCamera())
+    elif CAMERA_BACKEND == "file":
+        cam = CameraManager(cap=MjpegFileCamera(CAMERA_FILE), mjpeg=CAMERA_MJPEG)
+    else:
+        cam = CameraManager(mjpeg=CAMERA_MJPEG)
+    video = MjpegBroadcaster(cam, overlay=_draw_arm_osd)
+    snapshots = SnapshotCache(cam)
+    recorder = VideoRecorder(cam)
+    vision = VisionPipeline(cam, enabled=VISION_ENABLED)
+    vision.add_listener(_draw_vision_osd)
+    detector = DnnPipeline(cam, model=DNN_MODEL or None, config=DNN_CONFIG or None,
+                           labels=DNN_LABELS or None)
     print("Initializing WiFi manager...")
     wifi = WiFiManager()
     # atexit ensures camera releases even if uvicorn's shutdown event is skipped
@@ -62,6 +119,14 @@ async def shutdown():
     if arm:
         print("[shutdown] Shutting down arm...", flush=True)
         arm.shutdown()
+    if recorder:
+        recorder.stop()
+    if vision:
+        vision.shutdown()
+    if detector:
+        detector.shutdown()
+    if video:
+        video.shutdown()
     if cam:
         print("[shutdown] Shutting down camera...", flush=True)
         cam.shutdown()
@@ -127,8 +192,7 @@ async def websocket_endpoint(ws: WebSocket):
                 })
 
             elif msg_type == "sync":
-                result = await asyncio.to_thread(arm.sync)
-                await ws.send_json({"type": "sync", **result})
+                await ws.send_json({"type": "sync", **arm.sync()})
 
     except WebSocketDisconnect:
         pass
@@ -138,36 +202,251 @@ async def websocket_endpoint(ws: WebSocket):
 
 # --- MJPEG video stream ---
 
-def _generate_mjpeg():
-    """Yield MJPEG frames from camera with OSD overlay and adaptive quality."""
-    while not _shutting_down.is_set():
-        frame = cam.get_frame()
-        if frame is not None:
-            y = 30
-            for i, a in enumerate(arm.current_angles):
-                cv2.putText(frame, f"J{i+1}:{a:.1f}", (10, y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                y += 25
-            cv2.putText(frame, f"Gripper:{arm.gripper_value}%", (10, y),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            jpg = cam.encode_jpeg(frame)
-            if jpg:
-                cam.record_frame_sent(len(jpg))
-                yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n")
-            else:
-                cam.record_frame_skipped()
-        cam.adapt()
-        time.sleep(1.0 / cam.fps)
+def _draw_arm_osd(frame):
+    osd.update_layer("arm", (tuple(arm.current_angles), arm.gripper_value), arm_primitives)
+    osd.apply(frame)
 
 
 @app.get("/video")
-async def video():
+async def video_stream(rendition: str = None):
+    """MJPEG stream; ``rendition`` pins a rung of the quality ladder instead of adapting."""
+    if rendition is not None and rendition not in video.renditions:
+        message = f"rendition must be one of {video.renditions}"
+        return JSONResponse({"success": False, "message": message}, status_code=400)
     return StreamingResponse(
-        _generate_mjpeg(),
+        video.frames(rendition),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
+@app.websocket("/ws/video")
+async def video_socket(ws: WebSocket, rendition: str = None):
+    """Binary video: one WS_FRAME_HEADER + JPEG message per frame, one frame in flight.
+
+    The client acknowledges each frame with any message (e.g. ``{"type": "ack",
+    "seq": n}``) and only then gets the next - always the newest one. Per-client
+    lag (capture → ack) is in /diagnostics under video.broadcast.clients.
+    """
+    await ws.accept()
+    if rendition is not None and rendition not in video.renditions:
+        await ws.close(code=1008, reason=f"rendition must be one of {video.renditions}")
+        return
+    packets = video.packets(rendition)
+    try:
+        async for packet in packets:
+            await ws.send_bytes(packet)
+            if (await ws.receive())["type"] == "websocket.disconnect":  # else the ack
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await packets.aclose()
+
+
+@app.get("/api/snapshot")
+async def snapshot(width: int = None, quality: int = None, max_age_ms: float = None):
+    """Latest frame as one JPEG (no OSD), encoded at most once per frame per variant.
+
+    ``width`` scales down keeping the aspect ratio; ``max_age_ms`` accepts a
+    cached still up to that old instead of encoding a newer frame.
+    """
+    if quality is not None and not 1 <= quality <= 100:
+        return JSONResponse({"success": False, "message": "quality must be 1-100"},
+                            status_code=400)
+    if width is not None and width <= 0:
+        return JSONResponse({"success": False, "message": "width must be positive"},
+                            status_code=400)
+    snap = await asyncio.to_thread(snapshots.get, width, quality, max_age_ms)
+    if snap is None:
+        return JSONResponse({"success": False, "message": "No camera frame available"},
+                            status_code=503)
+    return Response(snap.jpg, media_type="image/jpeg", headers={
+        "Cache-Control": "no-store",
+        "X-Frame-Seq": str(snap.frame_seq),
+        "X-Frame-Age-Ms": f"{snap.age_ms:.0f}",
+    })
+
+
+LATENCY_MIN_INTERVAL = 0.2  # seconds; floor for /api/video/latency updates
+
+
+@app.get("/api/video/latency")
+async def video_latency(interval: float = 1.0, buckets: bool = True):
+    """Server-sent events: per-stage video latency histograms (ms) for each ``interval``.
+
+    Each event covers only the frames of that interval; /diagnostics has
+    the totals since start.
+    """
+    interval = max(interval, LATENCY_MIN_INTERVAL)
+
+    async def events():
+        prev = cam.timings.state()
+        while not _shutting_down.is_set():
+            await asyncio.sleep(interval)
+            state = cam.timings.state()
+            report = cam.timings.report(cam.timings.delta(state, prev), buckets)
+            prev = state
+            payload = {"t": time.time(), "interval_s": interval, "stages": report}
+            yield f"data: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-store"})
+
+
+# --- Vision pipeline ---
+
+def _draw_vision_osd(result):
+    """Mirror the latest detections onto the video feed (re-rendered only on change)."""
+    prims = []
+    for d in result.detections:
+        x, y, w, h = d.bbox
+        prims += [rect((x, y), (x + w, y + h)), circle(d.center, 6),
+                  text(f"{d.label} ({d.center[0]},{d.center[1]})", (x, max(y - 10, 15)))]
+    osd.set_layer("vision", prims)
+
+
+class VisionRequest(BaseModel):
+    enabled: bool | None = None
+    fps: float | None = None
+    stages: list[dict] | None = None
+
+
+@app.get("/api/vision")
+async def vision_status():
+    result = vision.latest()
+    return {"config": vision.config(), "stats": vision.stats(),
+            "result": result.to_dict() if result else None}
+
+
+@app.post("/api/vision")
+async def vision_configure(req: VisionRequest):
+    """Enable/disable detection, set its rate, or replace the stage chain
+    (e.g. ``[{"type": "color", "color": "red", "min_area": 2000}, {"type": "largest"}]``)."""
+    try:
+        config = vision.configure(**req.model_dump(exclude_none=True))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if not config["enabled"]:
+        osd.clear_layer("vision")
+    return {"success": True, **config}
+
+
+class CalibrateRequest(BaseModel):
+    regions: dict[str, list[int]]  # colour name → [x, y, w, h] inside an object of that colour
+    apply: bool = False  # replace the stages with one "colors" stage for these colours
+    min_area: float = DEFAULT_MIN_AREA
+
+
+@app.post("/api/vision/calibrate")
+async def vision_calibrate(req: CalibrateRequest):
+    """Measure HSV ranges for named colours from boxes in the current frame.
+
+    The ranges are returned in the stage-config format; with ``apply`` the
+    pipeline switches to a single lookup-table pass over all of them
+    (``[{"type": "colors", "colors": ranges}, {"type": "largest"}]``).
+    """
+    if any(len(box) != 4 for box in req.regions.values()):
+        return JSONResponse({"success": False, "message": "regions must be [x, y, w, h]"},
+                            status_code=400)
+    try:
+        ranges = await asyncio.to_thread(vision.calibrate, req.regions)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if ranges is None:
+        return JSONResponse({"success": False, "message": "No camera frame available"},
+                            status_code=503)
+    if not req.apply:
+        return {"success": True, "colors": ranges}
+    try:
+        config = vision.configure(stages=[
+            {"type": "colors", "colors": ranges, "min_area": req.min_area},
+            {"type": "largest", "n": 1}])
+    except ValueError as e:
+        return {"success": False, "message": str(e), "colors": ranges}
+    return {"success": True, "colors": ranges, **config}
+
+
+def _result_stream(pipeline, hold=False):
+    """Server-sent events: every result ``pipeline`` publishes, newest only if the client lags.
+
+    With ``hold`` the stream keeps the pipeline running for as long as it is open.
+    """
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(maxsize=1)
+
+    def push(result):
+        if pending.full():
+            pending.get_nowait()  # drop the stale result; only the newest matters
+        pending.put_nowait(result)
+
+    def listener(result):
+        loop.call_soon_threadsafe(push, result)
+
+    async def events():
+        pipeline.add_listener(listener)
+        if hold:
+            pipeline.hold()
+        try:
+            while not _shutting_down.is_set():
+                try:
+                    result = await asyncio.wait_for(pending.get(), 1.0)
+                except asyncio.TimeoutError:
+                    continue
+                yield f"data: {json.dumps(result.to_dict())}\n\n"
+        finally:
+            if hold:
+                pipeline.release()
+            pipeline.remove_listener(listener)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-store"})
+
+
+@app.get("/api/vision/stream")
+async def vision_stream():
+    """Server-sent events: every published detection result."""
+    return _result_stream(vision)
+
+
+# --- Neural-network detector ---
+
+class DetectorRequest(BaseModel):
+    enabled: bool | None = None
+    fps: float | None = None
+    min_score: float | None = None
+
+
+@app.get("/api/detector")
+async def detector_status():
+    result = detector.latest()
+    return {"config": detector.config(), "stats": detector.stats(),
+            "result": result.to_dict() if result else None}
+
+
+@app.post("/api/detector")
+async def detector_configure(req: DetectorRequest):
+    """Enable/disable the detector (enabling waits for the model), set its rate or score floor."""
+    try:
+        config = await asyncio.to_thread(detector.configure,
+                                         **req.model_dump(exclude_none=True))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, **config}
+
+
+@app.get("/api/detector/stream")
+async def detector_stream():
+    """Server-sent events: detections for every viewer from one inference per frame.
+
+    The detector runs while at least one stream is open (or it is enabled).
+    """
+    try:
+        await asyncio.to_thread(detector.start_worker)
+    except ValueError as e:
+        return JSONResponse({"success": False, "message": str(e)}, status_code=503)
+    return _result_stream(detector, hold=True)
+
+
 # --- HTTP fallback endpoints (same as original Flask app) ---
 
 class UpdateRequest(BaseModel):
@@ -179,6 +458,46 @@ class GripperRequest(BaseModel):
 class ResetRequest(BaseModel):
     pass
 
+class FKRequest(BaseModel):
+    angles: conlist(conlist(float, min_length=6, max_length=6), min_length=1)
+
+class PoseRequest(BaseModel):
+    coords: list[float]
+    smooth: bool = True
+
+class RecordingRequest(BaseModel):
+    name: str = ""
+
+class ReplayRequest(BaseModel):
+    name: str
+    speed: float = 1.0
+
+NonNegative = Annotated[float, Field(ge=0)]
+
+
+class FilterRequest(BaseModel):
+    deadband: NonNegative | list[NonNegative] | None = None
+    max_slew: NonNegative | list[NonNegative] | None = None
+    one_euro: bool | None = None
+    min_cutoff: float | None = Field(None, gt=0)
+    beta: float | None = Field(None, ge=0)
+    d_cutoff: float | None = Field(None, gt=0)
+
+class OsdStatusRequest(BaseModel):
+    text: str = ""
+
+class OsdRequest(BaseModel):
+    enabled: bool
+
+class VideoRecordingRequest(BaseModel):
+    segment_seconds: float = 60.0
+    max_total_mb: float = 1024
+    quality: int | None = None
+
+class TrajectoryRequest(BaseModel):
+    waypoints: conlist(conlist(float, min_length=6, max_length=6), min_length=1, max_length=MAX_WAYPOINTS)
+    profile: str = "trapezoid"
+
 
 @app.post("/update")
 async def update(req: UpdateRequest):
@@ -201,22 +520,169 @@ async def reset(req: ResetRequest = ResetRequest()):
     return {"m": "All Reset"}
 
 
+@app.post("/api/trajectory")
+async def run_trajectory(req: TrajectoryRequest):
+    """Stream a smooth path through joint-space waypoints. Returns immediately."""
+    try:
+        duration = await asyncio.to_thread(arm.run_trajectory, req.waypoints, profile=req.profile)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, "duration": round(duration, 3)}
+
+
+@app.get("/api/fk")
+async def fk_current():
+    """End-effector pose for the current joint target."""
+    return {"coords": arm.forward_kinematics()[0]}
+
+
+@app.post("/api/fk")
+async def fk_batch(req: FKRequest):
+    """End-effector poses for a batch of joint vectors, computed in one pass."""
+    return {"coords": await asyncio.to_thread(arm.forward_kinematics, req.angles)}
+
+
+@app.post("/api/pose")
+async def move_to_pose(req: PoseRequest):
+    """Cartesian move: IK to [x, y, z] or [x, y, z, rx, ry, rz], then move there."""
+    if len(req.coords) not in (3, 6):
+        return {"success": False, "message": "coords must be [x, y, z] or [x, y, z, rx, ry, rz]"}
+    return await asyncio.to_thread(arm.move_to_pose, req.coords, req.smooth)
+
+
+@app.get("/api/telemetry")
+async def telemetry(since: float = None, until: float = None,
+                    step: float = Query(None, gt=0), source: str = "commanded"):
+    """Joint history (epoch-second timestamps), downsampled by ``step`` seconds
+    (raised if needed to keep the answer to MAX_POINTS rows)."""
+    if source not in ("commanded", "measured"):
+        return {"success": False, "message": "source must be 'commanded' or 'measured'"}
+    return await asyncio.to_thread(arm.telemetry, source, since, until, step)
+
+
+# --- Video overlay ---
+
+@app.post("/api/osd")
+async def osd_toggle(req: OsdRequest):
+    """Turn the video overlay on/off. Off lets MJPEG passthrough skip decode + encode."""
+    video.overlay_enabled = req.enabled
+    return {"success": True, "enabled": video.overlay_enabled, "passthrough": cam.passthrough}
+
+
+@app.post("/api/osd/status")
+async def osd_status(req: OsdStatusRequest):
+    """Show a task status line at the bottom of the video feed; empty text clears it."""
+    if req.text:
+        osd.set_layer("status", [text(req.text[:60], (10, cam.height - 15), CYAN)])
+    else:
+        osd.clear_layer("status")
+    return {"success": True, "layers": osd.layers()}
+
+
+# --- Teleop command filter ---
+
+@app.get("/api/filter")
+async def filter_status():
+    return arm.filter_stats()
+
+
+@app.post("/api/filter")
+async def filter_configure(req: FilterRequest):
+    """Change deadband / slew / One-Euro settings. Omitted fields are unchanged;
+    send max_slew 0 to disable the slew limit."""
+    try:
+        return arm.configure_filter(**req.model_dump(exclude_none=True))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+
+
+# --- Teleop recording / replay ---
+
+@app.post("/api/recording/start")
+async def recording_start(req: RecordingRequest = RecordingRequest()):
+    name = req.name or time.strftime("session-%Y%m%d-%H%M%S")
+    try:
+        return arm.start_recording(name)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+
+
+@app.post("/api/recording/stop")
+async def recording_stop():
+    return arm.stop_recording()
+
+
+@app.get("/api/recordings")
+async def recordings():
+    return {"recordings": await asyncio.to_thread(list_recordings)}
+
+
+@app.post("/api/replay")
+async def replay_start(req: ReplayRequest):
+    if req.speed <= 0:
+        return {"success": False, "message": "speed must be positive"}
+    try:
+        return await asyncio.to_thread(arm.start_replay, req.name, req.speed)
+    except (ValueError, FileNotFoundError) as e:
+        return {"success": False, "message": str(e)}
+
+
+@app.post("/api/replay/stop")
+async def replay_stop():
+    await asyncio.to_thread(arm.stop_motion)
+    return {"success": True}
+
+
+# --- Camera video recording ---
+
+@app.post("/api/video/recording/start")
+async def video_recording_start(req: VideoRecordingRequest = VideoRecordingRequest()):
+    """Record raw camera frames (no OSD) to rotating MJPEG segments in a worker process."""
+    if req.segment_seconds <= 0 or req.max_total_mb <= 0:
+        return {"success": False, "message": "segment_seconds and max_total_mb must be positive"}
+    if req.quality is not None and not 1 <= req.quality <= 100:
+        return {"success": False, "message": "quality must be 1-100"}
+    stats = await asyncio.to_thread(recorder.start, req.segment_seconds, req.max_total_mb,
+                                    req.quality)
+    return {"success": True, **stats}
+
+
+@app.post("/api/video/recording/stop")
+async def video_recording_stop():
+    return {"success": True, **await asyncio.to_thread(recorder.stop)}
+
+
+@app.get("/api/video/recordings")
+async def video_recordings():
+    return {"recording": recorder.stats(), "segments": await asyncio.to_thread(recorder.segments)}
+
+
 @app.get("/sync")
 async def sync():
-    return await asyncio.to_thread(arm.sync)
+    return arm.sync()
 
 
 # --- Diagnostics ---
 
 @app.get("/diagnostics")
 async def diagnostics():
-    video_stats = cam.get_stats()
+    video_stats = {**cam.get_stats(), "broadcast": video.stats(),
+                   "snapshot": snapshots.stats(), "recorder": recorder.stats(),
+                   "latency_ms": cam.timings.snapshot()}
+    vision_stats = {**vision.config(), **vision.stats()}
+    detector_stats = {**detector.config(), **detector.stats()}
     return {
         "arm": {
             "angles": arm.current_angles,
             "gripper": arm.gripper_value,
+            "state_age_ms": arm.sync()["age_ms"],
+            "state_reads": arm.state_reads,
+            "bus": arm.bus.stats(),
+            "filter": arm.filter.counters,
         },
         "video": video_stats,
+        "vision": vision_stats,
+        "detector": detector_stats,
         "clients": len(_clients),
         "heartbeat_timeout_s": HEARTBEAT_TIMEOUT,
     }
@@ -280,6 +746,45 @@ async def index():
 
 def main():
     import uvicorn
+    global ARM_BACKEND, CAMERA_BACKEND, CAMERA_FILE, CAMERA_MJPEG, VISION_ENABLED
+    global DNN_MODEL, DNN_CONFIG, DNN_LABELS
+    parser = argparse.ArgumentParser(description="MechArm control server")
+    parser.add_argument("--backend", choices=["serial", "sim"], default=ARM_BACKEND)
+    parser.add_argument("--sim-write-ms", type=float, default=SIM_OPTIONS["write_latency_ms"])
+    parser.add_argument("--sim-read-ms", type=float, default=SIM_OPTIONS["read_latency_ms"])
+    parser.add_argument("--sim-jitter-ms", type=float, default=SIM_OPTIONS["jitter_ms"])
+    parser.add_argument("--sim-fail-rate", type=float, default=SIM_OPTIONS["failure_rate"])
+    parser.add_argument("--camera", choices=["v4l2", "sim", "file"], default=CAMERA_BACKEND)
+    parser.add_argument("--camera-file", default=CAMERA_FILE,
+                        help="recorded MJPEG clip for --camera file")
+    parser.add_argument("--mjpeg", action="store_true", default=CAMERA_MJPEG,
+                        help="native MJPEG capture with passthrough to viewers")
+    parser.add_argument("--vision", action="store_true", default=VISION_ENABLED,
+                        help="start the server-side detector pipeline")
+    parser.add_argument("--dnn-model", default=DNN_MODEL,
+                        help="cv2.dnn model (.onnx, ...) for /api/detector")
+    parser.add_argument("--dnn-config", default=DNN_CONFIG,
+                        help="network config for non-ONNX --dnn-model files")
+    parser.add_argument("--dnn-labels", default=DNN_LABELS,
+                        help="class names, one per line (default COCO)")
+    args = parser.parse_args()
+    if args.camera == "file" and not args.camera_file:
+        parser.error("--camera file needs --camera-file")
+    ARM_BACKEND = args.backend
+    CAMERA_BACKEND = args.camera
+    CAMERA_FILE = args.camera_file
+    CAMERA_MJPEG = args.mjpeg
+    VISION_ENABLED = args.vision
+    DNN_MODEL = args.dnn_model
+    DNN_CONFIG = args.dnn_config
+    DNN_LABELS = args.dnn_labels
+    SIM_OPTIONS.update(
+        write_latency_ms=args.sim_write_ms,
+        read_latency_ms=args.sim_read_ms,
+        jitter_ms=args.sim_jitter_ms,
+        failure_rate=args.sim_fail_rate,
+    )
+
     print("=" * 50)
     print("MechArm Control System (FastAPI)")
     print("=" * 50)
@@ -2,17 +2,44 @@
 
 import threading
 import time
-from pymycobot import MechArm270
+
+from . import kinematics, recording, trajectory
+from .filters import CommandFilter
+from .bus import GRIPPER, MOTION, SAFETY, TELEMETRY, SerialBus
+from .telemetry import TelemetryRing
 
 SAFE_ANGLES = [0, 0, 0, 0, 0, 0]
 SAFE_GRIPPER = 0
 GRIPPER_TYPE = 1  # Adaptive gripper
 
+POLL_INTERVAL = 0.025  # legacy fixed-rate loop period
+MIN_SEND_INTERVAL = 0.020  # rate cap for the servo bus (50 Hz)
+STATE_POLL_HZ = 5.0  # hardware state reads per second, shared by all sync() callers
+
+
+def open_serial_arm(port="/dev/ttyAMA0", baud=1000000):
+    """Open the real arm. Imported lazily so the simulator runs without pymycobot."""
+    from pymycobot import MechArm270
+    return MechArm270(port, baud)
+
 
 class ArmController:
-    def __init__(self, port="/dev/ttyAMA0", baud=1000000):
-        self.mc = MechArm270(port, baud)
-        self.mc.set_fresh_mode(1)
+    def __init__(self, port="/dev/ttyAMA0", baud=1000000, mc=None,
+                 wake_on_command=True, state_poll_hz=STATE_POLL_HZ):
+        """Pass ``mc`` to drive a different backend (e.g. SimulatedMechArm).
+
+        ``wake_on_command`` sends new targets as soon as they arrive (rate-capped
+        at MIN_SEND_INTERVAL) and sleeps while idle; False restores the old
+        fixed 25 ms polling loop. ``state_poll_hz`` sets how often the
+        background poller refreshes the snapshot that sync() serves.
+        """
+        self.mc = mc if mc is not None else open_serial_arm(port, baud)
+        # All serial traffic goes through the bus; nothing else calls self.mc
+        self.bus = SerialBus(self.mc)
+        try:
+            self.bus.call(MOTION, self.mc.set_fresh_mode, 1)
+        except Exception:
+            pass
         time.sleep(0.1)
 
         self.current_angles = [0, 0, 0, 0, 0, 0]
@@ -20,88 +47,393 @@ class ArmController:
 
         self._target_angles = None
         self._target_gripper = None
+        self._target_teleop = False  # True when _target_angles came from set_angles
+        self.filter = CommandFilter()
         self._cmd_lock = threading.Lock()
-        self._serial_lock = threading.Lock()
+        self._cmd_ready = threading.Condition(self._cmd_lock)
         self._running = True
+        self._wake_on_command = wake_on_command
+        self._motion_cancel = threading.Event()
+        self._motion_thread = None
+        self.recorder = None
+        self._ik = kinematics.IKSolver()
+        self._ik.grid  # build the seed grid now rather than on the first Cartesian move
+
+        self._state_poll_hz = state_poll_hz
+        self._state_lock = threading.Lock()
+        self._state = {"a": list(self.current_angles), "g": self.gripper_value,
+                       "t_a": 0.0, "t_g": 0.0}
+        self.state_reads = 0
+        self.commanded_log = TelemetryRing()
+        self.measured_log = TelemetryRing()
+        self._last_sent = [list(self.current_angles), self.gripper_value]
 
         # Read initial state
-        try:
-            angles = self.mc.get_angles()
-            if angles:
-                self.current_angles = angles
-        except Exception:
-            pass
-        try:
-            grip = self.mc.get_gripper_value()
-            if grip is not None:
-                self.gripper_value = grip
-        except Exception:
-            pass
+        angles = self._read_state("a", self.mc.get_angles)
+        if angles:
+            self.current_angles = list(angles)
+        grip = self._read_state("g", self.mc.get_gripper_value)
+        if grip is not None:
+            self.gripper_value = grip
+        self.filter.reset(self.current_angles)
 
         self._thread = threading.Thread(target=self._command_loop, daemon=True)
         self._thread.start()
+        self._poll_thread = threading.Thread(target=self._state_loop, daemon=True)
+        self._poll_thread.start()
+
+    def _take_targets(self):
+        """Pop pending targets. Caller holds _cmd_lock."""
+        angles = grip = None
+        if self._target_angles is not None:
+            angles = list(self._target_angles)
+            self._target_angles = None
+        if self._target_gripper is not None:
+            grip = self._target_gripper
+            self._target_gripper = None
+        return angles, grip
+
+    def _has_work(self) -> bool:
+        """Caller holds _cmd_lock."""
+        return (self._target_angles is not None or self._target_gripper is not None
+                or (self.filter.enabled and not self.filter.settled))
+
+    def _filtered(self, angles):
+        """Run a freshly taken angle target through the teleop filter.
+
+        Teleop goals are filtered; any other target (trajectory, replay,
+        reset) bypasses it and re-anchors it. With no new target, keeps
+        stepping toward the last goal until the filter settles.
+        """
+        teleop, self._target_teleop = self._target_teleop, False
+        if not self.filter.enabled:
+            if angles is not None:
+                self.filter.reset(angles)  # stay anchored for when it is switched back on
+            return angles
+        if angles is not None:
+            if not teleop:
+                self.filter.reset(angles)
+                return angles
+            self.filter.set_goal(angles)
+        if self.filter.settled:
+            return None
+        return self.filter.update(time.monotonic())
+
+    def _send(self, angles, grip, safety=False):
+        """Queue targets on the bus; a newer target replaces a still-queued one.
+
+        Caller holds _cmd_lock (bus writes never block), so a target taken
+        before go_safe() cannot reach the bus after its SAFETY write.
+        """
+        if angles is not None:
+            self._last_sent[0] = angles
+        if grip is not None:
+            self._last_sent[1] = grip
+        self.commanded_log.append(*self._last_sent)
+        if angles is not None:
+            self.bus.write(SAFETY if safety else MOTION, "angles",
+                           self.mc.send_angles, angles, 100)
+        if grip is not None:
+            self.bus.write(SAFETY if safety else GRIPPER, "gripper",
+                           self.mc.set_gripper_value, grip, 80, GRIPPER_TYPE)
 
     def _command_loop(self):
+        if self._wake_on_command:
+            self._event_loop()
+        else:
+            self._poll_loop()
+
+    def _event_loop(self):
+        """Block until a target is set, send it, then enforce the bus rate cap.
+
+        Targets set while the cap is in force are coalesced: only the latest
+        one is sent when the interval expires. While the teleop filter is
+        still converging (slew limit, smoothing) it is stepped once per slot.
+        """
+        next_send = 0.0
+        while self._running:
+            with self._cmd_ready:
+                while self._running and not self._has_work():
+                    self._cmd_ready.wait()
+                if not self._running:
+                    return
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cmd_lock:
+                angles, grip = self._take_targets()
+                angles = self._filtered(angles)
+                if angles is not None or grip is not None:
+                    self._send(angles, grip)
+            next_send = time.monotonic() + MIN_SEND_INTERVAL
+
+    def _poll_loop(self):
         """Send latest target to arm every 25ms. Skips if no new command."""
         while self._running:
-            angles = None
-            grip = None
             with self._cmd_lock:
-                if self._target_angles is not None:
-                    angles = list(self._target_angles)
-                    self._target_angles = None
-                if self._target_gripper is not None:
-                    grip = self._target_gripper
-                    self._target_gripper = None
-            if angles is not None or grip is not None:
-                with self._serial_lock:
-                    try:
-                        if angles is not None:
-                            self.mc.send_angles(angles, 100)
-                        if grip is not None:
-                            self.mc.set_gripper_value(grip, 80, GRIPPER_TYPE)
-                    except Exception:
-                        pass
-            time.sleep(0.025)
+                angles, grip = self._take_targets()
+                angles = self._filtered(angles)
+                if angles is not None or grip is not None:
+                    self._send(angles, grip)
+            time.sleep(POLL_INTERVAL)
+
+    def _push_angles(self, angles: list, cancel=None):
+        """Set a full joint target without touching a running trajectory.
+
+        With ``cancel`` (a motion's event) the target is dropped once it is
+        set, so a cancelled motion never overrides the command that did it.
+        """
+        with self._cmd_ready:
+            if cancel is not None and cancel.is_set():
+                return
+            self.current_angles = list(angles)
+            self._target_angles = list(angles)
+            self._target_teleop = False
+            self._cmd_ready.notify()
+
+    def _push_gripper(self, value: int, cancel=None):
+        with self._cmd_ready:
+            if cancel is not None and cancel.is_set():
+                return
+            self.gripper_value = value
+            self._target_gripper = value
+            self._cmd_ready.notify()
+
+    def _start_motion(self, target, *args):
+        """Run an autonomous motion (trajectory, replay) on its own thread.
+
+        ``target`` receives ``args`` plus the cancel event as its last
+        argument; manual commands, reset and go_safe set it. Each motion
+        gets its own event and must push through it (_push_angles(q,
+        cancel)), so cancelling never has to wait for the thread.
+        """
+        self._cancel_motion()
+        self._motion_cancel = threading.Event()
+        self._motion_thread = threading.Thread(
+            target=target, args=args + (self._motion_cancel,), daemon=True)
+        self._motion_thread.start()
+
+    def _cancel_motion(self):
+        """Stop the running motion; called on the event loop, so it never joins."""
+        with self._cmd_lock:
+            self._motion_cancel.set()
+        self._motion_thread = None
+
+    def run_trajectory(self, waypoints: list, profile="trapezoid", wait=False) -> float:
+        """Move smoothly from the current pose through ``waypoints``.
+
+        The path is planned under trajectory.MAX_VELOCITY/MAX_ACCEL and fed to
+        the command loop at STREAM_RATE_HZ. Any manual command cancels it.
+        Returns the planned duration in seconds.
+        """
+        self._cancel_motion()
+        traj = trajectory.plan([list(self.current_angles)] + [list(w) for w in waypoints],
+                               profile=profile)
+        def run(cancel):
+            trajectory.stream(traj, lambda q: self._push_angles(q, cancel), cancel)
+
+        self._start_motion(run)
+        if wait:
+            self._motion_thread.join()
+        return traj.duration
+
+    # --- Session recording / replay ---
+
+    def _record(self, kind):
+        rec = self.recorder
+        if rec is not None:
+            rec.record(kind, self.current_angles, self.gripper_value)
+
+    def start_recording(self, name: str) -> dict:
+        """Record every manual command (angles, gripper, reset) to ``name``."""
+        self.stop_recording()
+        self.recorder = recording.SessionRecorder(name)
+        return {"success": True, "name": self.recorder.name}
+
+    def stop_recording(self) -> dict:
+        rec, self.recorder = self.recorder, None
+        if rec is None:
+            return {"success": False, "message": "Not recording"}
+        return {"success": True, **rec.close()}
+
+    def start_replay(self, name: str, speed=1.0) -> dict:
+        """Replay a recording at ``speed``× its original timing.
+
+        The arm first moves to the recording's first pose along a planned
+        trajectory, then the file is streamed from its memory map.
+        """
+        rec = recording.open_recording(recording.recording_path(name))
+        if not len(rec.records):
+            return {"success": False, "message": f"Recording {name} is empty"}
+        first = [float(a) for a in rec.records[0]["angles"]]
+        lead_in = trajectory.plan([list(self.current_angles), first])
+
+        def run(cancel):
+            def push_angles(angles):
+                self._push_angles(angles, cancel)
+
+            def push_gripper(value):
+                self._push_gripper(value, cancel)
+
+            if trajectory.stream(lead_in, push_angles, cancel):
+                recording.replay(rec, push_angles, push_gripper, speed, cancel)
+
+        self._start_motion(run)
+        return {"success": True, "duration": round(lead_in.duration + rec.duration / speed, 2)}
+
+    def stop_motion(self):
+        """Stop a running trajectory or replay, holding the current target."""
+        self._cancel_motion()
+
+    def forward_kinematics(self, angles=None) -> list:
+        """[x, y, z, rx, ry, rz] for each joint vector in ``angles`` (default: current target)."""
+        q = [self.current_angles] if angles is None else angles
+        return kinematics.to_coords(kinematics.forward(q)).round(2).tolist()
+
+    def move_to_pose(self, coords: list, smooth=True) -> dict:
+        """Move the end effector to [x, y, z] or [x, y, z, rx, ry, rz] (mm, deg).
+
+        Solved by the warm-started IK; ``smooth`` plans a trajectory there,
+        otherwise the solution is sent as a single target.
+        """
+        q = self._ik.solve(coords, seed=self.current_angles)
+        if q is None:
+            return {"success": False, "message": f"Pose {coords} unreachable"}
+        angles = [round(float(a), 2) for a in q]
+        if smooth:
+            duration = self.run_trajectory([angles])
+        else:
+            self._cancel_motion()
+            self._push_angles(angles)
+            duration = 0.0
+        return {"success": True, "angles": angles, "duration": round(duration, 3)}
 
     def set_angles(self, joints: dict):
         """Update target angles from a dict like {"1": 45, "3": -10}."""
+        self._cancel_motion()
         for j_str, angle in joints.items():
             self.current_angles[int(j_str) - 1] = angle
-        with self._cmd_lock:
+        with self._cmd_ready:
             self._target_angles = list(self.current_angles)
+            self._target_teleop = True
+            self._cmd_ready.notify()
+        self._record(recording.KIND_ANGLES)
 
     def set_gripper(self, value: int):
         """Set gripper target (0=open, 100=closed)."""
         self.gripper_value = value
-        with self._cmd_lock:
+        with self._cmd_ready:
             self._target_gripper = value
+            self._cmd_ready.notify()
+        self._record(recording.KIND_GRIPPER)
 
     def reset(self):
         """Send all joints and gripper to zero."""
+        self._cancel_motion()
         self.current_angles = [0] * 6
         self.gripper_value = 0
-        with self._cmd_lock:
+        with self._cmd_ready:
             self._target_angles = [0] * 6
             self._target_gripper = 0
+            self._target_teleop = False
+            self._cmd_ready.notify()
+        self._record(recording.KIND_RESET)
 
     def go_safe(self):
-        """Move to safe position (all zeros). Used on heartbeat timeout."""
+        """Move to safe position (all zeros). Used on heartbeat timeout.
+
+        Bypasses the command loop and its rate cap: the targets go straight
+        onto the bus at SAFETY priority, ahead of anything already queued,
+        and under _cmd_lock so no older target follows them.
+        """
+        self._cancel_motion()
         self.current_angles = list(SAFE_ANGLES)
         self.gripper_value = SAFE_GRIPPER
         with self._cmd_lock:
-            self._target_angles = list(SAFE_ANGLES)
-            self._target_gripper = SAFE_GRIPPER
+            self._take_targets()  # drop anything not yet sent
+            self._target_teleop = False
+            self.filter.reset(SAFE_ANGLES)
+            self._send(list(SAFE_ANGLES), SAFE_GRIPPER, safety=True)
+
+    # --- Hardware state ---
+
+    def _read_state(self, field, read, timeout=None):
+        """One telemetry read into the snapshot. Returns the value or None on failure."""
+        try:
+            value = self.bus.call(TELEMETRY, read, timeout=timeout)
+        except Exception:  # BusTimeout or a serial error
+            return None
+        if value is None or value == -1 or (field == "a" and not value):
+            return None
+        with self._state_lock:
+            self._state[field] = value
+            self._state["t_" + field] = time.monotonic()
+            self.state_reads += 1
+        return value
+
+    def _state_loop(self):
+        """Refresh the state snapshot at state_poll_hz.
+
+        Reads go on the bus at TELEMETRY priority, so queued motion always
+        goes first; a read still queued when the next poll is due is dropped.
+        """
+        interval = 1.0 / self._state_poll_hz
+        while self._running:
+            t0 = time.monotonic()
+            for field, read in (("a", self.mc.get_angles), ("g", self.mc.get_gripper_value)):
+                if not self._running:
+                    return
+                self._read_state(field, read, timeout=interval)
+            with self._state_lock:
+                self.measured_log.append(self._state["a"], self._state["g"])
+            elapsed = time.monotonic() - t0
+            if elapsed < interval:
+                time.sleep(interval - elapsed)
 
     def sync(self) -> dict:
-        """Read current angles and gripper from hardware. Blocking serial call."""
-        with self._serial_lock:
-            try:
-                angles = self.mc.get_angles()
-                grip = self.mc.get_gripper_value()
-                return {"a": angles, "g": grip}
-            except Exception:
-                return {"a": self.current_angles, "g": self.gripper_value}
+        """Latest hardware angles and gripper from the poller's snapshot.
+
+        Never touches the serial bus. ``age_ms`` is the age of the older of
+        the two readings (None if the hardware has not answered yet).
+        """
+        with self._state_lock:
+            st = dict(self._state)
+        t_oldest = min(st["t_a"], st["t_g"])
+        age = round((time.monotonic() - t_oldest) * 1000) if t_oldest else None
+        return {"a": st["a"], "g": st["g"], "age_ms": age}
+
+    def configure_filter(self, **options) -> dict:
+        """Change teleop filter settings at runtime; returns the active config.
+
+        Switching the filter off sends the goal it was still stepping toward
+        (unless a newer target is pending); switching it on anchors it at the
+        last commanded pose, so neither change strands or rewinds the arm.
+        ValueError for invalid settings.
+        """
+        with self._cmd_ready:
+            was_enabled = self.filter.enabled
+            self.filter.configure(**options)
+            if was_enabled and not self.filter.enabled:
+                if self._target_angles is None and not self.filter.settled:
+                    self._target_angles = self.filter.goal
+            elif self.filter.enabled and not was_enabled:
+                self.filter.reset(self._last_sent[0])
+            self._cmd_ready.notify()
+            return self.filter.config()
+
+    def filter_stats(self) -> dict:
+        return {**self.filter.config(), **self.filter.counters}
+
+    def telemetry(self, source="commanded", since=None, until=None, step=None) -> dict:
+        """History slice from the commanded or measured ring (epoch seconds)."""
+        ring = self.measured_log if source == "measured" else self.commanded_log
+        return ring.query(since=since, until=until, step=step)
 
     def shutdown(self):
-        self._running = False
+        self._cancel_motion()
+        self.stop_recording()
+        with self._cmd_ready:
+            self._running = False
+            self._cmd_ready.notify()
+        self._thread.join(timeout=1.0)
+        self.bus.shutdown()
@@ -0,0 +1,656 @@
+"""Benchmark harness for the control and video paths, run against simulated hardware.
+
+Usage:
+    python -m server.bench [--json] arm [--duration 10] [--rate 25] [--mode both]
+    python -m server.bench [--json] video [--viewers 1,2,4,8] [--mode both]
+    python -m server.bench [--json] video --mjpeg-file clip.mjpeg --mjpeg --no-osd --rendition high
+    python -m server.bench [--json] osd [--frames 2000]
+    python -m server.bench [--json] record [--width 1280 --height 720] [--camera-fps 30]
+    python -m server.bench [--json] vision [--frames 300] [--width 640 --height 480]
+    python -m server.bench [--json] vision --mjpeg-file video_20240101-120000-000.mjpeg --scale 0.5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .arm import ArmController
+from .camera import CameraManager
+from .mjpeg import split_frames
+from .sim import MjpegFileCamera, SimulatedCamera, SimulatedMechArm
+from .osd import OsdCompositor, arm_primitives
+from .stream import MjpegBroadcaster
+from .video_recorder import VideoRecorder
+from .vision import ColorBlobs, ColorClasses, TrackedBlobs, run_stages
+from .vision.detectors import BOX_MIN_AREA
+
+
+def percentiles(samples, points=(50, 90, 99)) -> dict:
+    """Nearest-rank percentiles of ``samples`` plus max, in the samples' units."""
+    if not samples:
+        return {f"p{p}": None for p in points} | {"max": None, "n": 0}
+    ordered = sorted(samples)
+    out = {}
+    for p in points:
+        idx = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        out[f"p{p}"] = ordered[idx]
+    out["max"] = ordered[-1]
+    out["n"] = len(ordered)
+    return out
+
+
+def _fmt(stats: dict, unit="ms") -> str:
+    if not stats["n"]:
+        return "no samples"
+    parts = [f"{k}={v:.2f}{unit}" for k, v in stats.items() if k != "n"]
+    return f"n={stats['n']}  " + "  ".join(parts)
+
+
+def _every(rate_hz, duration, stop, fn):
+    """Call fn(i) at a fixed rate until duration elapses or stop is set."""
+    period = 1.0 / rate_hz
+    t_start = time.monotonic()
+    i = 0
+    while not stop.is_set():
+        t_next = t_start + i * period
+        if t_next - t_start >= duration:
+            break
+        delay = t_next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        fn(i)
+        i += 1
+
+
+# --- Arm command path ---
+
+FILTER_PRESETS = {
+    "off": {"deadband": 0, "max_slew": None, "one_euro": False},
+    "deadband": {"deadband": 0.2, "max_slew": None, "one_euro": False},
+    "smooth": {"deadband": 0.2, "max_slew": 180.0, "one_euro": True},
+}
+
+def _bench_arm_once(args, wake_on_command) -> dict:
+    """Drive ArmController like a teleop session and measure command-to-wire latency.
+
+    Each angle command carries a unique J1 value so the frame that eventually
+    reaches the simulated wire can be matched back to the call that issued it.
+    Commands overwritten before the loop picks them up count as coalesced.
+    """
+    sim = SimulatedMechArm(
+        write_latency_ms=args.write_ms,
+        read_latency_ms=args.read_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    arm = ArmController(mc=sim, wake_on_command=wake_on_command)
+    arm.configure_filter(**FILTER_PRESETS[args.filter])
+    sim.drain_wire_log()  # discard init traffic
+    rng = random.Random(args.seed)
+
+    issued = {}  # (kind, key) -> monotonic time of the most recent call
+    issued_lock = threading.Lock()
+    counts = {"angles": 0, "gripper": 0}
+    sync_ms = []
+    stop = threading.Event()
+
+    moving = max(1, round(args.rate * (1.0 - args.hold)))
+    period = max(moving, round(args.rate))
+
+    def send_angles(i):
+        # J1 sweeps like a dragged slider (unique value per command, used as the
+        # match key), pausing for the --hold fraction of each second; J2 is a
+        # slider held still with --noise degrees of jitter
+        cycle, step = divmod(i, period)
+        j1 = round(((cycle * moving + min(step, moving - 1)) % 600) * 0.5 - 150.0, 1)
+        joints = {"1": j1}
+        if args.noise:
+            joints["2"] = round(rng.gauss(0.0, args.noise), 2)
+        with issued_lock:
+            issued[("angles", j1)] = time.monotonic()
+            counts["angles"] += 1
+        arm.set_angles(joints)
+
+    def send_gripper(i):
+        value = i % 101
+        with issued_lock:
+            issued[("gripper", value)] = time.monotonic()
+            counts["gripper"] += 1
+        arm.set_gripper(value)
+
+    def do_sync(_):
+        t0 = time.monotonic()
+        arm.sync()
+        sync_ms.append((time.monotonic() - t0) * 1000)
+
+    threads = [
+        threading.Thread(target=_every, args=(args.rate, args.duration, stop, send_angles)),
+        threading.Thread(target=_every, args=(args.gripper_rate, args.duration, stop, send_gripper)),
+        threading.Thread(target=_every, args=(args.sync_rate, args.duration, stop, do_sync)),
+    ]
+    cpu0 = time.process_time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    time.sleep(0.2)  # let the command loop flush the last targets
+    busy_cpu = time.process_time() - cpu0
+
+    # Idle phase: nothing to send, measure what the controller costs at rest
+    cpu0 = time.process_time()
+    time.sleep(args.idle)
+    idle_cpu = time.process_time() - cpu0
+    arm.shutdown()
+
+    latency = {"angles": [], "gripper": []}
+    delivered = {"angles": 0, "gripper": 0}
+    wire = sim.drain_wire_log()
+    wire_writes = {"angles": sum(1 for w in wire if w[1] == "angles"),
+                   "gripper": sum(1 for w in wire if w[1] == "gripper")}
+    for t_wire, kind, payload in wire:
+        key = payload[0] if kind == "angles" else payload
+        t_cmd = issued.get((kind, key))
+        if t_cmd is None or t_cmd > t_wire:
+            continue
+        delivered[kind] += 1
+        latency[kind].append((t_wire - t_cmd) * 1000)
+
+    return {
+        "mode": "event" if wake_on_command else "poll",
+        "duration_s": args.duration,
+        "issued": counts,
+        "delivered": delivered,
+        "wire_writes": wire_writes,
+        "coalesced": {k: counts[k] - delivered[k] for k in counts},
+        "angles_latency_ms": percentiles(latency["angles"]),
+        "gripper_latency_ms": percentiles(latency["gripper"]),
+        "sync_ms": percentiles(sync_ms),
+        "serial_calls": dict(sim.calls),
+        "state_reads": arm.state_reads,
+        "bus": arm.bus.stats(),
+        "filter": {"preset": args.filter, **arm.filter.counters},
+        "busy_cpu_pct": round(100 * busy_cpu / args.duration, 2),
+        "idle_cpu_pct": round(100 * idle_cpu / args.idle, 2) if args.idle else None,
+    }
+
+
+def bench_arm(args) -> list[dict]:
+    modes = {"event": [True], "poll": [False], "both": [False, True]}[args.mode]
+    return [_bench_arm_once(args, m) for m in modes]
+
+
+def _print_arm_once(r: dict):
+    print(f"Arm command path — {r['mode']} loop ({r['duration_s']}s)")
+    for kind in ("angles", "gripper"):
+        print(f"  {kind:8} issued={r['issued'][kind]}  delivered={r['delivered'][kind]}"
+              f"  coalesced={r['coalesced'][kind]}  wire writes={r['wire_writes'][kind]}")
+        print(f"           cmd→wire  {_fmt(r[f'{kind}_latency_ms'])}")
+    print(f"  sync     {_fmt(r['sync_ms'])}")
+    print(f"  serial   {r['serial_calls']}  (state poller reads: {r['state_reads']})")
+    for name, b in r["bus"].items():
+        if b["submitted"]:
+            print(f"  bus {name:9} executed={b['executed']} coalesced={b['coalesced']}"
+                  f" expired={b['expired']} wait avg={b['wait_ms_avg']}ms max={b['wait_ms_max']}ms")
+    f = r["filter"]
+    print(f"  filter   {f['preset']}: updates={f['updates']} forwarded={f['forwarded']}"
+          f" dropped={f['dropped']}")
+    print(f"  cpu      busy={r['busy_cpu_pct']}%  idle={r['idle_cpu_pct']}%")
+
+
+def _print_arm(results: list[dict]):
+    for r in results:
+        _print_arm_once(r)
+    if len(results) == 2:
+        before, after = results
+        b, a = before["angles_latency_ms"], after["angles_latency_ms"]
+        if b["n"] and a["n"]:
+            print(f"poll → event: angles p50 {b['p50']:.2f} → {a['p50']:.2f} ms,"
+                  f" p99 {b['p99']:.2f} → {a['p99']:.2f} ms,"
+                  f" idle cpu {before['idle_cpu_pct']}% → {after['idle_cpu_pct']}%")
+
+
+# --- Video fan-out ---
+
+OSD_STATE = ((12.5, -30.0, 45.0, 0.0, 60.0, -90.0), 50)
+
+
+def _legacy_osd(frame):
+    """The pre-compositor overlay: seven putText calls on every frame."""
+    angles, gripper = OSD_STATE
+    y = 30
+    for i, a in enumerate(angles):
+        cv2.putText(frame, f"J{i+1}:{a:.1f}", (10, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        y += 25
+    cv2.putText(frame, f"Gripper:{gripper}%", (10, y),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+
+def _cached_osd(compositor):
+    def overlay(frame):
+        compositor.update_layer("arm", OSD_STATE, arm_primitives)
+        compositor.apply(frame)
+    return overlay
+
+
+def _send_time(nbytes, kbps):
+    """Seconds a constrained link needs for ``nbytes``; 0 for an unconstrained viewer."""
+    return nbytes * 8 / (kbps * 1000) if kbps else 0.0
+
+
+def _per_client_viewer(cam, stop, delivered, kbps):
+    """The pre-broadcaster /video loop: every client copies, draws and encodes."""
+    while not stop.is_set():
+        frame = cam.get_frame()
+        send = 0.0
+        if frame is not None:
+            _legacy_osd(frame)
+            jpg = cam.encode_jpeg(frame)
+            if jpg:
+                delivered.append(len(jpg))
+                send = _send_time(len(jpg), kbps)
+        time.sleep(1.0 / cam.fps + send)
+
+
+async def _broadcast_viewers(broadcaster, stop, delivered, links, rendition=None):
+    """All broadcast viewers as tasks on one event loop, like /video under uvicorn."""
+
+    async def viewer(i):
+        async for part in broadcaster.frames(rendition):
+            delivered[i].append(len(part))
+            if stop.is_set():
+                break
+            if links[i]:
+                await asyncio.sleep(_send_time(len(part), links[i]))
+
+    tasks = []
+    for i in range(len(delivered)):
+        tasks.append(asyncio.create_task(viewer(i)))
+        await asyncio.sleep(0)  # subscribe in order so client ids match viewer index
+    while not stop.is_set():
+        await asyncio.sleep(0.05)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _bench_video_once(args, viewers, mode) -> dict:
+    if args.mjpeg_file:
+        cap = MjpegFileCamera(args.mjpeg_file, fps=args.camera_fps)
+    else:
+        cap = SimulatedCamera(fps=args.camera_fps, seed=args.seed)
+    cam = CameraManager(fps=args.fps, quality=args.quality, cap=cap, mjpeg=args.mjpeg)
+    overlay = None if args.no_osd else _cached_osd(OsdCompositor())
+    broadcaster = MjpegBroadcaster(cam, overlay=overlay) if mode == "broadcast" else None
+    time.sleep(0.3)  # first frames
+    stop = threading.Event()
+    delivered = [[] for _ in range(viewers)]
+    links = [args.slow_kbps if i < args.slow else None for i in range(viewers)]
+    if broadcaster:
+        threads = [threading.Thread(target=asyncio.run,
+                                    args=(_broadcast_viewers(broadcaster, stop, delivered,
+                                                             links, args.rendition),))]
+    else:
+        threads = [threading.Thread(target=_per_client_viewer,
+                                    args=(cam, stop, delivered[i], links[i]))
+                   for i in range(viewers)]
+    cpu0 = time.process_time()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration / 2)
+    thread_count = threading.active_count()
+    time.sleep(args.duration / 2)
+    stats = broadcaster.stats() if broadcaster else None
+    stop.set()
+    cpu = time.process_time() - cpu0
+    for t in threads:
+        t.join(timeout=2)
+    if broadcaster:
+        broadcaster.shutdown()
+        encoded = stats["frames_encoded"]
+        renditions = {c["id"]: c["rendition"] for c in stats["clients"]}
+        per_rendition = {name: r["frames_encoded"] for name, r in stats["renditions"].items()
+                         if r["frames_encoded"]}
+        forwarded = sum(r["frames_forwarded"] for r in stats["renditions"].values())
+    else:
+        encoded = sum(len(d) for d in delivered)
+        renditions, per_rendition, forwarded = {}, {}, 0
+    passthrough = cam.passthrough
+    latency = {stage: {k: r[k] for k in ("mean", "p50", "p99")}
+               for stage, r in cam.timings.snapshot().items()
+               if stage in ("osd", "encode", "send", "capture_to_sent") and r["n"]}
+    with contextlib.redirect_stdout(io.StringIO()):  # keep --json output clean
+        cam.shutdown()
+    return {
+        "mode": mode,
+        "viewers": viewers,
+        "slow_viewers": min(args.slow, viewers),
+        "slow_kbps": args.slow_kbps,
+        "passthrough": passthrough,
+        "encodes_per_s": round(encoded / args.duration, 1),
+        "forwards_per_s": round(forwarded / args.duration, 1),
+        "encodes_by_rendition": per_rendition,
+        "viewer_fps": [round(len(d) / args.duration, 1) for d in delivered],
+        "viewer_kbps": [round(sum(d) * 8 / 1000 / args.duration, 1) for d in delivered],
+        "viewer_rendition": [renditions.get(i + 1) for i in range(viewers)],
+        "threads": thread_count,
+        "cpu_pct": round(100 * cpu / args.duration, 1),
+        "latency_ms": latency,
+    }
+
+
+def bench_video(args) -> list[dict]:
+    modes = {"broadcast": ["broadcast"], "per-client": ["per-client"],
+             "both": ["per-client", "broadcast"]}[args.mode]
+    counts = [int(n) for n in args.viewers.split(",")]
+    return [_bench_video_once(args, n, m) for m in modes for n in counts]
+
+
+def _print_video(results: list[dict]):
+    print("Video fan-out (simulated camera; cpu includes capture)")
+    for r in results:
+        print(f"  {r['mode']:10} viewers={r['viewers']:<3} slow={r['slow_viewers']}"
+              f"  encodes/s={r['encodes_per_s']:<6} threads={r['threads']}  cpu={r['cpu_pct']}%")
+        if r["passthrough"]:
+            print(f"             MJPEG passthrough: {r['forwards_per_s']} camera frames/s forwarded")
+        if r["encodes_by_rendition"]:
+            print(f"             encodes by rendition {r['encodes_by_rendition']}")
+        if r["latency_ms"]:
+            print("             ms p50/p99: " + "  ".join(
+                f"{stage} {v['p50']}/{v['p99']}" for stage, v in r["latency_ms"].items()))
+        for i, (fps, kbps, rend) in enumerate(zip(r["viewer_fps"], r["viewer_kbps"],
+                                                  r["viewer_rendition"])):
+            if i < r["slow_viewers"] or i == r["viewers"] - 1:
+                link = f"{r['slow_kbps']} kbit/s link" if i < r["slow_viewers"] else "fast link"
+                print(f"             viewer {i + 1} ({link}): {fps} fps, {kbps} kbit/s"
+                      + (f", on '{rend}'" if rend else ""))
+
+
+# --- OSD overlay ---
+
+def bench_osd(args) -> dict:
+    """Per-frame overlay cost: putText every frame vs the cached compositor."""
+    cap = SimulatedCamera(seed=args.seed, paced=False)
+    _, frame = cap.read()
+    work = frame.copy()
+    compositor = OsdCompositor()
+    overlay = _cached_osd(compositor)
+
+    def per_frame_us(fn):
+        t0 = time.perf_counter()
+        for i in range(args.frames):
+            fn(i)
+        return round((time.perf_counter() - t0) / args.frames * 1e6, 1)
+
+    def changing(i):
+        # a slider being dragged: J1 changes every frame
+        angles = (round(i * 0.5 % 300 - 150, 1),) + OSD_STATE[0][1:]
+        compositor.update_layer("arm", (angles, OSD_STATE[1]), arm_primitives)
+        compositor.apply(work)
+
+    return {
+        "frames": args.frames,
+        "legacy_us": per_frame_us(lambda i: _legacy_osd(work)),
+        "cached_static_us": per_frame_us(lambda i: overlay(work)),
+        "cached_changing_us": per_frame_us(changing),
+        "renders": compositor.renders,
+    }
+
+
+def _print_osd(r: dict):
+    print(f"OSD overlay per frame ({r['frames']} frames)")
+    print(f"  putText every frame     {r['legacy_us']} us")
+    print(f"  cached, state static    {r['cached_static_us']} us")
+    print(f"  cached, J1 every frame  {r['cached_changing_us']} us  (renders={r['renders']})")
+
+
+# --- Video recording ---
+
+def bench_record(args) -> dict:
+    """Capture rate with and without the recorder running, and what it kept up with."""
+    cap = SimulatedCamera(width=args.width, height=args.height, fps=args.camera_fps,
+                          seed=args.seed)
+    cam = CameraManager(width=args.width, height=args.height, fps=args.camera_fps, cap=cap)
+    directory = tempfile.mkdtemp(prefix="mecharm-bench-")
+    recorder = VideoRecorder(cam, directory)
+    time.sleep(0.3)
+
+    def capture_fps():
+        seq0, cpu0 = cam.frame_seq, time.process_time()
+        time.sleep(args.duration)
+        return (round((cam.frame_seq - seq0) / args.duration, 1),
+                round(100 * (time.process_time() - cpu0) / args.duration, 1))
+
+    try:
+        idle_fps, idle_cpu = capture_fps()
+        recorder.start(segment_seconds=args.segment_seconds, quality=args.quality)
+        rec_fps, rec_cpu = capture_fps()
+        stats = recorder.stop()
+        segments = recorder.segments()
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cam.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "size": f"{args.width}x{args.height}",
+        "camera_fps": args.camera_fps,
+        "capture_fps_idle": idle_fps,
+        "capture_fps_recording": rec_fps,
+        "server_cpu_pct_idle": idle_cpu,
+        "server_cpu_pct_recording": rec_cpu,
+        "frames_written": stats["frames_written"],
+        "frames_dropped": stats["frames_dropped"],
+        "encode_ms_avg": stats["encode_ms_avg"],
+        "segments": len(segments),
+        "mb_written": round(sum(s["bytes"] for s in segments) / 1e6, 2),
+    }
+
+
+def _print_record(r: dict):
+    print(f"Video recording ({r['size']} at {r['camera_fps']} fps, encoder in a worker process)")
+    print(f"  capture fps      idle {r['capture_fps_idle']}  recording {r['capture_fps_recording']}")
+    print(f"  server cpu       idle {r['server_cpu_pct_idle']}%  recording"
+          f" {r['server_cpu_pct_recording']}%  (worker process not included)")
+    print(f"  frames written {r['frames_written']}, dropped {r['frames_dropped']},"
+          f" encode {r['encode_ms_avg']} ms avg; {r['segments']} segments, {r['mb_written']} MB")
+
+
+# --- Vision ---
+
+def _vision_frames(args, n):
+    """``n`` BGR frames: decoded from a recorded clip (looped) or from the simulator."""
+    if args.mjpeg_file:
+        with open(args.mjpeg_file, "rb") as f:
+            jpegs = split_frames(f.read())[:n]
+        if not jpegs:
+            raise SystemExit(f"no JPEG frames in {args.mjpeg_file}")
+        decoded = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+        return [decoded[i % len(decoded)] for i in range(n)]
+    cap = SimulatedCamera(width=args.width, height=args.height, seed=args.seed, paced=False)
+    return [cap.read()[1] for _ in range(n)]
+
+
+def bench_vision(args) -> dict:
+    """Red-box detection per frame: full frame vs ROI tracking vs coarse-to-fine."""
+    moving = _vision_frames(args, args.frames)
+    still = [moving[0]] * args.frames
+
+    def run(detector, frames):
+        out = []
+        t0 = time.process_time()
+        for frame in frames:
+            found = detector(frame, [])
+            out.append(found[0].center if found else None)
+        return out, round((time.process_time() - t0) / len(frames) * 1e6, 1)
+
+    h, w = moving[0].shape[:2]
+    result = {"size": f"{w}x{h}", "frames": args.frames,
+              "source": args.mjpeg_file or "simulated"}
+    for name, frames in (("stationary", still), ("moving", moving)):
+        full, full_us = run(ColorBlobs("red", min_area=BOX_MIN_AREA), frames)
+        tracker = TrackedBlobs("red", min_area=BOX_MIN_AREA, full_every=args.full_every)
+        tracked, tracked_us = run(tracker, frames)
+        result[name] = {
+            "full_us": full_us,
+            "tracked_us": tracked_us,
+            "speedup": round(full_us / tracked_us, 1) if tracked_us else None,
+            "mismatches": sum(a != b for a, b in zip(full, tracked)),
+            **tracker.stats(),
+        }
+
+    # Coarse-to-fine: same detections, measured at full resolution either way
+    full, full_us = run(ColorBlobs("red", min_area=BOX_MIN_AREA), moving)
+    pyramid, pyramid_us = run(ColorBlobs("red", min_area=BOX_MIN_AREA, scale=args.scale),
+                              moving)
+    result["pyramid"] = {
+        "scale": args.scale,
+        "full_us": full_us,
+        "pyramid_us": pyramid_us,
+        "speedup": round(full_us / pyramid_us, 1) if pyramid_us else None,
+        "found": sum(c is not None for c in full),
+        "mismatches": sum(a != b for a, b in zip(full, pyramid)),
+        "max_centre_error_px": max((abs(a[0] - b[0]) + abs(a[1] - b[1])
+                                    for a, b in zip(full, pyramid) if a and b), default=0),
+    }
+
+    # Three colours: a ColorBlobs pass each vs one ColorClasses lookup-table pass
+    colours = ("red", "green", "blue")
+    scene = [frame.copy() for frame in moving[:args.frames // 4 or 1]]
+    for frame in scene:
+        frame[h // 8:h // 4, w // 2:w * 5 // 8] = (40, 200, 40)
+        frame[h * 5 // 8:h * 3 // 4, w * 3 // 4:w * 7 // 8] = (200, 60, 30)
+    per_colour = [ColorBlobs(c, min_area=BOX_MIN_AREA) for c in colours]
+    one_us = run(per_colour[0], scene)[1]
+    multi = {"one_colour_us": one_us}
+    for name, stages in (("three_passes", per_colour),
+                         ("lookup_table", [ColorClasses(colours, min_area=BOX_MIN_AREA)])):
+        t0 = time.process_time()
+        for frame in scene:
+            found = run_stages(stages, frame)
+        multi[name + "_us"] = round((time.process_time() - t0) / len(scene) * 1e6, 1)
+        multi[name + "_found"] = sorted(d.label for d in found)
+    multi["lookup_vs_one"] = round(multi["lookup_table_us"] / one_us, 2) if one_us else None
+    result["three_colours"] = multi
+    return result
+
+
+def _print_vision(r: dict):
+    print(f"Red-box detection per frame ({r['size']}, {r['frames']} {r['source']} frames,"
+          " CPU time)")
+    for name in ("stationary", "moving"):
+        v = r[name]
+        print(f"  {name:<10}  full frame {v['full_us']} us   tracked {v['tracked_us']} us"
+              f"  ({v['speedup']}x)   roi/full passes {v['roi_passes']}/{v['full_passes']},"
+              f" {v['pixels_per_pass']} px/pass, centre mismatches {v['mismatches']}")
+    p = r["pyramid"]
+    print(f"  pyramid     full frame {p['full_us']} us   scale {p['scale']} {p['pyramid_us']} us"
+          f"  ({p['speedup']}x)   found in {p['found']} frames, centre mismatches"
+          f" {p['mismatches']}, max error {p['max_centre_error_px']} px")
+    m = r["three_colours"]
+    print(f"  3 colours   one colour {m['one_colour_us']} us   a pass each {m['three_passes_us']} us"
+          f"   lookup table {m['lookup_table_us']} us ({m['lookup_vs_one']}x one colour)"
+          f"  (found {', '.join(m['lookup_table_found'])})")
+
+
+# --- Entry point ---
+
+def main():
+    parser = argparse.ArgumentParser(description="MechArm control-path benchmarks")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("arm", help="ArmController command-to-wire latency")
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--rate", type=float, default=25.0, help="angle commands/s (frontend: 25)")
+    p.add_argument("--gripper-rate", type=float, default=2.0)
+    p.add_argument("--sync-rate", type=float, default=2.0)
+    p.add_argument("--idle", type=float, default=2.0, help="seconds of idle CPU measurement")
+    p.add_argument("--write-ms", type=float, default=3.0)
+    p.add_argument("--read-ms", type=float, default=10.0)
+    p.add_argument("--jitter-ms", type=float, default=1.0)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--mode", choices=["event", "poll", "both"], default="both",
+                   help="command loop variant; 'both' reports poll → event")
+    p.add_argument("--filter", choices=sorted(FILTER_PRESETS), default="deadband",
+                   help="teleop filter preset ('smooth' alters values, so cmd→wire"
+                        " matching only counts exact passes)")
+    p.add_argument("--hold", type=float, default=0.0,
+                   help="fraction of each second the J1 slider is held still")
+    p.add_argument("--noise", type=float, default=0.0,
+                   help="std-dev (deg) of jitter on a held J2 slider")
+    p.set_defaults(run=bench_arm, show=_print_arm)
+
+    p = sub.add_parser("video", help="MJPEG encode cost vs number of viewers")
+    p.add_argument("--duration", type=float, default=5.0)
+    p.add_argument("--viewers", default="1,2,4,8", help="comma-separated viewer counts")
+    p.add_argument("--mode", choices=["broadcast", "per-client", "both"], default="both",
+                   help="'per-client' is the old one-encode-per-viewer /video loop")
+    p.add_argument("--fps", type=int, default=12, help="stream fps (CameraManager default)")
+    p.add_argument("--quality", type=int, default=65)
+    p.add_argument("--camera-fps", type=float, default=30.0)
+    p.add_argument("--slow", type=int, default=0,
+                   help="number of viewers on a constrained link")
+    p.add_argument("--slow-kbps", type=float, default=800.0,
+                   help="bandwidth of each constrained viewer's link")
+    p.add_argument("--mjpeg-file", default=None,
+                   help="replay a recorded MJPEG clip instead of the synthetic camera")
+    p.add_argument("--mjpeg", action="store_true",
+                   help="take the camera's JPEGs as-is (passthrough on the top rung)")
+    p.add_argument("--no-osd", action="store_true", help="broadcast without the overlay")
+    p.add_argument("--rendition", default=None, help="pin broadcast viewers to one rung")
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(run=bench_video, show=_print_video)
+
+    p = sub.add_parser("osd", help="overlay cost: per-frame putText vs cached layers")
+    p.add_argument("--frames", type=int, default=2000)
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(run=bench_osd, show=_print_osd)
+
+    p = sub.add_parser("record", help="capture rate while recording video segments")
+    p.add_argument("--duration", type=float, default=5.0, help="seconds idle, then recording")
+    p.add_argument("--width", type=int, default=480)
+    p.add_argument("--height", type=int, default=360)
+    p.add_argument("--camera-fps", type=float, default=30.0)
+    p.add_argument("--quality", type=int, default=65)
+    p.add_argument("--segment-seconds", type=float, default=2.0)
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(run=bench_record, show=_print_record)
+
+    p = sub.add_parser("vision", help="red-box detection: full frame vs ROI tracking")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--width", type=int, default=640)
+    p.add_argument("--height", type=int, default=480)
+    p.add_argument("--full-every", type=int, default=30,
+                   help="tracked passes between full-frame searches")
+    p.add_argument("--scale", type=float, default=0.5, help="coarse pass size for the pyramid")
+    p.add_argument("--mjpeg-file", default=None,
+                   help="recorded clip (.mjpeg segment or /video capture) instead of the simulator")
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(run=bench_vision, show=_print_vision)
+
+    args = parser.parse_args()
+    if args.json:
+        with contextlib.redirect_stdout(io.StringIO()):  # camera/arm logs would break the JSON
+            result = args.run(args)
+    else:
+        result = args.run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        args.show(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""SerialBus — single owner of the arm's serial link, with priority scheduling."""
+
+import itertools
+import threading
+import time
+
+# Priority classes, most urgent first
+SAFETY = 0
+MOTION = 1
+GRIPPER = 2
+TELEMETRY = 3
+PRIORITY_NAMES = ("safety", "motion", "gripper", "telemetry")
+
+
+class BusTimeout(TimeoutError):
+    """A read's deadline passed before the bus got to it."""
+
+
+class _Request:
+    __slots__ = ("priority", "seq", "key", "fn", "args", "deadline",
+                 "t_submit", "done", "result", "error")
+
+    def __init__(self, priority, seq, key, fn, args, deadline):
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.deadline = deadline
+        self.t_submit = time.monotonic()
+        self.done = None
+        self.result = None
+        self.error = None
+
+
+class SerialBus:
+    """Runs every call on ``mc`` from one worker thread, highest priority first.
+
+    Writes are fire-and-forget and keyed: a pending write is replaced by a
+    newer one with the same key at the same or more urgent priority, so only
+    the latest target for e.g. "angles" ever reaches the wire. Blocking calls
+    (reads) may carry a deadline and are dropped with BusTimeout if it
+    passes while they are still queued.
+    """
+
+    def __init__(self, mc):
+        self.mc = mc
+        self._cond = threading.Condition()
+        self._pending = []  # unsorted; the queue is a handful of entries at most
+        self._by_key = {}
+        self._seq = itertools.count()
+        self._running = True
+
+        self._stats = {name: {"submitted": 0, "executed": 0, "coalesced": 0,
+                              "expired": 0, "errors": 0, "wait_ms_sum": 0.0,
+                              "wait_ms_max": 0.0}
+                       for name in PRIORITY_NAMES}
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # --- Submission ---
+
+    def write(self, priority, key, fn, *args):
+        """Queue ``fn(*args)`` without waiting, superseding a pending write with ``key``."""
+        with self._cond:
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["submitted"] += 1
+            old = self._by_key.get(key)
+            if old is not None and old.priority >= priority:
+                self._pending.remove(old)
+                self._stats[PRIORITY_NAMES[old.priority]]["coalesced"] += 1
+            req = _Request(priority, next(self._seq), key, fn, args, None)
+            self._pending.append(req)
+            self._by_key[key] = req
+            self._cond.notify()
+
+    def call(self, priority, fn, *args, timeout=None):
+        """Run ``fn(*args)`` on the bus and return its result.
+
+        ``timeout`` (seconds) bounds the time spent queued; raises BusTimeout
+        if the call never started, or re-raises the call's own exception.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        req = _Request(priority, next(self._seq), None, fn, args, deadline)
+        req.done = threading.Event()
+        with self._cond:
+            if not self._running:
+                raise BusTimeout("bus shut down")
+            self._stats[PRIORITY_NAMES[priority]]["submitted"] += 1
+            self._pending.append(req)
+            self._cond.notify()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    # --- Worker ---
+
+    def _next(self):
+        """Pop the most urgent request. Caller holds _cond."""
+        req = min(self._pending, key=lambda r: (r.priority, r.seq))
+        self._pending.remove(req)
+        if req.key is not None and self._by_key.get(req.key) is req:
+            del self._by_key[req.key]
+        return req
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                req = self._next()
+                now = time.monotonic()
+                stats = self._stats[PRIORITY_NAMES[req.priority]]
+                if req.deadline is not None and now > req.deadline:
+                    stats["expired"] += 1
+                    req.error = BusTimeout("bus busy past read deadline")
+                    req.done.set()
+                    continue
+                wait_ms = (now - req.t_submit) * 1000
+                stats["wait_ms_sum"] += wait_ms
+                stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+                stats["executed"] += 1
+            try:
+                req.result = req.fn(*req.args)
+            except Exception as e:
+                req.error = e
+                with self._cond:
+                    stats["errors"] += 1
+            if req.done is not None:
+                req.done.set()
+        self._fail_pending()
+
+    def _fail_pending(self):
+        with self._cond:
+            pending, self._pending = self._pending, []
+            self._by_key.clear()
+        for req in pending:
+            if req.done is not None:
+                req.error = BusTimeout("bus shut down")
+                req.done.set()
+
+    # --- Introspection ---
+
+    def stats(self) -> dict:
+        """Per-priority counters, current queue depth and mean/max queue wait."""
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES}
+            for req in self._pending:
+                depth[PRIORITY_NAMES[req.priority]] += 1
+            out = {}
+            for name, s in self._stats.items():
+                n = s["executed"]
+                out[name] = {
+                    "depth": depth[name],
+                    "submitted": s["submitted"],
+                    "executed": n,
+                    "coalesced": s["coalesced"],
+                    "expired": s["expired"],
+                    "errors": s["errors"],
+                    "wait_ms_avg": round(s["wait_ms_sum"] / n, 2) if n else 0.0,
+                    "wait_ms_max": round(s["wait_ms_max"], 2),
+                }
+            return out
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
@@ -1,13 +1,11 @@
-"""CameraManager — threaded capture with adaptive quality/fps."""
+"""CameraManager — threaded double-buffered capture and JPEG encoding."""
 
 import threading
 import time
 import cv2
 
-MIN_QUALITY = 40
-MAX_QUALITY = 75
-MIN_FPS = 5
-MAX_FPS = 15
+from .latency import PipelineTimings
+from .mjpeg import ensure_huffman
 
 CAMERA_OPEN_RETRIES = 5
 CAMERA_OPEN_DELAY = 2  # seconds between retries
@@ -18,23 +16,106 @@ def _log(msg: str):
     print(msg, flush=True)
 
 
+class _Buffer:
+    __slots__ = ("image", "jpeg", "readers", "seq", "t_capture", "decode_lock")
+
+    def __init__(self):
+        self.image = None  # BGR pixels; decoded lazily in passthrough mode
+        self.jpeg = None  # the camera's own JPEG (1-D uint8) in passthrough mode
+        self.readers = 0
+        self.seq = 0
+        self.t_capture = 0.0
+        self.decode_lock = threading.Lock()
+
+
+class FrameHandle:
+    """A captured frame on loan from CameraManager: read-only, never copied.
+
+    ``image`` is a read-only view of the capture buffer, ``seq`` increases by
+    one per captured frame and ``t_capture`` is the time.monotonic() at
+    which ``cap.read()`` returned. The buffer is not reused while the handle
+    is held; release() it (or use ``with``) once done. Copy ``image`` before
+    drawing on it.
+
+    In MJPEG passthrough mode ``jpeg`` holds the camera's compressed frame
+    and ``image`` is decoded on first access only, once per frame however
+    many consumers ask (None if the frame is corrupt); otherwise ``jpeg``
+    is None.
+    """
+
+    __slots__ = ("seq", "t_capture", "_cam", "_buf")
+
+    def __init__(self, cam, buf):
+        self._cam = cam
+        self._buf = buf
+        self.seq = buf.seq
+        self.t_capture = buf.t_capture
+
+    @property
+    def jpeg(self):
+        return self._buf.jpeg
+
+    @property
+    def image(self):
+        buf = self._buf
+        if buf.image is None:
+            with buf.decode_lock:
+                if buf.image is None:
+                    buf.image = cv2.imdecode(buf.jpeg, cv2.IMREAD_COLOR)
+            if buf.image is None:
+                return None  # corrupt camera frame
+        view = buf.image.view()
+        view.flags.writeable = False
+        return view
+
+    def release(self):
+        if self._buf is not None:
+            self._cam._release(self._buf)
+            self._buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
 class CameraManager:
-    def __init__(self, device=0, width=480, height=360, fps=12, quality=65):
+    def __init__(self, device=0, width=480, height=360, fps=12, quality=65, cap=None,
+                 mjpeg=False):
+        self.width = width
+        self.height = height
         self.fps = fps
         self.quality = quality
-        self._frame = None
+        # Double-buffered capture: the producer fills a back buffer while
+        # consumers hold the front one. A third buffer is only allocated if
+        # a slow consumer still holds the back buffer when it is due for reuse.
+        self._buffers = [_Buffer(), _Buffer()]
+        self._front = None
+        self._seq = 0  # bumped once per captured frame
         self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
         self._running = True
 
-        # Adaptive video stats
+        # Delivery counters across all clients; per-client adaptation lives in stream.py
         self._frames_sent = 0
         self._frames_skipped = 0
         self._bytes_sent = 0
-        self._last_stats_reset = time.monotonic()
         self._last_deliver_time = 0.0
         self._stats_lock = threading.Lock()
+        # Per-stage latency histograms; the capture stage is filled here, the rest by stream.py
+        self.timings = PipelineTimings()
 
-        self._cap = self._open_camera(device, width, height)
+        # ``mjpeg`` asks the camera for its native MJPEG and keeps frames compressed
+        # (see FrameHandle); ``passthrough`` says whether the device went along.
+        self.mjpeg = mjpeg
+        self.passthrough = False
+
+        # ``cap`` injects a VideoCapture-like object (e.g. sim.SimulatedCamera,
+        # sim.MjpegFileCamera)
+        if cap is not None and mjpeg:
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self._cap = cap if cap is not None else self._open_camera(device, width, height)
 
         self._thread = threading.Thread(target=self._capture_loop, daemon=True)
         self._thread.start()
@@ -48,6 +129,9 @@ class CameraManager:
                 cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
                 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
                 cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                if self.mjpeg:
+                    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+                    cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)  # hand us the compressed frame
                 _log(f"Camera opened on attempt {attempt}.")
                 return cap
             _log(f"Camera not available (attempt {attempt}), retrying in {CAMERA_OPEN_DELAY}s...")
@@ -60,21 +144,82 @@ class CameraManager:
         """Continuously grab frames at target fps."""
         if self._cap is None:
             return
+        last_capture = 0.0
         while self._running:
             interval = 1.0 / self.fps
             t0 = time.monotonic()
-            ret, frame = self._cap.read()
+            buf = self._back_buffer()
+            ret, frame = self._cap.read(None if self.passthrough else buf.image)
             if ret:
+                t_capture = time.monotonic()
+                if last_capture:
+                    self.timings.record("capture_interval", (t_capture - last_capture) * 1000)
+                last_capture = buf.t_capture = t_capture
+                if frame.ndim < 3:  # compressed: a 1xN byte row from CONVERT_RGB=0
+                    if not self.passthrough:
+                        _log("Camera: MJPEG passthrough active.")
+                        self.passthrough = True
+                    buf.jpeg = frame.reshape(-1)
+                    buf.image = None
+                else:
+                    buf.image = frame  # same array unless the size changed
                 with self._lock:
-                    self._frame = frame
+                    self._seq += 1
+                    buf.seq = self._seq
+                    self._front = buf
+                    self._frame_ready.notify_all()
             elapsed = time.monotonic() - t0
             if elapsed < interval:
                 time.sleep(interval - elapsed)
 
-    def get_frame(self):
-        """Return the latest captured frame (or None)."""
+    def _back_buffer(self) -> _Buffer:
+        """A buffer that is neither the front frame nor held by any reader."""
+        with self._lock:
+            for buf in self._buffers:
+                if buf is not self._front and not buf.readers:
+                    return buf
+            buf = _Buffer()
+            self._buffers.append(buf)
+            return buf
+
+    def _release(self, buf):
+        with self._lock:
+            buf.readers -= 1
+
+    @property
+    def frame_seq(self) -> int:
+        """Sequence number of the latest captured frame (0 before the first)."""
+        return self._seq
+
+    def acquire_frame(self):
+        """Borrow the latest frame as a FrameHandle without copying it (or None)."""
         with self._lock:
-            return self._frame.copy() if self._frame is not None else None
+            buf = self._front
+            if buf is None:
+                return None
+            buf.readers += 1
+        return FrameHandle(self, buf)
+
+    def get_frame(self):
+        """Return a private, writable copy of the latest captured frame (or None)."""
+        handle = self.acquire_frame()
+        if handle is None:
+            return None
+        with handle:
+            image = handle.image
+            return image.copy() if image is not None else None
+
+    def wait_frame(self, after_seq: int, timeout: float = None) -> int:
+        """Block until a frame newer than ``after_seq`` is captured; return its sequence
+        number (unchanged on timeout or shutdown)."""
+        with self._frame_ready:
+            self._frame_ready.wait_for(lambda: self._seq != after_seq or not self._running,
+                                       timeout)
+            return self._seq
+
+    def camera_jpeg(self, handle) -> bytes:
+        """The camera's own JPEG for ``handle``, fit to send to a browser (passthrough only)."""
+        return ensure_huffman(handle.jpeg.tobytes())
 
     def encode_jpeg(self, frame, quality=None):
         """Encode a frame as JPEG bytes."""
@@ -83,46 +228,24 @@ class CameraManager:
         return jpg.tobytes() if ret else None
 
     def record_frame_sent(self, nbytes: int):
-        """Record a successfully delivered frame for adaptive tracking."""
+        """Record a successfully delivered frame (all clients, for diagnostics)."""
         with self._stats_lock:
             self._frames_sent += 1
             self._bytes_sent += nbytes
             self._last_deliver_time = time.monotonic()
 
-    def record_frame_skipped(self):
-        """Record a frame that couldn't be delivered in time."""
-        with self._stats_lock:
-            self._frames_skipped += 1
-
-    def adapt(self):
-        """Adjust quality/fps based on delivery success rate. Call periodically."""
+    def record_frame_skipped(self, count: int = 1):
+        """Record frames that couldn't be delivered in time."""
         with self._stats_lock:
-            now = time.monotonic()
-            elapsed = now - self._last_stats_reset
-            if elapsed < 5.0:
-                return  # adapt every 5 seconds
-            total = self._frames_sent + self._frames_skipped
-            if total == 0:
-                self._last_stats_reset = now
-                return
-            success_rate = self._frames_sent / total
-            self._frames_sent = 0
-            self._frames_skipped = 0
-            self._bytes_sent = 0
-            self._last_stats_reset = now
-
-        # If delivery rate < 80%, reduce quality/fps
-        if success_rate < 0.8:
-            self.quality = max(MIN_QUALITY, self.quality - 5)
-            self.fps = max(MIN_FPS, self.fps - 1)
-        elif success_rate > 0.95 and self.quality < MAX_QUALITY:
-            self.quality = min(MAX_QUALITY, self.quality + 3)
-            self.fps = min(MAX_FPS, self.fps + 1)
+            self._frames_skipped += count
 
     def get_stats(self) -> dict:
         """Return current stats for diagnostics."""
         with self._stats_lock:
             return {
+                "frame_seq": self._seq,
+                "passthrough": self.passthrough,
+                "capture_buffers": len(self._buffers),
                 "fps": self.fps,
                 "quality": self.quality,
                 "frames_sent": self._frames_sent,
@@ -136,6 +259,8 @@ class CameraManager:
             return
         _log("Camera shutdown: stopping capture thread...")
         self._running = False
+        with self._frame_ready:
+            self._frame_ready.notify_all()
         self._thread.join(timeout=2)
         if self._thread.is_alive():
             _log("Camera shutdown: WARNING — capture thread did not stop in 2s")
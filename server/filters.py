@@ -0,0 +1,151 @@
+"""CommandFilter — per-joint deadband, slew-rate limit and One-Euro smoothing for teleop targets."""
+
+import math
+
+import numpy as np
+
+DEFAULT_DEADBAND = 0.2  # degrees; slider jitter below this never reaches the bus
+DEFAULT_MIN_CUTOFF = 1.0  # Hz, One-Euro smoothing when the slider is still
+DEFAULT_BETA = 0.05  # One-Euro speed coefficient: higher = less lag when moving fast
+DEFAULT_D_CUTOFF = 1.0  # Hz, cutoff for the derivative estimate
+MAX_DT = 0.1  # clamp after idle gaps so the first step is not a huge jump
+SETTLE_EPS = 0.01  # degrees; "arrived" tolerance when the deadband is off
+
+
+def _per_joint(value, joints):
+    if value is None:
+        return None
+    value = np.asarray(value, dtype=float)
+    if value.ndim and value.shape != (joints,):
+        raise ValueError(f"expected one value or {joints}, got {value.size}")
+    return np.broadcast_to(value, (joints,)).copy()
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class CommandFilter:
+    """Turns a stream of teleop goals into the joint targets worth sending.
+
+    The command loop calls set_goal() when a new teleop target arrives and
+    update() on each send slot while ``settled`` is False. update() returns
+    the next target, or None when it differs from the last one sent by less
+    than the deadband on every joint. Stages (each optional): One-Euro
+    smoothing of the goal, then a max slew rate, then the deadband.
+    """
+
+    def __init__(self, joints=6, deadband=DEFAULT_DEADBAND, max_slew=None,
+                 one_euro=False, min_cutoff=DEFAULT_MIN_CUTOFF, beta=DEFAULT_BETA,
+                 d_cutoff=DEFAULT_D_CUTOFF):
+        self.joints = joints
+        self._goal = None
+        self._smoothed = None
+        self._d_smoothed = np.zeros(joints)
+        self._out = None
+        self._last_sent = None
+        self._t_prev = None
+        self.counters = {"updates": 0, "forwarded": 0, "dropped": 0}
+        self.configure(deadband=deadband, max_slew=max_slew, one_euro=one_euro,
+                       min_cutoff=min_cutoff, beta=beta, d_cutoff=d_cutoff)
+
+    def configure(self, **options):
+        """Update any of deadband, max_slew, one_euro, min_cutoff, beta, d_cutoff.
+
+        ``deadband`` and ``max_slew`` (deg/s) take a scalar or one value per
+        joint; None or 0 disables that stage. Negative deadband / max_slew /
+        beta or non-positive cutoffs raise ValueError and change nothing.
+        """
+        deadband = max_slew = None
+        if "deadband" in options:
+            deadband = _per_joint(options["deadband"] or 0.0, self.joints)
+            if (deadband < 0).any():
+                raise ValueError("deadband must be >= 0")
+        if "max_slew" in options:
+            max_slew = _per_joint(options["max_slew"] or None, self.joints)
+            if max_slew is not None and (max_slew < 0).any():
+                raise ValueError("max_slew must be >= 0")
+        for key in ("min_cutoff", "d_cutoff"):
+            if options.get(key) is not None and not options[key] > 0:
+                raise ValueError(f"{key} must be > 0")
+        if options.get("beta") is not None and not options["beta"] >= 0:
+            raise ValueError("beta must be >= 0")
+        if "deadband" in options:
+            self.deadband = deadband
+        if "max_slew" in options:
+            self.max_slew = max_slew
+        for key in ("one_euro", "min_cutoff", "beta", "d_cutoff"):
+            if key in options:
+                setattr(self, key, options[key])
+
+    def config(self) -> dict:
+        return {
+            "deadband": self.deadband.tolist(),
+            "max_slew": None if self.max_slew is None else self.max_slew.tolist(),
+            "one_euro": self.one_euro,
+            "min_cutoff": self.min_cutoff,
+            "beta": self.beta,
+            "d_cutoff": self.d_cutoff,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.deadband.any()) or self.max_slew is not None or self.one_euro
+
+    def reset(self, angles):
+        """Re-anchor on a target that bypassed the filter (trajectory, reset...)."""
+        a = np.asarray(angles, dtype=float)
+        self._goal = a.copy()
+        self._smoothed = a.copy()
+        self._d_smoothed[:] = 0.0
+        self._out = a.copy()
+        self._last_sent = a.copy()
+        self._t_prev = None
+
+    def set_goal(self, angles):
+        self.counters["updates"] += 1
+        if self._goal is None:
+            self.reset(angles)
+            self._last_sent = None  # first goal always goes out
+            return
+        self._goal = np.asarray(angles, dtype=float)
+
+    @property
+    def goal(self):
+        """The goal being stepped toward (list), or None before the first one."""
+        return None if self._goal is None else [round(float(v), 2) for v in self._goal]
+
+    @property
+    def settled(self) -> bool:
+        """True once further update() calls would not send anything new."""
+        if self._goal is None:
+            return True
+        if self._last_sent is None:
+            return False
+        tol = np.maximum(self.deadband, SETTLE_EPS)
+        return bool(np.all(np.abs(self._goal - self._last_sent) <= tol))
+
+    def update(self, now: float):
+        """Advance one step toward the goal; return angles to send or None."""
+        dt = MAX_DT if self._t_prev is None else min(max(now - self._t_prev, 1e-3), MAX_DT)
+        self._t_prev = now
+        x = self._goal
+        if self.one_euro:
+            dx = (x - self._smoothed) / dt
+            self._d_smoothed += _alpha(self.d_cutoff, dt) * (dx - self._d_smoothed)
+            cutoff = self.min_cutoff + self.beta * np.abs(self._d_smoothed)
+            self._smoothed = self._smoothed + _alpha(cutoff, dt) * (x - self._smoothed)
+            x = self._smoothed
+        if self.max_slew is not None:
+            limit = self.max_slew * dt
+            x = self._out + np.clip(x - self._out, -limit, limit)
+        self._out = x
+        if self._last_sent is not None and np.all(np.abs(x - self._last_sent) < self.deadband):
+            self.counters["dropped"] += 1
+            if self.settled:
+                self._t_prev = None
+            return None
+        self._last_sent = x.copy()
+        self.counters["forwarded"] += 1
+        return [round(float(v), 2) for v in x]
@@ -0,0 +1,268 @@
+"""MechArm 270 kinematics — batched forward kinematics in NumPy."""
+
+import numpy as np
+
+# Modified (Craig) DH table from Elephant Robotics' mechArm 270 docs.
+# Columns: alpha_{i-1} (rad), a_{i-1} (mm), d_i (mm), theta offset (rad)
+DH = np.array([
+    [0.0,         0.0,   114.0, 0.0],
+    [-np.pi / 2,  0.0,   0.0,   -np.pi / 2],
+    [0.0,         100.0, 0.0,   0.0],
+    [-np.pi / 2,  10.0,  96.0,  0.0],
+    [np.pi / 2,   0.0,   0.0,   0.0],
+    [-np.pi / 2,  0.0,   56.0,  0.0],
+])
+
+# Same table as mcp-server JOINT_LIMITS / HARDWARE.md (degrees)
+JOINT_LIMITS = np.array([
+    [-160.0, 160.0],
+    [-90.0, 90.0],
+    [-180.0, 45.0],
+    [-160.0, 160.0],
+    [-100.0, 100.0],
+    [-180.0, 180.0],
+])
+
+
+def _link_transforms(theta, alpha, a, d):
+    """Modified-DH transform for one joint across a batch: theta (N,) → (N, 4, 4)."""
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    T = np.zeros(theta.shape + (4, 4))
+    T[:, 0, 0] = ct
+    T[:, 0, 1] = -st
+    T[:, 0, 3] = a
+    T[:, 1, 0] = st * ca
+    T[:, 1, 1] = ct * ca
+    T[:, 1, 2] = -sa
+    T[:, 1, 3] = -sa * d
+    T[:, 2, 0] = st * sa
+    T[:, 2, 1] = ct * sa
+    T[:, 2, 2] = ca
+    T[:, 2, 3] = ca * d
+    T[:, 3, 3] = 1.0
+    return T
+
+
+def forward(angles, tool=None, all_frames=False):
+    """Flange (or tool) pose for a batch of joint vectors.
+
+    ``angles`` is (N, 6) or (6,) in degrees. ``tool`` is an optional 4x4
+    transform from the flange to the tool point. Returns (N, 4, 4) base→tool
+    transforms, or (N, 7, 4, 4) including the base and every joint frame when
+    ``all_frames`` is set. The only Python loop is over the six joints.
+    ValueError for any other shape.
+    """
+    q = np.radians(np.atleast_2d(np.asarray(angles, dtype=float)))
+    if q.ndim != 2 or q.shape[1] != len(DH):
+        raise ValueError(f"expected joint vectors of {len(DH)} angles, got shape {q.shape}")
+    n = q.shape[0]
+    T = np.broadcast_to(np.eye(4), (n, 4, 4)).copy()
+    frames = [T] if all_frames else None
+    for j, (alpha, a, d, offset) in enumerate(DH):
+        T = T @ _link_transforms(q[:, j] + offset, alpha, a, d)
+        if all_frames:
+            frames.append(T)
+    if tool is not None:
+        T = T @ np.asarray(tool, dtype=float)
+        if all_frames:
+            frames[-1] = T
+    return np.stack(frames, axis=1) if all_frames else T
+
+
+def to_coords(T) -> np.ndarray:
+    """Convert (N, 4, 4) transforms to pymycobot-style [x, y, z, rx, ry, rz] (mm, deg).
+
+    Rotation is reported as XYZ-fixed (roll, pitch, yaw) Euler angles.
+    """
+    T = np.asarray(T)
+    R = T[..., :3, :3]
+    ry = np.arctan2(-R[..., 2, 0], np.hypot(R[..., 0, 0], R[..., 1, 0]))
+    rx = np.arctan2(R[..., 2, 1], R[..., 2, 2])
+    rz = np.arctan2(R[..., 1, 0], R[..., 0, 0])
+    rpy = np.degrees(np.stack([rx, ry, rz], axis=-1))
+    return np.concatenate([T[..., :3, 3], rpy], axis=-1)
+
+
+def positions(angles, tool=None) -> np.ndarray:
+    """End-effector XYZ (mm) for a batch of joint vectors: (N, 6) → (N, 3)."""
+    return forward(angles, tool=tool)[:, :3, 3]
+
+
+def within_limits(angles) -> np.ndarray:
+    """Boolean mask of joint vectors that respect JOINT_LIMITS: (N, 6) → (N,)."""
+    q = np.atleast_2d(np.asarray(angles, dtype=float))
+    return np.all((q >= JOINT_LIMITS[:, 0]) & (q <= JOINT_LIMITS[:, 1]), axis=1)
+
+
+# --- Inverse kinematics ---
+
+IK_TOLERANCE_MM = 0.5
+IK_TOLERANCE_DEG = 0.5
+IK_MAX_ITER = 40
+IK_DAMPING = 1.0
+IK_MAX_STEP_DEG = 20.0
+ORIENTATION_WEIGHT = 100.0  # mm of error per radian, balances the residual
+SEED_CELL_MM = 10.0
+
+
+def euler_to_matrix(rx, ry, rz) -> np.ndarray:
+    """Inverse of to_coords' rotation convention: XYZ-fixed angles (deg) → 3x3."""
+    rx, ry, rz = np.radians([rx, ry, rz])
+    cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+    return np.array([
+        [cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx],
+        [sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx],
+        [-sy, cy * sx, cy * cx],
+    ])
+
+
+def _rotation_error(R_target, R):
+    """Axis-angle vector (rad) rotating each R in the batch onto R_target: (N,3,3) → (N,3)."""
+    E = R_target @ np.swapaxes(R, -1, -2)
+    cos = np.clip((np.trace(E, axis1=-2, axis2=-1) - 1.0) / 2.0, -1.0, 1.0)
+    angle = np.arccos(cos)
+    axis = np.stack([E[..., 2, 1] - E[..., 1, 2],
+                     E[..., 0, 2] - E[..., 2, 0],
+                     E[..., 1, 0] - E[..., 0, 1]], axis=-1)
+    sin = np.sin(angle)
+    scale = np.where(sin > 1e-6, angle / (2.0 * np.maximum(sin, 1e-12)), 0.5)
+    return axis * scale[..., None]
+
+
+class SeedGrid:
+    """Cached FK samples of the arm's vertical plane, bucketed for nearest lookup.
+
+    With J4 = 0 the links after J1 stay in the plane through the base axis,
+    so a target's J1 follows from atan2(y, x) and only (J2, J3, J5) need a
+    seed: the grid stores their (radius, height) at J1 = 0 and answers
+    nearest-neighbour queries from the 3x3 block of cells around a point.
+    """
+
+    def __init__(self, step=(5.0, 5.0, 10.0), tool=None, cell=SEED_CELL_MM):
+        j2 = np.arange(JOINT_LIMITS[1, 0], JOINT_LIMITS[1, 1] + 1e-9, step[0])
+        j3 = np.arange(JOINT_LIMITS[2, 0], JOINT_LIMITS[2, 1] + 1e-9, step[1])
+        j5 = np.arange(JOINT_LIMITS[4, 0], JOINT_LIMITS[4, 1] + 1e-9, step[2])
+        g2, g3, g5 = (g.ravel() for g in np.meshgrid(j2, j3, j5, indexing="ij"))
+        zeros = np.zeros_like(g2)
+        self.angles = np.stack([zeros, g2, g3, zeros, g5, zeros], axis=1)
+        xyz = positions(self.angles, tool=tool)
+        self.points = xyz[:, [0, 2]]  # (radius, height); y == 0 at J1 = 0
+        self.cell = cell
+
+        keys = self._keys(self.points)
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._order = order
+
+    def _keys(self, rz):
+        ij = np.floor(np.asarray(rz) / self.cell).astype(np.int64)
+        return ij[..., 0] * 100003 + ij[..., 1]
+
+    def nearest(self, xyz, k=3) -> np.ndarray:
+        """Up to ``k`` seed joint vectors whose FK lands closest to ``xyz``."""
+        x, y, z = xyz
+        j1 = np.degrees(np.arctan2(y, x))
+        rz = np.array([np.hypot(x, y), z])
+        base = np.floor(rz / self.cell).astype(np.int64)
+        idx = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                key = (base[0] + di) * 100003 + base[1] + dj
+                lo = np.searchsorted(self._sorted_keys, key, side="left")
+                hi = np.searchsorted(self._sorted_keys, key, side="right")
+                idx.append(self._order[lo:hi])
+        idx = np.concatenate(idx)
+        if not len(idx):  # target outside every sampled cell — fall back to a full scan
+            idx = np.arange(len(self.points))
+        d = np.sum((self.points[idx] - rz) ** 2, axis=1)
+        best = idx[np.argsort(d)[:k]]
+        seeds = self.angles[best].copy()
+        seeds[:, 0] = j1
+        return seeds
+
+
+class IKSolver:
+    """Damped least-squares IK, warm-started from the last solution and a SeedGrid.
+
+    ``target`` is [x, y, z] (position only) or [x, y, z, rx, ry, rz] in the
+    units of to_coords. The Jacobian is the geometric one, read off the joint
+    frames of a single forward(all_frames=True) call per iteration.
+    """
+
+    def __init__(self, tool=None, grid=None):
+        self.tool = tool
+        self._grid = grid
+        self.last_solution = None
+
+    @property
+    def grid(self) -> SeedGrid:
+        if self._grid is None:
+            self._grid = SeedGrid(tool=self.tool)
+        return self._grid
+
+    def _evaluate(self, q, p_target, R_target):
+        """Weighted pose residual and geometric Jacobian (per degree) at ``q``."""
+        frames = forward(q, all_frames=True)[0]
+        ee = frames[-1] if self.tool is None else frames[-1] @ self.tool
+        axes = frames[1:, :3, 2]  # joint i rotates about z of frame i
+        origins = frames[1:, :3, 3]
+        J = np.cross(axes, ee[:3, 3] - origins).T
+        err = p_target - ee[:3, 3]
+        if R_target is not None:
+            J = np.vstack([J, ORIENTATION_WEIGHT * axes.T])
+            err = np.concatenate([err, ORIENTATION_WEIGHT * _rotation_error(R_target, ee[None, :3, :3])[0]])
+        return err, J * (np.pi / 180.0)
+
+    def _converged(self, e, tol):
+        if np.linalg.norm(e[:3]) >= tol:
+            return False
+        return len(e) == 3 or np.linalg.norm(e[3:]) < ORIENTATION_WEIGHT * np.radians(IK_TOLERANCE_DEG)
+
+    def _refine(self, q, p_target, R_target, tol, max_iter):
+        """Levenberg-Marquardt: grow damping on a rejected step, shrink it on success."""
+        lam = IK_DAMPING
+        e, J = self._evaluate(q, p_target, R_target)
+        cost = e @ e
+        for _ in range(max_iter):
+            if self._converged(e, tol):
+                return q
+            dq = J.T @ np.linalg.solve(J @ J.T + lam ** 2 * np.eye(len(e)), e)
+            dq = np.clip(dq, -IK_MAX_STEP_DEG, IK_MAX_STEP_DEG)
+            q_new = np.clip(q + dq, JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+            e_new, J_new = self._evaluate(q_new, p_target, R_target)
+            cost_new = e_new @ e_new
+            if cost_new < cost:
+                q, e, J, cost = q_new, e_new, J_new, cost_new
+                lam = max(lam * 0.5, 1e-3)
+            else:
+                lam *= 4.0
+        return q if self._converged(e, tol) else None
+
+    def solve(self, target, seed=None, tol=IK_TOLERANCE_MM, max_iter=IK_MAX_ITER):
+        """Return joint angles (deg) reaching ``target``, or None if unreachable.
+
+        Candidate seeds are ``seed``, the last solution and the nearest grid
+        samples, tried closest-first; the first that converges within the
+        joint limits wins and becomes the next warm start.
+        """
+        target = np.asarray(target, dtype=float)
+        p_target = target[:3]
+        R_target = euler_to_matrix(*target[3:6]) if len(target) >= 6 else None
+
+        seeds = []
+        if seed is not None:
+            seeds.append(np.asarray(seed, dtype=float))
+        if self.last_solution is not None:
+            seeds.append(self.last_solution)
+        seeds.extend(self.grid.nearest(p_target))
+        seeds = np.clip(np.array(seeds), JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+        # Try the seed that already lands closest first (one batched FK call)
+        dist = np.linalg.norm(positions(seeds, tool=self.tool) - p_target, axis=1)
+
+        for q0 in seeds[np.argsort(dist, kind="stable")]:
+            q = self._refine(q0, p_target, R_target, tol, max_iter)
+            if q is not None:
+                self.last_solution = q
+                return q
+        return None
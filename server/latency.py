@@ -0,0 +1,92 @@
+"""PipelineTimings — fixed-bucket latency histograms for the video path."""
+
+import bisect
+import threading
+
+# Log-spaced bucket upper edges in ms, 0.1 ms .. ~6.5 s at ~20% steps. A
+# sample lands in the first bucket whose edge is >= it; the last bucket
+# (no edge) holds everything slower.
+EDGES_MS = tuple(round(0.1 * 1.2 ** i, 3) for i in range(62))
+
+# Stages timed per frame, in pipeline order
+STAGES = (
+    "capture_interval",  # between consecutive captures (camera)
+    "osd",               # overlay on the encoder thread, once per frame
+    "encode",            # resize + imencode, per rendition
+    "queue_wait",        # encoded frame waiting for a client's send loop to take it
+    "send",              # handing one frame to the client (socket write / ack for /ws/video)
+    "capture_to_sent",   # end to end: capture → send complete
+)
+
+
+def summarize(counts, total, n) -> dict:
+    """n / mean / approximate percentiles (bucket upper edges) of one histogram."""
+    out = {"n": n, "mean": round(total / n, 2) if n else None,
+           "p50": None, "p90": None, "p99": None, "max": None}
+    if not n:
+        return out
+    targets = {"p50": 0.5 * n, "p90": 0.9 * n, "p99": 0.99 * n}
+    seen = 0
+    for i, c in enumerate(counts):
+        if not c:
+            continue
+        seen += c
+        edge = EDGES_MS[min(i, len(EDGES_MS) - 1)]  # the overflow bucket reads as the last edge
+        for key, target in list(targets.items()):
+            if seen >= target:
+                out[key] = edge
+                del targets[key]
+        out["max"] = edge
+    return out
+
+
+class PipelineTimings:
+    """One histogram per entry of ``stages`` (the video path's STAGES by default), from any thread.
+
+    record() is a bisect and three additions under a lock, cheap enough
+    for every frame and every client. state() copies the raw counts so a
+    reader can diff two states into the histogram of just that interval.
+    """
+
+    def __init__(self, stages=STAGES):
+        self.stages = tuple(stages)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = {s: [0] * (len(EDGES_MS) + 1) for s in self.stages}
+            self._total = dict.fromkeys(self.stages, 0.0)
+            self._n = dict.fromkeys(self.stages, 0)
+
+    def record(self, stage, ms):
+        i = bisect.bisect_left(EDGES_MS, ms)
+        with self._lock:
+            self._counts[stage][i] += 1
+            self._total[stage] += ms
+            self._n[stage] += 1
+
+    def state(self) -> dict:
+        with self._lock:
+            return {s: (list(self._counts[s]), self._total[s], self._n[s]) for s in self.stages}
+
+    @staticmethod
+    def delta(new, old) -> dict:
+        """The state of what was recorded between two state() calls."""
+        return {s: ([a - b for a, b in zip(new[s][0], old[s][0])],
+                    new[s][1] - old[s][1], new[s][2] - old[s][2]) for s in new}
+
+    @staticmethod
+    def report(state, buckets=False) -> dict:
+        """Summaries (ms) per stage; ``buckets`` adds the non-empty [edge_ms, count] pairs."""
+        out = {}
+        for stage, (counts, total, n) in state.items():
+            out[stage] = summarize(counts, total, n)
+            if buckets:
+                out[stage]["buckets"] = [
+                    [EDGES_MS[i] if i < len(EDGES_MS) else None, c]
+                    for i, c in enumerate(counts) if c]
+        return out
+
+    def snapshot(self, buckets=False) -> dict:
+        return self.report(self.state(), buckets)
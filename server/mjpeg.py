@@ -0,0 +1,69 @@
+"""MJPEG helpers — splitting recorded streams and making camera JPEGs self-contained."""
+
+import cv2
+import numpy as np
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+DHT = 0xC4
+SOS = 0xDA
+
+
+def split_frames(data: bytes) -> list[bytes]:
+    """JPEG frames found in ``data``: raw concatenated MJPEG or a multipart /video capture."""
+    frames = []
+    pos = 0
+    while True:
+        start = data.find(SOI, pos)
+        if start < 0:
+            break
+        end = data.find(EOI, start + 2)
+        if end < 0:
+            break
+        frames.append(data[start:end + 2])
+        pos = end + 2
+    return frames
+
+
+def _segments(jpg):
+    """(marker, offset) of each header segment up to and including SOS."""
+    pos = 2
+    while pos + 4 <= len(jpg) and jpg[pos] == 0xFF:
+        marker = jpg[pos + 1]
+        yield marker, pos
+        if marker == SOS:
+            return
+        pos += 2 + int.from_bytes(jpg[pos + 2:pos + 4], "big")
+
+
+def _standard_dht() -> bytes:
+    """The Annex K Huffman tables, taken from a tiny libjpeg encode (optimize off)."""
+    ok, jpg = cv2.imencode(".jpg", np.zeros((8, 8, 3), np.uint8),
+                           [cv2.IMWRITE_JPEG_OPTIMIZE, 0])
+    jpg = jpg.tobytes()
+    out = b""
+    for marker, pos in _segments(jpg):
+        if marker == DHT:
+            out += jpg[pos:pos + 2 + int.from_bytes(jpg[pos + 2:pos + 4], "big")]
+    return out
+
+
+STANDARD_DHT = _standard_dht()
+
+
+def ensure_huffman(jpg: bytes) -> bytes:
+    """Insert the standard Huffman tables if ``jpg`` lacks them.
+
+    UVC cameras usually omit DHT from MJPEG frames and rely on the decoder
+    assuming the standard tables; browsers do not, so passthrough frames
+    need them put back before SOS.
+    """
+    sos = None
+    for marker, pos in _segments(jpg):
+        if marker == DHT:
+            return jpg
+        if marker == SOS:
+            sos = pos
+    if sos is None:
+        return jpg
+    return jpg[:sos] + STANDARD_DHT + jpg[sos:]
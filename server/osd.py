@@ -0,0 +1,251 @@
+"""OsdCompositor — cached on-screen-display layers blended into video frames."""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+GREEN = (0, 255, 0)
+CYAN = (255, 255, 0)
+RED = (0, 0, 255)
+
+ARM_ORIGIN = (10, 30)
+LINE_HEIGHT = 25
+SPRITE_CACHE_SIZE = 512  # rendered text strings kept for reuse across layer renders
+
+
+# --- Primitives ---
+# Plain tuples so a layer can tell cheaply whether its content changed.
+
+def text(s, org, color=GREEN, scale=0.6, thickness=2):
+    return ("text", str(s), (int(org[0]), int(org[1])), tuple(color), scale, thickness)
+
+
+def rect(p1, p2, color=GREEN, thickness=2):
+    return ("rect", (int(p1[0]), int(p1[1])), (int(p2[0]), int(p2[1])), tuple(color), thickness)
+
+
+def circle(center, radius, color=RED, thickness=-1):
+    return ("circle", (int(center[0]), int(center[1])), int(radius), tuple(color), thickness)
+
+
+def polyline(points, color=GREEN, thickness=3):
+    pts = tuple((int(x), int(y)) for x, y in np.asarray(points).reshape(-1, 2))
+    return ("poly", pts, tuple(color), thickness)
+
+
+def text_lines(lines, origin, line_height=LINE_HEIGHT, scale=0.6, thickness=2):
+    """``lines`` of (string, color) stacked downward from ``origin``."""
+    x, y = origin
+    return [text(s, (x, y + i * line_height), color, scale, thickness)
+            for i, (s, color) in enumerate(lines)]
+
+
+def arm_primitives(state, origin=ARM_ORIGIN):
+    """The joint-angle / gripper readout drawn on the main video feed.
+
+    ``state`` is ``(angles, gripper)``, the key used with update_layer().
+    """
+    angles, gripper = state
+    lines = [(f"J{i+1}:{a:.1f}", GREEN) for i, a in enumerate(angles)]
+    lines.append((f"Gripper:{gripper}%", CYAN))
+    return text_lines(lines, origin)
+
+
+_sprites = OrderedDict()
+_sprites_lock = threading.Lock()
+
+
+def _text_sprite(s, color, scale, thickness):
+    """(bitmap, coverage, ox, oy) for one string, where (ox, oy) is the text origin
+    inside the sprite. Cached, so a re-render only rasterises strings that changed."""
+    key = (s, color, scale, thickness)
+    with _sprites_lock:
+        sprite = _sprites.get(key)
+        if sprite is not None:
+            _sprites.move_to_end(key)
+            return sprite
+    (w, h), base = cv2.getTextSize(s, FONT, scale, thickness)
+    pad = thickness + h // 2  # brackets and accents rise above the reported height
+    size = (h + base + 2 * pad, w + 2 * pad)
+    bitmap = np.zeros(size + (3,), dtype=np.uint8)
+    coverage = np.zeros(size, dtype=np.uint8)
+    org = (pad, pad + h)
+    cv2.putText(bitmap, s, org, FONT, scale, color, thickness)
+    cv2.putText(coverage, s, org, FONT, scale, 255, thickness)
+    # Crop to the inked pixels so stacked lines do not overlap each other
+    x, y, w, h = cv2.boundingRect(coverage)
+    sprite = (bitmap[y:y + h, x:x + w].copy(), coverage[y:y + h, x:x + w].copy(),
+              org[0] - x, org[1] - y)
+    with _sprites_lock:
+        _sprites[key] = sprite
+        if len(_sprites) > SPRITE_CACHE_SIZE:
+            _sprites.popitem(last=False)
+    return sprite
+
+
+def _extent(p):
+    """Bounding box (x0, y0, x1, y1) of one primitive, generously padded."""
+    kind = p[0]
+    if kind == "text":
+        _, s, (x, y), color, scale, thickness = p
+        bitmap, _, ox, oy = _text_sprite(s, color, scale, thickness)
+        return x - ox, y - oy, x - ox + bitmap.shape[1], y - oy + bitmap.shape[0]
+    if kind == "rect":
+        _, (x0, y0), (x1, y1), _, thickness = p
+        pad = max(thickness, 1)
+        return min(x0, x1) - pad, min(y0, y1) - pad, max(x0, x1) + pad, max(y0, y1) + pad
+    if kind == "circle":
+        _, (x, y), r, _, thickness = p
+        r += max(thickness, 1)
+        return x - r, y - r, x + r, y + r
+    _, pts, _, thickness = p
+    xs, ys = [q[0] for q in pts], [q[1] for q in pts]
+    return min(xs) - thickness, min(ys) - thickness, max(xs) + thickness, max(ys) + thickness
+
+
+def _paste_text(bitmap, coverage, p, dx, dy):
+    """Composite a cached text sprite into a layer canvas, clipped to it."""
+    _, s, (x, y), color, scale, thickness = p
+    sb, sc, ox, oy = _text_sprite(s, color, scale, thickness)
+    x0, y0 = x - ox - dx, y - oy - dy
+    cx0, cy0 = max(x0, 0), max(y0, 0)
+    cx1 = min(x0 + sb.shape[1], bitmap.shape[1])
+    cy1 = min(y0 + sb.shape[0], bitmap.shape[0])
+    if cx1 <= cx0 or cy1 <= cy0:
+        return
+    src = np.s_[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+    dst = np.s_[cy0:cy1, cx0:cx1]
+    if not cv2.countNonZero(coverage[dst]):
+        bitmap[dst] = sb[src]  # nothing underneath: the usual case
+        coverage[dst] = sc[src]
+        return
+    # Overlap: same blend as apply(), underneath scaled by the sprite's inverse coverage
+    under = cv2.multiply(bitmap[dst], cv2.merge([255 - sc[src]] * 3), scale=1 / 255)
+    cv2.add(under, sb[src], dst=bitmap[dst])
+    cv2.max(coverage[dst], sc[src], dst=coverage[dst])
+
+
+def _draw(img, p, dx, dy, color=None):
+    """Draw shape ``p`` shifted by (-dx, -dy); ``color`` overrides (for the coverage)."""
+    kind = p[0]
+    if kind == "rect":
+        _, (x0, y0), (x1, y1), c, thickness = p
+        cv2.rectangle(img, (x0 - dx, y0 - dy), (x1 - dx, y1 - dy), color or c, thickness)
+    elif kind == "circle":
+        _, (x, y), r, c, thickness = p
+        cv2.circle(img, (x - dx, y - dy), r, color or c, thickness)
+    else:
+        _, pts, c, thickness = p
+        shifted = np.array(pts, dtype=np.int32) - (dx, dy)
+        cv2.polylines(img, [shifted], True, color or c, thickness)
+
+
+class _Layer:
+    """A rendered layer: premultiplied colour bitmap on black plus inverse coverage.
+
+    Blending is frame * (255 - coverage) / 255 + bitmap over the layer's
+    bounding box only, which reproduces drawing straight onto the frame,
+    including the anti-aliased edges OpenCV 5 gives Hershey text. Layers
+    without partial coverage (OpenCV 4) use a plain masked copy instead.
+    """
+
+    __slots__ = ("primitives", "x", "y", "bitmap", "inverse", "mask")
+
+    def __init__(self, primitives):
+        self.primitives = primitives
+        self.bitmap = None
+        self.x = self.y = 0
+        if not primitives:
+            return
+        boxes = [_extent(p) for p in primitives]
+        x0 = max(min(b[0] for b in boxes), 0)
+        y0 = max(min(b[1] for b in boxes), 0)
+        x1 = max(b[2] for b in boxes)
+        y1 = max(b[3] for b in boxes)
+        if x1 <= x0 or y1 <= y0:
+            return
+        self.x, self.y = x0, y0
+        bitmap = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        coverage = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for p in primitives:
+            if p[0] == "text":
+                _paste_text(bitmap, coverage, p, x0, y0)
+            else:
+                _draw(bitmap, p, x0, y0)
+                _draw(coverage, p, x0, y0, color=255)
+        self.bitmap = bitmap
+        if not cv2.countNonZero(cv2.inRange(coverage, 1, 254)):
+            self.inverse = None  # hard-edged (OpenCV 4): a masked copy is exact
+            self.mask = coverage
+        else:
+            self.inverse = cv2.merge([255 - coverage] * 3)
+            self.mask = None
+
+    def blend(self, frame):
+        h, w = frame.shape[:2]
+        if self.bitmap is None or self.x >= w or self.y >= h:
+            return
+        lh = min(self.bitmap.shape[0], h - self.y)
+        lw = min(self.bitmap.shape[1], w - self.x)
+        roi = frame[self.y:self.y + lh, self.x:self.x + lw]
+        if self.inverse is None:
+            cv2.copyTo(self.bitmap[:lh, :lw], self.mask[:lh, :lw], roi)  # writes into roi
+            return
+        under = cv2.multiply(roi, self.inverse[:lh, :lw], scale=1 / 255)
+        cv2.add(under, self.bitmap[:lh, :lw], dst=roi)
+
+
+class OsdCompositor:
+    """Named overlay layers, each rasterised once per change and blended per frame.
+
+    set_layer() compares the new primitives with the cached ones and only
+    re-renders (text rasterisation included) when they differ; it may be
+    called from any thread. apply() then only blends each layer's small
+    bounding box into the frame. Layers are drawn in the order they were
+    first set.
+    """
+
+    def __init__(self):
+        self._layers = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def set_layer(self, name, primitives):
+        primitives = list(primitives)
+        with self._lock:
+            current = self._layers.get(name)
+            if current is not None and current.primitives == primitives:
+                return
+        layer = _Layer(primitives)  # render outside the lock
+        with self._lock:
+            self._layers[name] = layer
+            self.renders += 1
+
+    def update_layer(self, name, key, build):
+        """set_layer(name, build(key)), skipping even the build while ``key`` is unchanged."""
+        with self._lock:
+            if self._keys.get(name) == key and name in self._layers:
+                return
+        self.set_layer(name, build(key))
+        with self._lock:
+            self._keys[name] = key
+
+    def clear_layer(self, name):
+        with self._lock:
+            self._layers.pop(name, None)
+            self._keys.pop(name, None)
+
+    def layers(self) -> list[str]:
+        with self._lock:
+            return list(self._layers)
+
+    def apply(self, frame):
+        """Blend every layer into ``frame`` (BGR, modified in place)."""
+        with self._lock:
+            layers = list(self._layers.values())
+        for layer in layers:
+            layer.blend(frame)
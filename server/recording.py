@@ -0,0 +1,159 @@
+"""Teleop session recording to fixed-record binary files and memory-mapped replay."""
+
+import os
+import re
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+RECORDINGS_DIR = Path(os.environ.get("MECHARM_RECORDINGS", Path.home() / "mecharm_recordings"))
+SUFFIX = ".mrec"
+
+MAGIC = b"MARMREC1"
+HEADER_FORMAT = "<8sId12x"  # magic, record size, start time (epoch), padding → 32 bytes
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+KIND_ANGLES = 1
+KIND_GRIPPER = 2
+KIND_RESET = 3
+
+# 37 bytes per command: one hour of 25 Hz slider traffic is ~3.3 MB
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),            # seconds since recording start
+    ("kind", "u1"),
+    ("angles", "<f4", (6,)),  # full joint target after the command
+    ("gripper", "<f4"),
+])
+
+REPLAY_CHUNK = 1024  # records paged in per read while replaying
+FLUSH_INTERVAL = 1.0  # seconds between forced flushes while recording
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def recording_path(name: str) -> Path:
+    """Resolve a recording name inside RECORDINGS_DIR, rejecting path tricks."""
+    if not _NAME_RE.match(name) or name.startswith("."):
+        raise ValueError(f"invalid recording name {name!r}")
+    return RECORDINGS_DIR / (name if name.endswith(SUFFIX) else name + SUFFIX)
+
+
+def list_recordings() -> list[dict]:
+    """Recordings on disk, newest first: [{name, records, duration, started}]."""
+    if not RECORDINGS_DIR.is_dir():
+        return []
+    out = []
+    for path in RECORDINGS_DIR.glob("*" + SUFFIX):
+        try:
+            rec = open_recording(path)
+        except ValueError:
+            continue
+        out.append({
+            "name": path.stem,
+            "records": len(rec.records),
+            "duration": round(rec.duration, 2),
+            "started": rec.started,
+        })
+    return sorted(out, key=lambda r: r["started"], reverse=True)
+
+
+class SessionRecorder:
+    """Appends commands to a recording file as fixed-size binary records."""
+
+    def __init__(self, name: str):
+        self.path = recording_path(name)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.name = self.path.stem
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        self._file = open(self.path, "wb")
+        self._file.write(struct.pack(HEADER_FORMAT, MAGIC, RECORD_DTYPE.itemsize, self.started))
+        self._row = np.zeros(1, dtype=RECORD_DTYPE)
+        self._lock = threading.Lock()
+        self._last_flush = self._t0
+        self.records = 0
+
+    def record(self, kind: int, angles, gripper):
+        with self._lock:
+            if self._file is None:
+                return
+            now = time.monotonic()
+            row = self._row[0]
+            row["t"] = now - self._t0
+            row["kind"] = kind
+            row["angles"] = angles
+            row["gripper"] = gripper
+            self._file.write(self._row.tobytes())
+            self.records += 1
+            if now - self._last_flush > FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self) -> dict:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        return {"name": self.name, "records": self.records,
+                "duration": round(time.monotonic() - self._t0, 2)}
+
+
+class Recording:
+    """Read-only memory map over a recording's records; nothing is loaded up front."""
+
+    def __init__(self, path: Path, started: float, records: np.memmap):
+        self.path = path
+        self.started = started
+        self.records = records
+
+    @property
+    def duration(self) -> float:
+        return float(self.records[-1]["t"]) if len(self.records) else 0.0
+
+
+def open_recording(path) -> Recording:
+    path = Path(path)
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path.name}: truncated header")
+    magic, itemsize, started = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC or itemsize != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path.name}: not a recording (or unsupported version)")
+    count = (size - HEADER_SIZE) // itemsize  # ignore a torn final record
+    if count == 0:
+        records = np.zeros(0, dtype=RECORD_DTYPE)
+    else:
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+    return Recording(path, started, records)
+
+
+def replay(rec: Recording, on_angles, on_gripper, speed=1.0,
+           cancel: threading.Event = None) -> bool:
+    """Stream ``rec`` through the callbacks with its original timing / ``speed``.
+
+    Records are paged in REPLAY_CHUNK at a time from the memory map, so
+    start-up cost and memory use do not depend on the recording's length.
+    Returns False if ``cancel`` was set before the end.
+    """
+    t0 = time.monotonic()
+    n = len(rec.records)
+    for start in range(0, n, REPLAY_CHUNK):
+        chunk = np.array(rec.records[start:start + REPLAY_CHUNK])
+        for row in chunk:
+            delay = t0 + float(row["t"]) / speed - time.monotonic()
+            if cancel is not None:
+                if cancel.wait(max(delay, 0.0)):
+                    return False
+            elif delay > 0:
+                time.sleep(delay)
+            kind = int(row["kind"])
+            if kind in (KIND_ANGLES, KIND_RESET):
+                on_angles([round(float(a), 2) for a in row["angles"]])
+            if kind in (KIND_GRIPPER, KIND_RESET):
+                on_gripper(int(round(float(row["gripper"]))))
+    return True
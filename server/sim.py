@@ -0,0 +1,210 @@
+"""SimulatedMechArm / SimulatedCamera / MjpegFileCamera — hardware stand-ins for running without the Pi."""
+
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .mjpeg import split_frames
+
+# Rough figures measured on the Pi at 1 Mbaud: a write frame is acknowledged
+# in ~2-4 ms, a read round-trip (request + reply) takes ~8-15 ms.
+DEFAULT_WRITE_LATENCY_MS = 3.0
+DEFAULT_READ_LATENCY_MS = 10.0
+DEFAULT_JITTER_MS = 1.0
+
+WIRE_LOG_SIZE = 4096
+
+
+class SimulatedSerialError(IOError):
+    """Raised by SimulatedMechArm when failure injection fires."""
+
+
+class SimulatedMechArm:
+    """Implements the subset of the MechArm270 API used by ArmController.
+
+    Every call holds a bus lock for its modelled duration, like a real
+    half-duplex UART, so concurrent callers queue up behind each other.
+    Writes are appended to ``wire_log`` as ``(t_wire, kind, payload)`` where
+    ``t_wire`` is the monotonic time the frame finished going out.
+    """
+
+    def __init__(self, write_latency_ms=DEFAULT_WRITE_LATENCY_MS,
+                 read_latency_ms=DEFAULT_READ_LATENCY_MS,
+                 jitter_ms=DEFAULT_JITTER_MS, failure_rate=0.0, seed=None):
+        self.write_latency_ms = write_latency_ms
+        self.read_latency_ms = read_latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+        self._angles = [0.0] * 6
+        self._gripper = 0
+        self._fresh_mode = 0
+        self._bus = threading.Lock()
+
+        self.wire_log = []
+        self._log_lock = threading.Lock()
+        self.calls = {"write": 0, "read": 0, "failed": 0}
+
+    # --- Bus model ---
+
+    def _transfer(self, base_ms, kind):
+        """Hold the bus for one modelled transfer; maybe raise an injected fault."""
+        with self._bus:
+            delay = base_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            self.calls[kind] += 1
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                self.calls["failed"] += 1
+                raise SimulatedSerialError(f"injected {kind} failure")
+
+    def _log_write(self, kind, payload):
+        with self._log_lock:
+            self.wire_log.append((time.monotonic(), kind, payload))
+            if len(self.wire_log) > WIRE_LOG_SIZE:
+                del self.wire_log[:len(self.wire_log) - WIRE_LOG_SIZE]
+
+    def drain_wire_log(self) -> list:
+        """Return and clear the recorded write frames."""
+        with self._log_lock:
+            log, self.wire_log = self.wire_log, []
+        return log
+
+    # --- MechArm270 API ---
+
+    def set_fresh_mode(self, mode):
+        self._transfer(self.write_latency_ms, "write")
+        self._fresh_mode = mode
+
+    def send_angles(self, angles, speed):
+        self._transfer(self.write_latency_ms, "write")
+        self._angles = [float(a) for a in angles]
+        self._log_write("angles", list(angles))
+
+    def set_gripper_value(self, value, speed, gripper_type=None):
+        self._transfer(self.write_latency_ms, "write")
+        self._gripper = int(value)
+        self._log_write("gripper", value)
+
+    def get_angles(self):
+        self._transfer(self.read_latency_ms, "read")
+        return list(self._angles)
+
+    def get_gripper_value(self, gripper_type=None):
+        self._transfer(self.read_latency_ms, "read")
+        return self._gripper
+
+
+class SimulatedCamera:
+    """Stand-in for cv2.VideoCapture producing synthetic frames at a fixed rate.
+
+    Frames are a textured background (so JPEG sizes are realistic) with a
+    red box drifting across it. read() blocks until the next frame period,
+    like a V4L2 device with a one-frame buffer.
+    """
+
+    def __init__(self, width=480, height=360, fps=30.0, seed=None, paced=True):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.paced = paced  # False: return frames as fast as they are asked for
+        rng = np.random.default_rng(seed)
+        yy, xx = np.mgrid[0:height, 0:width]
+        # A low-saturation grey gradient: nothing in it passes a vision colour threshold
+        base = np.stack([128 + xx * 32 // width, np.full_like(xx, 144),
+                         128 + yy * 32 // height], axis=-1)
+        noise = rng.integers(-24, 24, size=base.shape)
+        self._background = np.clip(base + noise, 0, 255).astype(np.uint8)
+        self._t_next = None
+        self._opened = True
+        self.frames = 0
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        return True
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        if self.paced:
+            now = time.monotonic()
+            if self._t_next is None:
+                self._t_next = now
+            delay = self._t_next - now
+            if delay > 0:
+                time.sleep(delay)
+            self._t_next = max(self._t_next + 1.0 / self.fps,
+                               time.monotonic() - 1.0 / self.fps)
+        self.frames += 1
+        # Box does one slow lap per ~10 s, bobbing vertically
+        phase = (self.frames / (10.0 * self.fps)) % 1.0
+        bw, bh = self.width // 8, self.height // 8
+        x = int(phase * (self.width - bw))
+        y = int((self.height - bh) * (0.5 + 0.3 * np.sin(2 * np.pi * phase)))
+        # Like VideoCapture.read(image): fill the caller's array if it fits
+        if image is not None and image.shape == self._background.shape:
+            frame = image
+            np.copyto(frame, self._background)
+        else:
+            frame = self._background.copy()
+        frame[y:y + bh, x:x + bw] = (30, 30, 200)  # BGR red
+        return True, frame
+
+    def release(self):
+        self._opened = False
+
+
+class MjpegFileCamera:
+    """Stand-in for a V4L2 MJPEG camera that plays back a recorded clip in a loop.
+
+    The clip is raw concatenated JPEGs or a capture of /video
+    (``curl -s -m 10 http://<pi>:8080/video > clip.mjpeg``). Like
+    VideoCapture with CAP_PROP_CONVERT_RGB set to 0, read() returns each
+    frame still compressed as a 1xN byte row; with conversion on (the
+    default) it returns decoded BGR frames.
+    """
+
+    def __init__(self, path, fps=30.0):
+        with open(path, "rb") as f:
+            frames = split_frames(f.read())
+        if not frames:
+            raise ValueError(f"{path}: no JPEG frames found")
+        self._frames = [np.frombuffer(jpg, dtype=np.uint8).reshape(1, -1) for jpg in frames]
+        self.fps = fps
+        self.convert_rgb = True
+        self._t_next = None
+        self._opened = True
+        self.frames = 0
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.convert_rgb = bool(value)
+        return True
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        now = time.monotonic()
+        if self._t_next is None:
+            self._t_next = now
+        delay = self._t_next - now
+        if delay > 0:
+            time.sleep(delay)
+        self._t_next = max(self._t_next + 1.0 / self.fps, time.monotonic() - 1.0 / self.fps)
+        raw = self._frames[self.frames % len(self._frames)]
+        self.frames += 1
+        if not self.convert_rgb:
+            return True, raw.copy()  # a fresh buffer per read, like the driver
+        return True, cv2.imdecode(raw, cv2.IMREAD_COLOR)
+
+    def release(self):
+        self._opened = False
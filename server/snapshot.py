@@ -0,0 +1,112 @@
+"""SnapshotCache — single JPEG stills of the latest frame, encoded at most once per frame."""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+SNAPSHOT_CACHE_SIZE = 8  # distinct (width, quality) variants kept
+MIN_WIDTH = 16
+FRESH_FRAME_WAIT = 1.0  # seconds to wait for a capture when nothing is cached yet
+
+
+class Snapshot:
+    __slots__ = ("jpg", "frame_seq", "t_capture", "width", "quality")
+
+    def __init__(self, jpg, frame_seq, t_capture, width, quality):
+        self.jpg = jpg
+        self.frame_seq = frame_seq
+        self.t_capture = t_capture
+        self.width = width
+        self.quality = quality
+
+    @property
+    def age_ms(self) -> float:
+        return (time.monotonic() - self.t_capture) * 1000
+
+
+class SnapshotCache:
+    """Latest camera frame as one JPEG, cached per (width, quality) by frame seq.
+
+    get() returns the cached still while no newer frame has been captured
+    (or while it is younger than ``max_age_ms``), so any number of callers
+    cost at most one encode per frame and variant. Stills carry no OSD.
+    Blocking: call from a worker thread.
+    """
+
+    def __init__(self, cam):
+        self.cam = cam
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()  # concurrent misses wait, then hit
+        self.requests = 0
+        self.encodes = 0
+
+    def _variant(self, width, quality):
+        if width is None or width >= self.cam.width:
+            width = self.cam.width  # never upscale
+        return max(int(width), MIN_WIDTH), int(quality or self.cam.quality)
+
+    def _cached(self, key, max_age_ms):
+        with self._lock:
+            snap = self._cache.get(key)
+        if snap is None:
+            return None
+        if snap.frame_seq == self.cam.frame_seq:
+            return snap
+        if max_age_ms is not None and snap.age_ms <= max_age_ms:
+            return snap
+        return None
+
+    def get(self, width=None, quality=None, max_age_ms=None):
+        """Snapshot of the newest frame, or None if the camera has produced none."""
+        key = self._variant(width, quality)
+        with self._lock:
+            self.requests += 1
+        snap = self._cached(key, max_age_ms)
+        if snap is not None:
+            return snap
+        with self._encode_lock:
+            snap = self._cached(key, max_age_ms)  # someone may have just encoded it
+            if snap is not None:
+                return snap
+            if not self.cam.frame_seq:
+                self.cam.wait_frame(0, FRESH_FRAME_WAIT)
+            handle = self.cam.acquire_frame()
+            if handle is None:
+                return None
+            with handle:
+                jpg = self._encode(handle, *key)
+                if jpg is None:
+                    return None
+                snap = Snapshot(jpg, handle.seq, handle.t_capture, *key)
+        with self._lock:
+            self._cache[key] = snap
+            self._cache.move_to_end(key)
+            if len(self._cache) > SNAPSHOT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return snap
+
+    def _encode(self, handle, width, quality):
+        if handle.jpeg is not None and width == self.cam.width and quality == self.cam.quality:
+            return self.cam.camera_jpeg(handle)  # MJPEG passthrough: no encode at all
+        frame = handle.image
+        if frame is None:
+            return None
+        if width != frame.shape[1]:
+            height = max(round(frame.shape[0] * width / frame.shape[1]), 1)
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        jpg = self.cam.encode_jpeg(frame, quality)
+        if jpg:
+            with self._lock:
+                self.encodes += 1
+        return jpg or None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "encodes": self.encodes,
+                "cached_variants": [f"{w}w q{q}" for w, q in self._cache],
+            }
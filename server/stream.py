@@ -0,0 +1,389 @@
+"""MjpegBroadcaster — encode each camera frame once per rendition and fan it out to video clients."""
+
+import asyncio
+import itertools
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+import cv2
+
+PART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+# /ws/video binary message: JPEG length, camera frame seq, capture time and
+# send time (both epoch ms), little-endian, followed by the JPEG bytes
+WS_FRAME_HEADER = struct.Struct("<IIdd")
+SUBSCRIBER_WAIT = 1.0  # seconds a client waits for a frame before re-checking shutdown
+CAPTURE_WAIT = 1.0  # seconds the encoder waits for a capture before re-checking
+
+
+class Rendition(NamedTuple):
+    name: str
+    scale: float  # of the capture resolution
+    quality: int
+    fps: float
+
+
+# Best first. fps above the capture rate just means every captured frame.
+LADDER = (
+    Rendition("high", 1.0, 75, 12),
+    Rendition("medium", 1.0, 60, 10),
+    Rendition("low", 2 / 3, 50, 8),
+    Rendition("min", 0.5, 40, 5),
+)
+DEFAULT_RENDITION = "high"  # clients start on top and step down on their own
+CREDIT_BURST = 2.0  # frames of decimation credit a rendition may bank
+
+# Per-client ladder decisions, made once per window from that client's own sends
+ADAPT_WINDOW = 2.0  # seconds
+STEP_DOWN_BUSY = 0.5  # fraction of the window spent blocked in send → one step down
+STEP_DOWN_MISSED = 0.2  # or this fraction of the rendition's frames skipped
+STEP_UP_BUSY = 0.15  # below this with nothing skipped counts as a good window
+STEP_UP_WINDOWS = 3  # consecutive good windows before one step up
+
+
+def _wake(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+def _notify(waiters):
+    """Resolve subscriber futures from the encoder thread on their own loops."""
+    for fut in waiters:
+        try:
+            fut.get_loop().call_soon_threadsafe(_wake, fut)
+        except RuntimeError:  # loop already closed
+            pass
+
+
+class _Slot:
+    """Latest encoded frame of one rendition, shared by every client on it."""
+
+    def __init__(self, rendition):
+        self.rendition = rendition
+        self.jpg = None
+        self.seq = 0
+        self.frame_seq = 0  # camera seq and capture time of the frame in jpg
+        self.t_capture = 0.0
+        self.t_publish = 0.0
+        self.subscribers = 0
+        self.credit = 1.0  # fps decimation: encode when a whole frame of credit is due
+        self.waiters = set()
+        self.encoded = 0
+        self.forwarded = 0  # camera JPEGs sent as-is (passthrough)
+        self.encode_ms_sum = 0.0
+        self.bytes_sum = 0
+
+
+class _Client:
+    """One video subscriber's position on the ladder and its send measurements."""
+
+    def __init__(self, cid, level, pinned, transport):
+        self.id = cid
+        self.level = level
+        self.pinned = pinned
+        self.transport = transport
+        self.good_windows = 0
+        self._reset(time.monotonic())
+        self.last = {"kbps": 0.0, "busy": 0.0, "fps": 0.0, "missed": 0, "lag_ms": 0.0}
+
+    def _reset(self, now):
+        self.window_start = now
+        self.busy_s = 0.0
+        self.bytes = 0
+        self.frames = 0
+        self.missed = 0
+        self.lag_s = 0.0
+
+    def account(self, nbytes, send_s, missed, lag_s, levels) -> bool:
+        """Add one send; at the end of a window maybe move one rung. True if moved.
+
+        ``lag_s`` is the frame's age once the send completed: capture to
+        socket for /video, capture to client acknowledgement for /ws/video.
+        """
+        self.busy_s += send_s
+        self.bytes += nbytes
+        self.frames += 1
+        self.missed += missed
+        self.lag_s += lag_s
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < ADAPT_WINDOW:
+            return False
+        busy = self.busy_s / elapsed
+        offered = self.frames + self.missed
+        self.last = {
+            "kbps": round(self.bytes * 8 / 1000 / elapsed, 1),
+            "busy": round(busy, 3),
+            "fps": round(self.frames / elapsed, 1),
+            "missed": self.missed,
+            "lag_ms": round(self.lag_s / self.frames * 1000, 1),
+        }
+        missed_ratio = self.missed / offered if offered else 0.0
+        self._reset(now)
+        if self.pinned:
+            return False
+        if busy > STEP_DOWN_BUSY or missed_ratio > STEP_DOWN_MISSED:
+            self.good_windows = 0
+            if self.level < levels - 1:
+                self.level += 1
+                return True
+            return False
+        if busy < STEP_UP_BUSY and not missed_ratio:
+            self.good_windows += 1
+            if self.good_windows >= STEP_UP_WINDOWS and self.level > 0:
+                self.good_windows = 0
+                self.level -= 1
+                return True
+        else:
+            self.good_windows = 0
+        return False
+
+
+class MjpegBroadcaster:
+    """One encoder thread, many asyncio readers, one ladder of renditions.
+
+    Every video client sits on a rung of ``ladder`` (resolution x JPEG
+    quality x fps) chosen from its own send measurements: time spent
+    blocked writing to the socket, bytes sent and frames it had to skip.
+    For each new capture from ``cam`` the encoder applies
+    ``overlay(frame)`` once and then encodes only the renditions that have
+    subscribers and are due at their fps - at most once per frame each,
+    however many clients share them - and wakes the waiting subscribers on
+    their event loop. A subscriber yields only when its rendition has a
+    newer frame, so no frame is sent twice, and a slow client never holds
+    up anyone else or occupies a threadpool worker. frames() feeds
+    multipart /video; packets() feeds /ws/video, where the consumer asks
+    for the next packet only once the client acknowledged the last one.
+
+    When the camera delivers MJPEG (``cam.passthrough``) and no overlay is
+    drawn, the top rung forwards the camera's own JPEG with no decode or
+    encode; frames are only decoded if a lower rung needs pixels.
+    """
+
+    def __init__(self, cam, overlay=None, ladder=LADDER):
+        self.cam = cam
+        self.overlay = overlay
+        self.overlay_enabled = True
+        self._slots = [_Slot(r) for r in ladder]
+        self._cond = threading.Condition()
+        self._clients = set()
+        self._ids = itertools.count(1)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def renditions(self) -> list[str]:
+        return [s.rendition.name for s in self._slots]
+
+    # --- Encoder ---
+
+    def _due(self) -> list:
+        """Renditions with subscribers that should get this capture. Caller holds _cond."""
+        due = []
+        for slot in self._slots:
+            if not slot.subscribers:
+                slot.credit = 1.0
+                continue
+            # Keep the fraction left after a send, or 10 of 12 fps rounds to 6
+            slot.credit = min(slot.credit + slot.rendition.fps / self.cam.fps, CREDIT_BURST)
+            if slot.credit >= 1.0 - 1e-6:
+                slot.credit -= 1.0
+                due.append(slot)
+        return due
+
+    def _run(self):
+        captured = 0
+        while True:
+            with self._cond:
+                while self._running and not any(s.subscribers for s in self._slots):
+                    self._cond.wait()
+                if not self._running:
+                    return
+            if self.cam.wait_frame(captured, CAPTURE_WAIT) == captured:
+                continue
+            handle = self.cam.acquire_frame()
+            if handle is None:
+                continue
+            with handle:
+                captured = handle.seq
+                with self._cond:
+                    due = self._due()
+                if not due:
+                    continue
+                overlay = self.overlay if self.overlay_enabled else None
+                if handle.jpeg is not None and overlay is None and due[0] is self._slots[0]:
+                    # Passthrough: the top rung is the camera's own JPEG, untouched
+                    self._publish(due.pop(0), handle, self.cam.camera_jpeg(handle), 0.0,
+                                  forwarded=True)
+                if not due:
+                    continue
+                frame = handle.image  # decodes here, once, in passthrough mode
+                if frame is None:
+                    continue
+                if overlay is not None:
+                    t0 = time.monotonic()
+                    frame = frame.copy()  # one copy per frame, not per viewer
+                    overlay(frame)
+                    self.cam.timings.record("osd", (time.monotonic() - t0) * 1000)
+                for slot in due:
+                    self._encode(slot, handle, frame)
+
+    def _encode(self, slot, handle, frame):
+        t0 = time.monotonic()
+        r = slot.rendition
+        if r.scale != 1.0:
+            h, w = frame.shape[:2]
+            frame = cv2.resize(frame, (int(w * r.scale), int(h * r.scale)),
+                               interpolation=cv2.INTER_AREA)
+        jpg = self.cam.encode_jpeg(frame, r.quality)
+        if jpg:
+            encode_ms = (time.monotonic() - t0) * 1000
+            self.cam.timings.record("encode", encode_ms)
+            self._publish(slot, handle, jpg, encode_ms)
+
+    def _publish(self, slot, handle, jpg, encode_ms, forwarded=False):
+        with self._cond:
+            slot.jpg = jpg
+            slot.seq += 1
+            slot.frame_seq = handle.seq
+            slot.t_capture = handle.t_capture
+            slot.t_publish = time.monotonic()
+            if forwarded:
+                slot.forwarded += 1
+            else:
+                slot.encoded += 1
+                slot.encode_ms_sum += encode_ms
+            slot.bytes_sum += len(jpg)
+            waiters, slot.waiters = slot.waiters, set()
+        _notify(waiters)
+
+    # --- Subscribers ---
+
+    def _level(self, name) -> int:
+        for i, slot in enumerate(self._slots):
+            if slot.rendition.name == name:
+                return i
+        raise ValueError(f"unknown rendition {name!r}; choose from {self.renditions}")
+
+    async def _subscribe(self, rendition, transport):
+        """Async generator of (jpg, frame_seq, t_capture) for one client.
+
+        Each item is the newest frame of the client's rendition at the
+        moment the consumer asks for it; the time until it asks again
+        counts as that frame's send time for the ladder.
+        """
+        loop = asyncio.get_running_loop()
+        level = self._level(rendition or DEFAULT_RENDITION)
+        client = _Client(next(self._ids), level, rendition is not None, transport)
+        with self._cond:
+            self._clients.add(client)
+            slot = self._slots[client.level]
+            slot.subscribers += 1
+            self._cond.notify_all()
+            last = slot.seq
+        try:
+            while True:
+                with self._cond:
+                    if not self._running:
+                        return
+                    fresh = slot.seq != last
+                    if not fresh:
+                        fut = loop.create_future()
+                        slot.waiters.add(fut)
+                if not fresh:
+                    try:
+                        await asyncio.wait_for(fut, SUBSCRIBER_WAIT)
+                    except asyncio.TimeoutError:
+                        with self._cond:
+                            slot.waiters.discard(fut)
+                    continue
+                with self._cond:
+                    missed = slot.seq - last - 1
+                    last = slot.seq
+                    jpg, frame_seq, t_capture = slot.jpg, slot.frame_seq, slot.t_capture
+                    t_publish = slot.t_publish
+                if missed > 0:
+                    self.cam.record_frame_skipped(missed)
+                t0 = time.monotonic()
+                yield jpg, frame_seq, t_capture
+                # Resumed once the consumer has finished with this frame
+                now = time.monotonic()
+                self.cam.record_frame_sent(len(jpg))
+                timings = self.cam.timings
+                timings.record("queue_wait", (t0 - t_publish) * 1000)
+                timings.record("send", (now - t0) * 1000)
+                timings.record("capture_to_sent", (now - t_capture) * 1000)
+                if client.account(len(jpg), now - t0, max(missed, 0), now - t_capture,
+                                  len(self._slots)):
+                    with self._cond:
+                        slot.subscribers -= 1
+                        slot = self._slots[client.level]
+                        slot.subscribers += 1
+                        last = slot.seq  # start with this rendition's next frame
+        finally:
+            with self._cond:
+                slot.subscribers -= 1
+                self._clients.discard(client)
+
+    async def frames(self, rendition=None):
+        """Async generator of multipart MJPEG parts for one /video client.
+
+        ``rendition`` pins the client to one rung; otherwise it starts at
+        DEFAULT_RENDITION and moves along the ladder on its own.
+        """
+        async for jpg, _, _ in self._subscribe(rendition, "mjpeg"):
+            yield PART_HEADER + jpg + b"\r\n"
+
+    async def packets(self, rendition=None):
+        """Async generator of WS_FRAME_HEADER-prefixed JPEG messages for /ws/video.
+
+        The consumer should ask for the next packet only after the client
+        acknowledged the previous one: that keeps one frame in flight, and
+        whatever was captured in the meantime is skipped for the newest.
+        """
+        async for jpg, frame_seq, t_capture in self._subscribe(rendition, "ws"):
+            now = time.time()
+            captured = now - (time.monotonic() - t_capture)
+            header = WS_FRAME_HEADER.pack(len(jpg), frame_seq & 0xFFFFFFFF,
+                                          captured * 1000, now * 1000)
+            yield header + jpg
+
+    def stats(self) -> dict:
+        with self._cond:
+            renditions = {}
+            for slot in self._slots:
+                r, n = slot.rendition, slot.encoded
+                renditions[r.name] = {
+                    "size": f"{int(self.cam.width * r.scale)}x{int(self.cam.height * r.scale)}",
+                    "quality": r.quality,
+                    "fps": r.fps,
+                    "viewers": slot.subscribers,
+                    "frames_encoded": n,
+                    "frames_forwarded": slot.forwarded,
+                    "encode_ms_avg": round(slot.encode_ms_sum / n, 2) if n else 0.0,
+                    "kb_avg": (round(slot.bytes_sum / (n + slot.forwarded) / 1000, 1)
+                               if n + slot.forwarded else 0.0),
+                }
+            clients = [{"id": c.id, "transport": c.transport,
+                        "rendition": self._slots[c.level].rendition.name,
+                        "pinned": c.pinned, **c.last}
+                       for c in sorted(self._clients, key=lambda c: c.id)]
+            return {
+                "viewers": len(self._clients),
+                "frames_encoded": sum(s.encoded for s in self._slots),
+                "renditions": renditions,
+                "clients": clients,
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            waiters = set()
+            for slot in self._slots:
+                waiters |= slot.waiters
+                slot.waiters = set()
+        _notify(waiters)
+        self._thread.join(timeout=2)
@@ -0,0 +1,108 @@
+"""TelemetryRing — fixed-memory NumPy ring buffer of joint angle history."""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+# ~55 rows/s (50 Hz commands + 5 Hz state reads) → about an hour per ring.
+# 200k rows × 36 bytes ≈ 7 MB, allocated once and never grown.
+TELEMETRY_CAPACITY = 200_000
+MAX_POINTS = 2000  # cap on rows returned by one query when no step is given
+
+
+class TelemetryRing:
+    """Timestamped joint angles + gripper value, overwriting the oldest row when full.
+
+    Rows are stored against time.monotonic() so NTP jumps on the Pi cannot
+    break ordering; query() accepts and returns wall-clock (epoch) seconds.
+    Queries locate their range by binary search over the two contiguous
+    halves of the ring and gather only the rows they return.
+    """
+
+    def __init__(self, capacity=TELEMETRY_CAPACITY, joints=6):
+        self.capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._angles = np.zeros((capacity, joints), dtype=np.float32)
+        self._gripper = np.zeros(capacity, dtype=np.float32)
+        self._head = 0  # next slot to write
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, angles, gripper, t=None):
+        """Record one row; ``t`` defaults to now (monotonic clock)."""
+        with self._lock:
+            i = self._head
+            self._t[i] = time.monotonic() if t is None else t
+            self._angles[i] = angles
+            self._gripper[i] = gripper
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _halves(self):
+        """Views of the timestamps in chronological order. Caller holds _lock."""
+        start = (self._head - self._count) % self.capacity
+        first = self._t[start:start + self._count]
+        second = self._t[:self._count - len(first)]
+        return start, first, second
+
+    @staticmethod
+    def _search(first, second, x, side="left"):
+        """Logical index of ``x`` (scalar or array) across both halves."""
+        x = np.asarray(x, dtype=np.float64)
+        in_second = len(second) > 0 and len(first) > 0
+        idx = np.searchsorted(first, x, side=side)
+        if in_second:
+            later = x > first[-1] if side == "left" else x >= second[0]
+            idx = np.where(later, len(first) + np.searchsorted(second, x, side=side), idx)
+        return idx
+
+    def query(self, since=None, until=None, step=None, max_points=MAX_POINTS) -> dict:
+        """Rows with ``since <= t <= until`` (epoch seconds), downsampled.
+
+        ``step`` returns the first row at or after each multiple of ``step``
+        seconds from ``since``; without it the range is thinned evenly to at
+        most ``max_points`` rows. The grid only covers the span the ring
+        holds, and ``step`` is raised if it would still exceed ``max_points``
+        rows. ValueError unless ``step > 0``.
+        """
+        if step is not None and not step > 0:
+            raise ValueError("step must be > 0")
+        offset = time.time() - time.monotonic()
+        with self._lock:
+            start, first, second = self._halves()
+            if not self._count:
+                return {"t": [], "a": [], "g": []}
+            t_lo = first[0] if since is None else since - offset
+            t_hi = (second[-1] if len(second) else first[-1]) if until is None else until - offset
+            lo = int(self._search(first, second, t_lo, side="left"))
+            hi = int(self._search(first, second, t_hi, side="right"))
+            if hi <= lo:
+                return {"t": [], "a": [], "g": []}
+            if step:
+                # Resample only where there are rows: since=0 must not mean
+                # a grid from 1970 to now
+                newest = second[-1] if len(second) else first[-1]
+                g_lo = t_lo + max(math.floor((first[0] - t_lo) / step), 0) * step
+                g_hi = min(t_hi, newest)
+                step = max(step, (g_hi - g_lo) / max_points)
+                grid = np.arange(g_lo, g_hi + 1e-9, step)
+                logical = np.unique(self._search(first, second, grid, side="left"))
+                logical = logical[(logical >= lo) & (logical < hi)]
+            elif hi - lo > max_points:
+                logical = np.linspace(lo, hi - 1, max_points).astype(np.int64)
+            else:
+                logical = np.arange(lo, hi)
+            rows = (start + logical) % self.capacity
+            t = self._t[rows] + offset
+            angles = self._angles[rows]
+            gripper = self._gripper[rows]
+        return {
+            "t": np.round(t, 3).tolist(),
+            "a": np.round(angles, 2).tolist(),
+            "g": np.round(gripper, 1).tolist(),
+        }
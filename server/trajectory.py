@@ -0,0 +1,138 @@
+"""Joint-space trajectory generation — trapezoidal/quintic profiles under velocity/accel limits."""
+
+import threading
+import time
+
+import numpy as np
+
+from .kinematics import JOINT_LIMITS, within_limits
+
+# Conservative per-joint limits (deg/s, deg/s²) for the MechArm 270 servos.
+MAX_VELOCITY = np.array([90.0, 90.0, 90.0, 120.0, 120.0, 150.0])
+MAX_ACCEL = np.array([180.0, 180.0, 180.0, 240.0, 240.0, 300.0])
+
+STREAM_RATE_HZ = 50  # matches ArmController.MIN_SEND_INTERVAL
+MAX_WAYPOINTS = 64  # per request; bounds the sampled path (~minutes at 50 Hz)
+
+# Quintic s(τ) = 10τ³ - 15τ⁴ + 6τ⁵: peak ds/dτ = 15/8, peak d²s/dτ² = 10/√3
+_QUINTIC_PEAK_VEL = 15.0 / 8.0
+_QUINTIC_PEAK_ACC = 10.0 / np.sqrt(3.0)
+
+
+class Trajectory:
+    """Sampled joint trajectory: ``positions[k]`` is the target at ``times[k]`` seconds."""
+
+    def __init__(self, times, positions, waypoint_times):
+        self.times = times
+        self.positions = positions
+        self.waypoint_times = waypoint_times
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def __len__(self):
+        return len(self.times)
+
+
+def _trapezoid_shape(delta, v_max, a_max):
+    """Pick the accel fraction f of each segment from its time-optimal limiting joint.
+
+    For one joint, the fastest rest-to-rest trapezoid over distance d takes
+    T = d/v + v/a (or 2√(d/a) if it never reaches v) and spends f = t_acc/T
+    accelerating. Every joint in the segment then shares that shape.
+    """
+    d = np.abs(delta)
+    full = d >= v_max ** 2 / a_max
+    t_acc = np.where(full, v_max / a_max, np.sqrt(d / a_max))
+    t_total = np.where(full, d / v_max + v_max / a_max, 2.0 * t_acc)
+    limiting = np.argmax(t_total, axis=1)
+    rows = np.arange(len(delta))
+    t_lim = t_total[rows, limiting]
+    f = np.where(t_lim > 0, t_acc[rows, limiting] / np.maximum(t_lim, 1e-9), 0.5)
+    return np.clip(f, 1e-3, 0.5)
+
+
+def _segment_durations(delta, v_max, a_max, profile):
+    """Shortest common duration per segment that keeps every joint within limits."""
+    d = np.abs(delta)
+    if profile == "quintic":
+        cv = np.full(len(delta), _QUINTIC_PEAK_VEL)
+        ca = np.full(len(delta), _QUINTIC_PEAK_ACC)
+        f = None
+    else:
+        f = _trapezoid_shape(delta, v_max, a_max)
+        cv = 1.0 / (1.0 - f)
+        ca = 1.0 / (f * (1.0 - f))
+    t_vel = d * cv[:, None] / v_max
+    t_acc = np.sqrt(d * ca[:, None] / a_max)
+    return np.maximum(t_vel, t_acc).max(axis=1), f
+
+
+def _shape(tau, profile, f):
+    """Normalized position s(τ) ∈ [0, 1] for τ ∈ [0, 1], vectorized."""
+    if profile == "quintic":
+        return tau ** 3 * (10.0 + tau * (-15.0 + 6.0 * tau))
+    v = 1.0 / (1.0 - f)
+    a = v / f
+    accel = 0.5 * a * tau ** 2
+    cruise = 0.5 * a * f ** 2 + v * (tau - f)
+    decel = 1.0 - 0.5 * a * (1.0 - tau) ** 2
+    return np.where(tau < f, accel, np.where(tau > 1.0 - f, decel, cruise))
+
+
+def plan(waypoints, profile="trapezoid", rate_hz=STREAM_RATE_HZ,
+         max_velocity=MAX_VELOCITY, max_accel=MAX_ACCEL) -> Trajectory:
+    """Plan a rest-to-rest trajectory through joint-space ``waypoints`` (degrees).
+
+    Each segment is time-scaled so the slowest joint just meets its velocity
+    and acceleration limit and all joints arrive together. Sampling is done
+    for the whole path in one vectorized pass.
+    """
+    if profile not in ("trapezoid", "quintic"):
+        raise ValueError(f"unknown profile {profile!r}")
+    q = np.asarray(waypoints, dtype=float)
+    if q.ndim != 2 or q.shape[0] < 2:
+        raise ValueError("need at least two waypoints of shape (N, joints)")
+    if not np.all(np.isfinite(q)):
+        raise ValueError("waypoints must be finite")
+    if q.shape[1] == len(JOINT_LIMITS):
+        bad = np.flatnonzero(~within_limits(q))
+        if len(bad):
+            raise ValueError(f"waypoint {int(bad[0])} {q[bad[0]].tolist()} is outside the joint limits")
+    v_max = np.broadcast_to(np.asarray(max_velocity, dtype=float), q.shape[1:])
+    a_max = np.broadcast_to(np.asarray(max_accel, dtype=float), q.shape[1:])
+
+    delta = np.diff(q, axis=0)
+    durations, f = _segment_durations(delta, v_max, a_max, profile)
+    # Zero-length segments still get one sample so the waypoint is emitted
+    durations = np.maximum(durations, 1.0 / rate_hz)
+    starts = np.concatenate(([0.0], np.cumsum(durations)))
+
+    times = np.arange(0.0, starts[-1], 1.0 / rate_hz)
+    times = np.append(times, starts[-1])
+    seg = np.clip(np.searchsorted(starts, times, side="right") - 1, 0, len(delta) - 1)
+    tau = np.clip((times - starts[seg]) / durations[seg], 0.0, 1.0)
+    s = _shape(tau, profile, f[seg] if f is not None else None)
+    positions = q[seg] + s[:, None] * delta[seg]
+    return Trajectory(times, positions, starts)
+
+
+def stream(traj: Trajectory, send, cancel: threading.Event = None) -> bool:
+    """Call ``send(list_of_angles)`` for each sample on its deadline.
+
+    Returns False if ``cancel`` was set before the trajectory finished.
+    """
+    t0 = time.monotonic()
+    for t, q in zip(traj.times, traj.positions):
+        delay = t0 + t - time.monotonic()
+        if delay > 0:
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+        elif cancel is not None and cancel.is_set():
+            return False
+        send([round(float(a), 2) for a in q])
+    return True
@@ -0,0 +1,291 @@
+"""VideoRecorder — camera frames to rotating MJPEG segment files, encoded in a worker process."""
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+VIDEO_DIR = Path(os.environ.get("MECHARM_VIDEO_RECORDINGS",
+                                Path.home() / "mecharm_recordings" / "video"))
+SUFFIX = ".mjpeg"  # concatenated JPEGs: replay with --camera file, or ffplay -f mjpeg
+
+QUEUE_SLOTS = 4  # frames that may wait for the encoder; beyond that new frames are dropped
+SEGMENT_SECONDS = 60.0
+MAX_TOTAL_MB = 1024  # oldest segments are deleted to stay under this
+CAPTURE_WAIT = 1.0  # seconds the feeder waits for a capture before re-checking
+STOP_TIMEOUT = 5.0
+
+KIND_RAW = 0  # BGR pixels, encoded by the worker
+KIND_JPEG = 1  # camera MJPEG (passthrough), written as-is
+
+
+def list_segments(directory=VIDEO_DIR) -> list[dict]:
+    """Segments on disk, newest first: [{name, bytes, modified}]."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    out = []
+    for path in directory.glob("*" + SUFFIX):
+        st = path.stat()
+        out.append({"name": path.name, "bytes": st.st_size, "modified": st.st_mtime})
+    return sorted(out, key=lambda s: s["name"], reverse=True)
+
+
+class _SegmentWriter:
+    """Appends JPEGs to time-based segment files under a total size cap (worker side)."""
+
+    def __init__(self, directory, segment_seconds, max_total_bytes):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_seconds = segment_seconds
+        self.max_total_bytes = max_total_bytes
+        self._closed = deque(sorted(self.directory.glob("*" + SUFFIX)))  # oldest first
+        self._total = sum(p.stat().st_size for p in self._closed)
+        self._file = None
+        self._path = None
+        self._started = 0.0
+
+    def write(self, jpg, t_wall):
+        if self._file is None or t_wall - self._started >= self.segment_seconds:
+            self._rotate(t_wall)
+        self._file.write(jpg)
+        self._total += len(jpg)
+        # Never delete the segment being written, even if it alone is over the cap
+        while self._total > self.max_total_bytes and self._closed:
+            oldest = self._closed.popleft()
+            try:
+                self._total -= oldest.stat().st_size
+                oldest.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _rotate(self, t_wall):
+        self.close()
+        stamp = datetime.fromtimestamp(t_wall)
+        name = f"video_{stamp:%Y%m%d-%H%M%S}-{stamp.microsecond // 1000:03d}{SUFFIX}"
+        self._path = self.directory / name
+        self._file = open(self._path, "wb")
+        self._started = t_wall
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._closed.append(self._path)
+            self._file = None
+
+
+def _worker(shm_name, slot_bytes, work, free, directory, segment_seconds, max_total_bytes,
+            quality, written, encode_ms):
+    """Worker process: encode queued frames and write them out until a None item.
+
+    A ("ring", shm_name, slot_bytes) item switches to a bigger ring; the
+    frames queued after it are in the new one.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((QUEUE_SLOTS, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    writer = _SegmentWriter(directory, segment_seconds, max_total_bytes)
+    try:
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            if item[0] == "ring":
+                _, shm_name, slot_bytes = item
+                del slots
+                shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                slots = np.ndarray((QUEUE_SLOTS, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+                continue
+            idx, kind, shape, nbytes, t_wall = item
+            t0 = time.monotonic()
+            if kind == KIND_JPEG:
+                jpg = slots[idx, :nbytes].tobytes()
+            else:
+                frame = slots[idx, :nbytes].reshape(shape)
+                ok, enc = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                jpg = enc.tobytes() if ok else None
+            free.put(idx)  # the slot is reusable as soon as the pixels are consumed
+            if jpg is None:
+                continue
+            writer.write(jpg, t_wall)
+            with written.get_lock():
+                written.value += 1
+                encode_ms.value += (time.monotonic() - t0) * 1000
+    finally:
+        writer.close()
+        del slots
+        shm.close()
+
+
+class VideoRecorder:
+    """Records what the camera captures, without slowing the capture loop down.
+
+    A feeder thread borrows each new frame from ``cam`` (a FrameHandle, no
+    copy), copies it into a free slot of a small shared-memory ring and
+    queues the slot index for a worker process that does the JPEG encode
+    and file writes, away from the server's GIL. When every slot is still
+    waiting for the encoder the frame is dropped and counted, so memory
+    stays fixed however far the encoder falls behind. In MJPEG passthrough
+    the camera's JPEGs are recorded as-is and nothing is encoded.
+
+    Slots are sized from the newest frame at start(); a frame that turns
+    out bigger (the driver picked another size, a large JPEG) grows the
+    ring rather than being dropped.
+    """
+
+    def __init__(self, cam, directory=VIDEO_DIR):
+        self.cam = cam
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._proc = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._shm = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.started = None
+        self.options = {}
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.ring_resizes = 0
+        self._slot_bytes = 0
+        self._written = None
+        self._encode_ms = None
+
+    @property
+    def recording(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def start(self, segment_seconds=SEGMENT_SECONDS, max_total_mb=MAX_TOTAL_MB,
+              quality=None) -> dict:
+        """Start recording (blocking for the worker's start-up); no-op if already on."""
+        with self._lock:
+            if self._proc is not None:
+                return self.stats()
+            self._reset_stats()
+            quality = int(quality or self.cam.quality)
+            self.options = {"segment_seconds": segment_seconds, "max_total_mb": max_total_mb,
+                            "quality": quality, "directory": str(self.directory)}
+            max_total_bytes = int(max_total_mb * 1024 * 1024)
+            self._retired = []
+            self._new_ring(self._frame_bytes())
+            ctx = mp.get_context("spawn")  # no fork of a process full of threads
+            self._work = ctx.Queue()
+            self._free = ctx.Queue()
+            for i in range(QUEUE_SLOTS):
+                self._free.put(i)
+            self._written = ctx.Value("q", 0)
+            self._encode_ms = ctx.Value("d", 0.0)
+            self._proc = ctx.Process(
+                target=_worker, daemon=True, name="video-recorder",
+                args=(self._shm.name, self._slot_bytes, self._work, self._free,
+                      str(self.directory), segment_seconds, max_total_bytes,
+                      quality, self._written, self._encode_ms))
+            self._proc.start()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._feed, daemon=True)
+            self._thread.start()
+            self.started = time.time()
+            return self.stats()
+
+    def _frame_bytes(self) -> int:
+        """Slot size: the real capture size, which V4L2 may not have taken from us."""
+        handle = self.cam.acquire_frame()
+        if handle is not None:
+            with handle:
+                if handle.jpeg is None:
+                    return handle.image.nbytes
+        return self.cam.width * self.cam.height * 3  # room for any sane MJPEG frame too
+
+    def _new_ring(self, slot_bytes):
+        """(Re)create the slot ring. The old one is unlinked at stop(), as the
+        worker may not have attached to it yet."""
+        if self._shm is not None:
+            del self._slots
+            self._shm.close()
+            self._retired.append(self._shm)
+        self._slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=QUEUE_SLOTS * slot_bytes)
+        self._slots = np.ndarray((QUEUE_SLOTS, slot_bytes), dtype=np.uint8,
+                                 buffer=self._shm.buf)
+
+    def _feed(self):
+        seen = self.cam.frame_seq
+        while not self._stop.is_set():
+            seq = self.cam.wait_frame(seen, CAPTURE_WAIT)
+            if seq == seen:
+                continue
+            handle = self.cam.acquire_frame()
+            if handle is None:
+                continue
+            with handle:
+                seen = handle.seq
+                t_wall = time.time() - (time.monotonic() - handle.t_capture)
+                try:
+                    idx = self._free.get_nowait()
+                except queue.Empty:
+                    self.frames_dropped += 1  # encoder behind: drop, don't queue
+                    continue
+                if handle.jpeg is not None:
+                    data, kind, shape = self.cam.camera_jpeg(handle), KIND_JPEG, None
+                    data = np.frombuffer(data, dtype=np.uint8)
+                else:
+                    image = handle.image
+                    data, kind, shape = image.reshape(-1), KIND_RAW, image.shape
+                if data.size > self._slot_bytes:
+                    # JPEG sizes vary: leave headroom so the next one fits too
+                    self._new_ring(data.size if kind == KIND_RAW else data.size * 3 // 2)
+                    self._work.put(("ring", self._shm.name, self._slot_bytes))
+                    self.ring_resizes += 1
+                self._slots[idx, :data.size] = data
+            self._work.put((idx, kind, shape, data.size, t_wall))
+            self.frames_queued += 1
+
+    def stop(self) -> dict:
+        """Stop recording, letting the worker finish what is queued."""
+        with self._lock:
+            if self._proc is None:
+                return self.stats()
+            self._stop.set()
+            self._thread.join(timeout=STOP_TIMEOUT)
+            self._work.put(None)
+            self._proc.join(timeout=STOP_TIMEOUT)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join()
+            stats = self.stats()
+            self._proc = None
+            del self._slots
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            for shm in self._retired:
+                shm.unlink()
+            return stats
+
+    def segments(self) -> list[dict]:
+        return list_segments(self.directory)
+
+    def stats(self) -> dict:
+        written = self._written.value if self._written is not None else 0
+        encode_ms = self._encode_ms.value if self._encode_ms is not None else 0.0
+        return {
+            "recording": self.recording,
+            "started": self.started,
+            **self.options,
+            "frames_queued": self.frames_queued,
+            "frames_written": written,
+            "frames_dropped": self.frames_dropped,
+            "slot_bytes": self._slot_bytes,
+            "ring_resizes": self.ring_resizes,
+            "encode_ms_avg": round(encode_ms / written, 2) if written else 0.0,
+        }
@@ -0,0 +1,39 @@
+"""Server-side vision: detector stages run once per camera, shared by every consumer."""
+
+from .colortable import ColorTable, calibrate
+from .detectors import (
+    COLOR_RANGES,
+    DEFAULT_STAGES,
+    ColorBlobs,
+    ColorClasses,
+    Detection,
+    Largest,
+    TrackedBlobs,
+    build_stages,
+    detect_red_box,
+    draw_detections,
+    red_box_tracker,
+    run_stages,
+)
+from .dnn import DnnPipeline
+from .pipeline import VisionPipeline, VisionResult
+
+__all__ = [
+    "COLOR_RANGES",
+    "DEFAULT_STAGES",
+    "ColorBlobs",
+    "ColorClasses",
+    "ColorTable",
+    "Detection",
+    "DnnPipeline",
+    "Largest",
+    "TrackedBlobs",
+    "VisionPipeline",
+    "VisionResult",
+    "build_stages",
+    "calibrate",
+    "detect_red_box",
+    "draw_detections",
+    "red_box_tracker",
+    "run_stages",
+]
@@ -0,0 +1,101 @@
+"""ColorTable — HSV pixel → colour class id through per-channel lookup tables, one pass a frame."""
+
+import cv2
+import numpy as np
+
+MAX_BOXES = 8  # HSV boxes over all classes: one bit each of a uint8 (red alone needs two)
+CALIBRATE_PERCENTILES = (2, 98)  # sample spread kept per HSV channel, outliers dropped
+CALIBRATE_MARGIN = (4, 20, 20)  # widening of the calibrated H, S, V ranges
+
+
+class ColorTable:
+    """Labels every pixel of a BGR frame with a colour class.
+
+    ``classes`` maps names to inclusive HSV (lower, upper) ranges in the
+    COLOR_RANGES format, several per class OR-ed together (red wraps).
+    Each range (a box in HSV) gets one bit. At build time three 256-entry
+    tables record, per channel value, the bits of every box whose range
+    admits it; a fourth maps a bit set to the id of the first class with a
+    bit in it. labels() is then one cvtColor, one LUT per channel, two ANDs
+    and a final LUT, however many classes there are — where a mask per
+    range costs a full inRange each. The result is a uint8 image of ids
+    (1-based, in ``classes`` order; 0 is none).
+
+    Hue/saturation/value are each looked up at full 8-bit resolution, so
+    labels match cv2.inRange on the same ranges exactly.
+    """
+
+    def __init__(self, classes):
+        if not classes:
+            raise ValueError("need at least one colour class")
+        self.classes = {name: tuple((tuple(lo), tuple(hi)) for lo, hi in ranges)
+                        for name, ranges in classes.items()}
+        self.names = list(self.classes)
+        boxes = [(class_id, lo, hi) for class_id, ranges in enumerate(self.classes.values(), 1)
+                 for lo, hi in ranges]
+        if len(boxes) > MAX_BOXES:
+            raise ValueError(f"at most {MAX_BOXES} HSV ranges over all colour classes")
+        values = np.arange(256)
+        self._channel_luts = []
+        for ch in range(3):
+            lut = np.zeros(256, np.uint8)
+            for bit, (_, lo, hi) in enumerate(boxes):
+                lut[(values >= lo[ch]) & (values <= hi[ch])] |= 1 << bit
+            self._channel_luts.append(lut)
+        self._id_lut = np.zeros(256, np.uint8)
+        # Highest bit first, so lower bits (earlier classes) overwrite: first class wins
+        for bit in reversed(range(len(boxes))):
+            self._id_lut[(values >> bit) & 1 == 1] = boxes[bit][0]
+
+    def labels(self, frame):
+        """uint8 class-id image, same size as the BGR ``frame``."""
+        h, s, v = cv2.split(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV))
+        bits = cv2.LUT(h, self._channel_luts[0])
+        bits = cv2.bitwise_and(bits, cv2.LUT(s, self._channel_luts[1]))
+        bits = cv2.bitwise_and(bits, cv2.LUT(v, self._channel_luts[2]))
+        return cv2.LUT(bits, self._id_lut)
+
+    def class_id(self, name) -> int:
+        return self.names.index(name) + 1
+
+
+def calibrate(frame, regions, percentiles=CALIBRATE_PERCENTILES,
+              margin=CALIBRATE_MARGIN) -> dict:
+    """HSV ranges for named colours, measured from sample regions of a BGR frame.
+
+    ``regions`` maps names to (x, y, w, h) boxes lying inside an object of
+    that colour. Each range spans the given percentiles of the region's
+    hue, saturation and value, widened by ``margin``. A hue spread across
+    the 180/0 wrap comes back as two ranges, like COLOR_RANGES["red"]. The
+    result feeds ColorTable (or a "colors" stage) directly.
+    """
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    height, width = hsv.shape[:2]
+    out = {}
+    for name, (x, y, w, h) in regions.items():
+        x0, y0 = max(int(x), 0), max(int(y), 0)
+        x1, y1 = min(int(x + w), width), min(int(y + h), height)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"region for {name!r} is empty or outside the frame")
+        px = hsv[y0:y1, x0:x1].reshape(-1, 3).astype(np.int32)
+        s_lo, s_hi = np.percentile(px[:, 1], percentiles)
+        v_lo, v_hi = np.percentile(px[:, 2], percentiles)
+        s_lo, s_hi = max(int(s_lo) - margin[1], 0), min(int(s_hi) + margin[1], 255)
+        v_lo, v_hi = max(int(v_lo) - margin[2], 0), min(int(v_hi) + margin[2], 255)
+        # Measure hue rotated half a turn too; if that spread is narrower the
+        # samples straddle the wrap (reds) and the range must be split
+        hue = px[:, 0]
+        lo, hi = np.percentile(hue, percentiles)
+        rlo, rhi = np.percentile((hue + 90) % 180, percentiles)
+        if rhi - rlo < hi - lo:
+            lo, hi = int(rlo) - 90 - margin[0], int(rhi) - 90 + margin[0]
+        else:
+            lo, hi = int(lo) - margin[0], int(hi) + margin[0]
+        if lo < 0:
+            hues = [(0, hi), (180 + lo, 180)]
+        elif hi > 180:
+            hues = [(0, hi - 180), (lo, 180)]
+        else:
+            hues = [(lo, hi)]
+        out[name] = [[[h_lo, s_lo, v_lo], [h_hi, s_hi, v_hi]] for h_lo, h_hi in hues]
+    return out
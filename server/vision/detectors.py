@@ -0,0 +1,389 @@
+"""Detector stages — composable steps that turn a BGR frame into Detections."""
+
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from .colortable import ColorTable
+
+# OpenCV hue runs 0-180, so red wraps around and needs two ranges
+COLOR_RANGES = {
+    "red": (((0, 100, 100), (10, 255, 255)), ((160, 100, 100), (180, 255, 255))),
+    "green": (((40, 80, 60), (85, 255, 255)),),
+    "blue": (((95, 100, 60), (130, 255, 255)),),
+    "yellow": (((20, 100, 100), (35, 255, 255)),),
+}
+DEFAULT_MIN_AREA = 500  # px²; smaller blobs are noise
+BOX_MIN_AREA = 2000  # the tap tasks only trust a box this big
+DEFAULT_MORPH = 5  # close/open kernel size; 0 skips the morphology
+TRACK_PAD = 0.25  # ROI margin per side, as a fraction of the target's larger side
+TRACK_MIN_PAD = 16  # px; keeps the morphology at the ROI edge away from the target
+TRACK_FULL_EVERY = 30  # tracked passes between full-frame searches
+RED_BOX_SCALE = 0.5  # detect_red_box: candidates at half size, centroids at full size
+COARSE_AREA = 0.5  # coarse candidates need this share of min_area (scaled), so none slip
+COARSE_PAD = 4  # coarse px added around a candidate before its full-resolution re-check
+
+
+class Detection(NamedTuple):
+    label: str
+    center: tuple  # (x, y) pixels, blob centroid
+    bbox: tuple  # (x, y, w, h) pixels
+    area: float  # px²
+    score: float = 1.0
+
+    def to_dict(self) -> dict:
+        return {"label": self.label, "center": list(self.center), "bbox": list(self.bbox),
+                "area": round(self.area, 1), "score": round(self.score, 3)}
+
+
+def _blobs(mask, label, min_area, offset=(0, 0)) -> list:
+    """One Detection per external contour of ``mask`` over ``min_area``, unsorted."""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                   offset=offset)
+    found = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area <= min_area:
+            continue
+        m = cv2.moments(contour)
+        if m["m00"] <= 0:
+            continue
+        center = (int(m["m10"] / m["m00"]), int(m["m01"] / m["m00"]))
+        found.append(Detection(label, center, tuple(cv2.boundingRect(contour)), area))
+    return found
+
+
+def _touches_edge(bbox, roi, shape):
+    """Whether ``bbox`` reaches a side of ``roi`` that is not also the frame edge."""
+    x, y, w, h = bbox
+    x0, y0, x1, y1 = roi
+    return ((x <= x0 and x0 > 0) or (y <= y0 and y0 > 0)
+            or (x + w >= x1 and x1 < shape[1]) or (y + h >= y1 and y1 < shape[0]))
+
+
+class ColorBlobs:
+    """HSV threshold → optional close/open → one Detection per external contour.
+
+    ``ranges`` are inclusive (lower, upper) HSV triples, OR-ed together;
+    ``color`` picks a preset from COLOR_RANGES. Detections come out
+    largest first, appended to whatever earlier stages found.
+
+    With ``scale`` < 1 the search is coarse-to-fine: candidates come from
+    a frame shrunk by ``scale``, then each is segmented again in a
+    full-resolution patch around it, so centroids, boxes and areas are the
+    full-resolution ones. A blob that runs into the edge of its patch
+    falls back to the plain full-frame pass.
+    """
+
+    kind = "color"
+
+    def __init__(self, color="red", ranges=None, min_area=DEFAULT_MIN_AREA,
+                 morph=DEFAULT_MORPH, label=None, scale=1.0):
+        if not 0 < scale <= 1:
+            raise ValueError("scale must be in (0, 1]")
+        if ranges is None:
+            if color not in COLOR_RANGES:
+                raise ValueError(f"unknown color {color!r}; choose from {sorted(COLOR_RANGES)}"
+                                 " or give ranges")
+            ranges = COLOR_RANGES[color]
+        self.color = color
+        self.ranges = tuple((tuple(lo), tuple(hi)) for lo, hi in ranges)
+        self.min_area = min_area
+        self.morph = morph
+        self.label = label or color
+        self.scale = scale
+        self._kernel = np.ones((morph, morph), np.uint8) if morph else None
+        coarse_morph = max(int(morph * scale) | 1, 1) if morph else 0
+        self._coarse_kernel = np.ones((coarse_morph, coarse_morph), np.uint8) if morph else None
+
+    def mask(self, frame, kernel=None):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        mask = None
+        for lo, hi in self.ranges:
+            part = cv2.inRange(hsv, np.array(lo), np.array(hi))
+            mask = part if mask is None else cv2.bitwise_or(mask, part)
+        kernel = self._kernel if kernel is None else kernel
+        if kernel is not None:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        return mask
+
+    def find(self, image, offset=(0, 0), pyramid=True) -> list:
+        """Blobs in ``image`` (a frame or a crop of one), largest first.
+
+        ``offset`` is the crop's top-left corner in the frame; centres and
+        boxes are shifted by it so they are always in frame coordinates.
+        ``pyramid=False`` skips the coarse pass even when scale < 1.
+        """
+        found = self._coarse_to_fine(image, offset) if pyramid and self.scale < 1 else None
+        if found is None:
+            found = _blobs(self.mask(image), self.label, self.min_area, offset)
+        found.sort(key=lambda d: d.area, reverse=True)
+        return found
+
+    def _coarse_to_fine(self, image, offset):
+        """Full-resolution blobs around coarse candidates; None if a patch cut one off."""
+        small = cv2.resize(image, None, fx=self.scale, fy=self.scale,
+                           interpolation=cv2.INTER_LINEAR)
+        candidates = _blobs(self.mask(small, self._coarse_kernel), self.label,
+                            self.min_area * self.scale ** 2 * COARSE_AREA)
+        height, width = image.shape[:2]
+        pad = int(COARSE_PAD / self.scale) + self.morph
+        found, seen = [], set()
+        for c in candidates:
+            x, y, w, h = c.bbox
+            x0, y0 = max(int(x / self.scale) - pad, 0), max(int(y / self.scale) - pad, 0)
+            x1 = min(int((x + w) / self.scale) + pad, width)
+            y1 = min(int((y + h) / self.scale) + pad, height)
+            patch = image[y0:y1, x0:x1]
+            for d in _blobs(self.mask(patch), self.label, self.min_area,
+                            (offset[0] + x0, offset[1] + y0)):
+                bx, by, bw, bh = d.bbox
+                if _touches_edge((bx - offset[0], by - offset[1], bw, bh),
+                                 (x0, y0, x1, y1), image.shape):
+                    return None
+                if d.bbox not in seen:  # neighbouring candidates can share a blob
+                    seen.add(d.bbox)
+                    found.append(d)
+        return found
+
+    def __call__(self, frame, detections):
+        return detections + self.find(frame)
+
+    def config(self) -> dict:
+        return {"type": self.kind, "color": self.color, "ranges": [list(r) for r in self.ranges],
+                "min_area": self.min_area, "morph": self.morph, "label": self.label,
+                "scale": self.scale}
+
+
+class Largest:
+    """Keep only the ``n`` largest detections of each label."""
+
+    kind = "largest"
+
+    def __init__(self, n=1):
+        self.n = n
+
+    def __call__(self, frame, detections):
+        kept, per_label = [], {}
+        for d in sorted(detections, key=lambda d: d.area, reverse=True):
+            if per_label.get(d.label, 0) < self.n:
+                per_label[d.label] = per_label.get(d.label, 0) + 1
+                kept.append(d)
+        return kept
+
+    def config(self) -> dict:
+        return {"type": self.kind, "n": self.n}
+
+
+class TrackedBlobs(ColorBlobs):
+    """ColorBlobs that, once it has a target, only searches around it.
+
+    After a hit the next pass segments just a region of interest: the
+    target's box shifted by its last per-pass motion, padded by ``pad`` of
+    its size plus that motion on each side. A full-frame search runs
+    instead when there is no target, when the ROI comes up empty, when the
+    best blob in it touches the ROI edge (it may continue outside), and
+    every ``full_every`` passes so a new or bigger blob elsewhere is not
+    missed for long. Tracked passes only report the blob being tracked.
+
+    State lives in the stage, so one instance follows one stream of frames.
+    """
+
+    kind = "track"
+
+    def __init__(self, color="red", ranges=None, min_area=DEFAULT_MIN_AREA,
+                 morph=DEFAULT_MORPH, label=None, scale=1.0, pad=TRACK_PAD,
+                 full_every=TRACK_FULL_EVERY):
+        super().__init__(color, ranges, min_area, morph, label, scale)
+        if pad < 0 or full_every < 1:
+            raise ValueError("pad must be >= 0 and full_every >= 1")
+        self.pad = pad
+        self.full_every = full_every
+        self.reset()
+
+    def reset(self):
+        """Forget the target; the next pass searches the whole frame."""
+        self._target = None
+        self._motion = (0, 0)
+        self._since_full = 0
+        self.roi_passes = 0
+        self.full_passes = 0
+        self.roi_pixels = 0
+        self.full_pixels = 0
+
+    def roi(self, shape):
+        """(x0, y0, x1, y1) to search next, clipped to a frame of ``shape``; None if untracked."""
+        if self._target is None:
+            return None
+        x, y, w, h = self._target.bbox
+        dx, dy = self._motion
+        margin = max(TRACK_MIN_PAD, int(self.pad * max(w, h)))
+        mx, my = margin + abs(dx), margin + abs(dy)
+        x, y = x + dx, y + dy
+        return (max(x - mx, 0), max(y - my, 0),
+                min(x + w + mx, shape[1]), min(y + h + my, shape[0]))
+
+    def __call__(self, frame, detections):
+        found = None
+        roi = self.roi(frame.shape) if self._since_full < self.full_every else None
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            if x1 > x0 and y1 > y0:
+                found = self.find(frame[y0:y1, x0:x1], (x0, y0), pyramid=False)[:1]
+                self.roi_passes += 1
+                self.roi_pixels += (x1 - x0) * (y1 - y0)
+                if not found or _touches_edge(found[0].bbox, roi, frame.shape):
+                    found = None
+        if found is None:
+            found = self.find(frame)
+            self.full_passes += 1
+            self.full_pixels += frame.shape[0] * frame.shape[1]
+            self._since_full = 0
+        else:
+            self._since_full += 1
+        self._follow(found[0] if found else None)
+        return detections + found
+
+    def _follow(self, target):
+        if target is not None and self._target is not None:
+            self._motion = (target.bbox[0] - self._target.bbox[0],
+                            target.bbox[1] - self._target.bbox[1])
+        else:
+            self._motion = (0, 0)
+        self._target = target
+
+    def config(self) -> dict:
+        return {**super().config(), "pad": self.pad, "full_every": self.full_every}
+
+    def stats(self) -> dict:
+        passes = self.roi_passes + self.full_passes
+        return {
+            "label": self.label,
+            "target": list(self._target.bbox) if self._target is not None else None,
+            "roi_passes": self.roi_passes,
+            "full_passes": self.full_passes,
+            # px² actually segmented per pass, ROI and full-frame passes together
+            "pixels_per_pass": round((self.roi_pixels + self.full_pixels) / passes) if passes else 0,
+        }
+
+
+class ColorClasses:
+    """Several colours in one pass: ColorTable label image → per-colour mask → contours.
+
+    ``colors`` is a list of COLOR_RANGES presets, or a dict of name → HSV
+    ranges (e.g. from colortable.calibrate()). One lookup labels the frame
+    for every colour; each colour's mask is then compared out of it and
+    closed/opened on its own, as ColorBlobs does, so neighbouring colours
+    never bleed into each other. Colours absent from the frame skip the
+    morphology. Detections come out largest first, whatever their colour.
+    """
+
+    kind = "colors"
+
+    def __init__(self, colors=("red", "green", "blue"), min_area=DEFAULT_MIN_AREA,
+                 morph=DEFAULT_MORPH):
+        if not isinstance(colors, dict):
+            unknown = [c for c in colors if c not in COLOR_RANGES]
+            if unknown:
+                raise ValueError(f"unknown colors {unknown}; choose from {sorted(COLOR_RANGES)}"
+                                 " or give a name → ranges dict")
+            colors = {c: COLOR_RANGES[c] for c in colors}
+        self.table = ColorTable(colors)
+        self.min_area = min_area
+        self.morph = morph
+        self._kernel = np.ones((morph, morph), np.uint8) if morph else None
+
+    def masks(self, frame) -> dict:
+        """name → binary mask of that colour, smoothed like ColorBlobs.mask."""
+        labels = self.table.labels(frame)
+        masks = {}
+        for class_id, name in enumerate(self.table.names, 1):
+            mask = cv2.compare(labels, class_id, cv2.CMP_EQ)
+            if self._kernel is not None and cv2.countNonZero(mask):
+                mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self._kernel)
+                mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+            masks[name] = mask
+        return masks
+
+    def __call__(self, frame, detections):
+        found = []
+        for name, mask in self.masks(frame).items():
+            found += _blobs(mask, name, self.min_area)
+        found.sort(key=lambda d: d.area, reverse=True)
+        return detections + found
+
+    def config(self) -> dict:
+        return {"type": self.kind,
+                "colors": {name: [list(r) for r in ranges]
+                           for name, ranges in self.table.classes.items()},
+                "min_area": self.min_area, "morph": self.morph}
+
+
+STAGE_TYPES = {cls.kind: cls for cls in (ColorBlobs, TrackedBlobs, ColorClasses, Largest)}
+
+# What the red-box tap tasks looked for: one red blob of at least BOX_MIN_AREA,
+# tracked so a box that stays put costs an ROI per frame, not the whole frame
+DEFAULT_STAGES = (
+    {"type": "track", "color": "red", "min_area": BOX_MIN_AREA, "scale": RED_BOX_SCALE},
+    {"type": "largest", "n": 1},
+)
+
+
+def build_stages(specs) -> list:
+    """Stage objects from ``[{"type": "color", ...}, ...]``; ValueError on a bad spec."""
+    stages = []
+    for spec in specs:
+        spec = dict(spec)
+        kind = spec.pop("type", None)
+        if kind not in STAGE_TYPES:
+            raise ValueError(f"unknown stage type {kind!r}; choose from {sorted(STAGE_TYPES)}")
+        try:
+            stages.append(STAGE_TYPES[kind](**spec))
+        except TypeError as e:
+            raise ValueError(f"bad options for {kind!r} stage: {e}") from None
+    return stages
+
+
+def run_stages(stages, frame) -> list:
+    detections = []
+    for stage in stages:
+        detections = stage(frame, detections)
+    return detections
+
+
+_red_boxes = {}  # scale → ColorBlobs, for detect_red_box()
+
+
+def red_box_tracker(scale=RED_BOX_SCALE) -> TrackedBlobs:
+    """A TrackedBlobs for detect_red_box(); keep one per stream of frames."""
+    return TrackedBlobs("red", min_area=BOX_MIN_AREA, scale=scale)
+
+
+def detect_red_box(frame, tracker=None, scale=RED_BOX_SCALE):
+    """The largest red blob over BOX_MIN_AREA as a Detection, else None.
+
+    The one-call form of DEFAULT_STAGES for scripts that run their own loop.
+    With a ``tracker`` from red_box_tracker() consecutive frames only search
+    around the last hit; without one every call searches the whole frame,
+    coarse-to-fine at ``scale`` (1 for a single full-resolution pass).
+    """
+    if tracker is None:
+        tracker = _red_boxes.get(scale)
+        if tracker is None:
+            tracker = _red_boxes[scale] = ColorBlobs("red", min_area=BOX_MIN_AREA, scale=scale)
+    found = tracker(frame, [])
+    return found[0] if found else None
+
+
+def draw_detections(frame, detections, color=(0, 255, 0)):
+    """Box, centre dot and label for each detection, drawn into ``frame``."""
+    for d in detections:
+        x, y, w, h = d.bbox
+        cx, cy = d.center
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        cv2.circle(frame, (cx, cy), 6, (0, 0, 255), -1)
+        cv2.putText(frame, f"{d.label} ({cx},{cy})", (x, max(y - 10, 15)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
@@ -0,0 +1,392 @@
+"""DnnPipeline — an OpenCV-DNN object detector (ONNX and friends) run in a worker process."""
+
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from ..latency import PipelineTimings
+from .detectors import Detection
+from .pipeline import DEFAULT_FPS, VisionPipeline
+
+DEFAULT_INPUT = 320  # px, square network input
+DEFAULT_MIN_SCORE = 0.5
+NMS_IOU = 0.45
+MAX_BATCH = 4  # frames per forward pass, once the worker has fallen behind
+QUEUE_SLOTS = 2 * MAX_BATCH  # resized frames waiting for the worker; beyond that new ones drop
+START_TIMEOUT = 60.0  # seconds for the worker to load the model
+STOP_TIMEOUT = 5.0
+RESTART_DELAY = 5.0  # seconds between attempts to bring back a worker that died
+
+# YOLO / Ultralytics order of the 80 COCO classes
+COCO_LABELS = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat",
+    "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack",
+    "umbrella", "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball",
+    "kite", "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket",
+    "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
+    "couch", "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse",
+    "remote", "keyboard", "cell phone", "microwave", "oven", "toaster", "sink",
+    "refrigerator", "book", "clock", "vase", "scissors", "teddy bear", "hair drier",
+    "toothbrush",
+)
+
+# SSD / TF Object Detection API exports number the same classes 1..90 with
+# gaps (ids COCO dropped) and 0 for background
+_COCO91_GAPS = (12, 26, 29, 30, 45, 66, 68, 69, 71, 83)
+_COCO91 = dict(zip((i for i in range(1, 91) if i not in _COCO91_GAPS), COCO_LABELS))
+COCO91_LABELS = ("background",) + tuple(_COCO91.get(i, str(i)) for i in range(1, 91))
+
+# Default label map per output format, used when no labels file is given
+DEFAULT_LABELS = {"ssd": COCO91_LABELS, "yolo": COCO_LABELS}
+
+TIMED = (
+    "inference",        # one forward pass (a whole batch)
+    "per_frame",        # forward pass divided by the frames in it
+    "capture_to_result",  # capture → detections published
+)
+
+
+def _decode(output, n, input_size, min_score):
+    """Output format ("ssd"/"yolo"), per image [(class_id, score, (x0, y0, x1, y1) in 0-1)].
+
+    SSD-style DetectionOutput is [1, 1, rows, 7] of (image, class, score,
+    box in 0-1), class ids 1-based. YOLOv8-style is [n, 4 + classes,
+    anchors] (either way round) with (cx, cy, w, h) in input pixels, no
+    objectness column and 0-based class ids.
+    """
+    if output.ndim == 4 and output.shape[-1] == 7:
+        per = [[] for _ in range(n)]
+        for img, cls, score, x0, y0, x1, y1 in output.reshape(-1, 7):
+            if score >= min_score and 0 <= int(img) < n:
+                per[int(img)].append((int(cls), float(score), (x0, y0, x1, y1)))
+        return "ssd", per
+    per = []
+    for pred in output.reshape(n, *output.shape[-2:]):
+        if pred.shape[0] < pred.shape[1]:
+            pred = pred.T  # → anchors × (4 + classes)
+        classes = pred[:, 4:].argmax(1)
+        scores = pred[np.arange(len(pred)), 4 + classes]
+        keep = scores >= min_score
+        pred, classes, scores = pred[keep], classes[keep], scores[keep]
+        boxes = np.column_stack([pred[:, 0] - pred[:, 2] / 2, pred[:, 1] - pred[:, 3] / 2,
+                                 pred[:, 2], pred[:, 3]])
+        found = []
+        for i in np.array(cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), min_score,
+                                           NMS_IOU)).reshape(-1):
+            x, y, w, h = boxes[i] / input_size
+            found.append((int(classes[i]), float(scores[i]), (x, y, x + w, y + h)))
+        per.append(found)
+    return "yolo", per
+
+
+def _worker(shm_name, input_size, work, free, results, model, config):
+    """Worker process: load the net, then run queued frames, batched, until a None item."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((QUEUE_SLOTS, input_size, input_size, 3), dtype=np.uint8,
+                       buffer=shm.buf)
+    try:
+        try:
+            net = cv2.dnn.readNet(model, config or "")
+        except cv2.error as e:
+            results.put(("error", f"cannot load {model}: {e}"))
+            return
+        results.put(("ready", None))
+        batching = True  # until the model turns out to have a fixed batch of 1
+        stop = False
+        while not stop:
+            item = work.get()
+            if item is None:
+                break
+            batch = [item]
+            # Behind? Take everything that queued up meanwhile in the same pass
+            while len(batch) < MAX_BATCH:
+                try:
+                    item = work.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            images = [slots[idx] for idx, *_ in batch]
+            min_score = min(b[-1] for b in batch)
+            t0 = time.monotonic()
+            per = None
+            try:
+                if batching and len(images) > 1:
+                    try:
+                        net.setInput(cv2.dnn.blobFromImages(images, 1 / 255.0, swapRB=True))
+                        fmt, per = _decode(net.forward(), len(images), input_size, min_score)
+                    except cv2.error:
+                        batching = False
+                if per is None:
+                    per = []
+                    for image in images:
+                        net.setInput(cv2.dnn.blobFromImage(image, 1 / 255.0, swapRB=True))
+                        fmt, found = _decode(net.forward(), 1, input_size, min_score)
+                        per += found
+            except cv2.error as e:
+                results.put(("error", str(e), None, None))
+                continue
+            finally:
+                for idx, *_ in batch:
+                    free.put(idx)
+            infer_ms = (time.monotonic() - t0) * 1000
+            results.put(("result", [(frame_seq, t_capture, size,
+                                     [d for d in found if d[1] >= score])
+                                    for (_, frame_seq, t_capture, size, score), found
+                                    in zip(batch, per)], infer_ms, fmt))
+    finally:
+        del slots
+        shm.close()
+
+
+class DnnPipeline(VisionPipeline):
+    """A VisionPipeline whose one stage is a neural-network detector in another process.
+
+    The model is any cv2.dnn.readNet() can load — an int8-quantised ONNX
+    SSD/YOLOv8 export suits a Pi — so inference takes neither the GIL of
+    the event loop nor the arm command thread. The feeder thread resizes
+    the next capture to the network input straight into a free slot of a
+    shared-memory ring, at most ``fps`` times a second. The worker takes
+    whatever has queued up (up to MAX_BATCH) in one forward pass, so when
+    it falls behind it batches instead of lagging; when every slot is
+    taken new frames are dropped and counted. Results go out through the
+    same latest() / wait_result() / listener interface, with inference
+    and capture-to-result latency histograms in stats().
+
+    Runs while ``enabled`` or while anyone hold()s it (one hold per stream
+    client). Once neither is true the worker exits and the model is
+    unloaded; a worker that dies is replaced, with a fresh ring, by the
+    feeder. Without ``labels`` (a file, one name per line) class ids are
+    named from COCO in the numbering of the model's output format.
+    """
+
+    def __init__(self, cam, model=None, config=None, labels=None,
+                 input_size=DEFAULT_INPUT, min_score=DEFAULT_MIN_SCORE, fps=DEFAULT_FPS,
+                 enabled=False):
+        self.model = model
+        self.model_config = config
+        self.labels = None
+        if labels:
+            with open(labels) as f:
+                self.labels = tuple(line.strip() for line in f if line.strip())
+        self.input_size = input_size
+        self.min_score = min_score
+        self.timings = PipelineTimings(TIMED)
+        self.frames_dropped = 0
+        self.batches = 0
+        self.frames_inferred = 0
+        self.restarts = 0
+        self.error = None
+        self._holds = 0
+        self._proc = None
+        self._retry_at = 0.0
+        self._start_lock = threading.Lock()  # worker start / stop / frame hand-off
+        super().__init__(cam, stages=(), fps=fps)
+        if enabled:
+            self.configure(enabled=True)
+
+    # --- Configuration ---
+
+    def configure(self, enabled=None, fps=None, min_score=None):
+        """Change enabled / fps / min_score; ValueError leaves everything as it was.
+
+        Enabling loads the model and disabling (with no holds) unloads it,
+        both blocking.
+        """
+        if min_score is not None and not 0 < min_score <= 1:
+            raise ValueError("min_score must be in (0, 1]")
+        if enabled:
+            self.start_worker()
+        if min_score is not None:
+            self.min_score = min_score
+        config = super().configure(enabled=enabled, fps=fps)
+        if enabled is False:
+            self._stop_if_idle()
+        return config
+
+    def config(self) -> dict:
+        with self._cond:
+            return {"enabled": self.enabled, "fps": self.fps, "model": self.model,
+                    "available": bool(self.model), "input_size": self.input_size,
+                    "min_score": self.min_score, "max_batch": MAX_BATCH}
+
+    def hold(self):
+        """Keep the detector running until the matching release(); never blocks.
+
+        Call start_worker() first to load the model and see load errors;
+        otherwise the feeder starts it.
+        """
+        with self._cond:
+            self._holds += 1
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._holds = max(self._holds - 1, 0)
+            idle = not self._wanted()
+        if idle:
+            # Joining the worker can take a while; not on the caller's thread
+            threading.Thread(target=self._stop_if_idle, daemon=True).start()
+
+    def _wanted(self):
+        """Caller holds _cond."""
+        return self._running and (self.enabled or self._holds > 0)
+
+    # --- Worker process ---
+
+    def start_worker(self):
+        """Start the worker and wait for it to load the model; no-op if running. ValueError."""
+        with self._start_lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._proc is not None and self._proc.is_alive():
+            return
+        if self._proc is not None:
+            # Died under us (crash, OOM kill): its slots are lost with it
+            self.error = f"detector worker exited with code {self._proc.exitcode}"
+            self.restarts += 1
+            self._stop_locked()
+        if not self.model:
+            raise ValueError("no detector model: set MECHARM_DNN_MODEL or --dnn-model")
+        size = self.input_size
+        shm = shared_memory.SharedMemory(create=True, size=QUEUE_SLOTS * size * size * 3)
+        ctx = mp.get_context("spawn")  # no fork of a process full of threads
+        work, free, results = ctx.Queue(), ctx.Queue(), ctx.Queue()
+        for i in range(QUEUE_SLOTS):
+            free.put(i)
+        proc = ctx.Process(target=_worker, daemon=True, name="dnn-detector",
+                           args=(shm.name, size, work, free, results, self.model,
+                                 self.model_config))
+        proc.start()
+        try:
+            kind, message = results.get(timeout=START_TIMEOUT)
+        except queue.Empty:
+            kind, message = "error", f"model did not load within {START_TIMEOUT:.0f} s"
+        if kind != "ready":
+            proc.terminate()
+            proc.join()
+            shm.close()
+            shm.unlink()
+            self.error = message
+            raise ValueError(message)
+        self.error = None
+        self._shm, self._work, self._free, self._results = shm, work, free, results
+        self._slots = np.ndarray((QUEUE_SLOTS, size, size, 3), dtype=np.uint8,
+                                 buffer=shm.buf)
+        self._collector = threading.Thread(target=self._collect, args=(results,),
+                                           daemon=True)
+        self._collector.start()
+        self._proc = proc
+
+    def _stop_locked(self):
+        """Stop the worker (if any) and free its ring. Caller holds _start_lock."""
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        if proc.is_alive():
+            self._work.put(None)
+            proc.join(timeout=STOP_TIMEOUT)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        self._results.put(None)
+        self._collector.join(timeout=STOP_TIMEOUT)
+        del self._slots
+        self._shm.close()
+        self._shm.unlink()
+
+    def _stop_if_idle(self):
+        with self._start_lock:
+            with self._cond:
+                if self._wanted():
+                    return
+            self._stop_locked()
+
+    def _active(self):
+        return self._wanted()
+
+    def _process(self, handle, frame, stages):
+        """Queue the frame for the worker (resized into a free slot); results come via _collect.
+
+        Starts the worker if it is not running (stopped while idle, or dead),
+        at most once per RESTART_DELAY.
+        """
+        with self._start_lock:
+            if self._proc is None or not self._proc.is_alive():
+                with self._cond:
+                    wanted = self._wanted()  # not if released while this frame was awaited
+                if not wanted or time.monotonic() < self._retry_at:
+                    return None
+                try:
+                    self._start_locked()
+                except ValueError:
+                    self._retry_at = time.monotonic() + RESTART_DELAY
+                    return None
+            try:
+                idx = self._free.get_nowait()
+            except queue.Empty:
+                self.frames_dropped += 1  # worker behind by a whole ring: drop, don't queue
+                return None
+            cv2.resize(frame, (self.input_size, self.input_size), dst=self._slots[idx],
+                       interpolation=cv2.INTER_AREA)
+            self._work.put((idx, handle.seq, handle.t_capture,
+                            (frame.shape[1], frame.shape[0]), self.min_score))
+        return None
+
+    def _collect(self, results):
+        while True:
+            msg = results.get()
+            if msg is None:
+                return
+            kind, items, infer_ms, fmt = msg
+            if kind == "error":
+                self.error = items
+                continue
+            labels = self.labels or DEFAULT_LABELS[fmt]
+            self.batches += 1
+            self.frames_inferred += len(items)
+            self.timings.record("inference", infer_ms)
+            for frame_seq, t_capture, (w, h), found in items:
+                self.timings.record("per_frame", infer_ms / len(items))
+                detections = []
+                for cls, score, (x0, y0, x1, y1) in found:
+                    x0, x1 = max(int(x0 * w), 0), min(int(x1 * w), w)
+                    y0, y1 = max(int(y0 * h), 0), min(int(y1 * h), h)
+                    label = labels[cls] if 0 <= cls < len(labels) else str(cls)
+                    detections.append(Detection(label, ((x0 + x1) // 2, (y0 + y1) // 2),
+                                                (x0, y0, x1 - x0, y1 - y0),
+                                                float((x1 - x0) * (y1 - y0)), score))
+                detections.sort(key=lambda d: d.score, reverse=True)
+                self.timings.record("capture_to_result", (time.monotonic() - t_capture) * 1000)
+                self._publish(frame_seq, t_capture, infer_ms, detections, (w, h))
+
+    # --- Readers ---
+
+    def stats(self) -> dict:
+        n = self.frames_inferred
+        return {
+            **super().stats(),
+            "worker": self._proc is not None and self._proc.is_alive(),
+            "holds": self._holds,
+            "frames_dropped": self.frames_dropped,
+            "batches": self.batches,
+            "batch_avg": round(n / self.batches, 2) if self.batches else 0.0,
+            "restarts": self.restarts,
+            "latency_ms": self.timings.snapshot(),
+            "error": self.error,
+        }
+
+    def shutdown(self):
+        super().shutdown()
+        with self._start_lock:
+            self._stop_locked()
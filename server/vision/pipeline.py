@@ -0,0 +1,206 @@
+"""VisionPipeline — one detector chain per camera, on its own thread and frame rate."""
+
+import threading
+import time
+from typing import NamedTuple
+
+from .colortable import calibrate
+from .detectors import DEFAULT_STAGES, build_stages, run_stages
+
+DEFAULT_FPS = 5.0
+MAX_FPS = 30.0
+CAPTURE_WAIT = 1.0  # seconds the worker waits for a capture before re-checking
+
+
+class VisionResult(NamedTuple):
+    seq: int  # bumped per published result
+    frame_seq: int  # camera frame the detections are for
+    t_capture: float  # epoch seconds the frame was captured
+    detect_ms: float  # time spent in the stages
+    latency_ms: float  # capture → result published
+    detections: list
+    size: tuple  # (width, height) of the analysed frame
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "frame_seq": self.frame_seq,
+            "t_capture": round(self.t_capture, 3),
+            "detect_ms": round(self.detect_ms, 2),
+            "latency_ms": round(self.latency_ms, 1),
+            "size": list(self.size),
+            "detections": [d.to_dict() for d in self.detections],
+        }
+
+
+class VisionPipeline:
+    """Runs a chain of detector stages over CameraManager frames.
+
+    The worker borrows the next captured frame (no copy; stages must not
+    write to it) at most ``fps`` times a second, runs the stages in order and
+    publishes a timestamped VisionResult. Frames captured while a pass is
+    running are skipped, never queued. Readers poll latest(), block in
+    wait_result(), or register a listener called on the worker thread.
+    """
+
+    def __init__(self, cam, stages=DEFAULT_STAGES, fps=DEFAULT_FPS, enabled=False):
+        self.cam = cam
+        self._stages = build_stages(stages)
+        self.fps = fps
+        self.enabled = enabled
+        self._result = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._listeners = []
+        self._running = True
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self._detect_ms_sum = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # --- Configuration ---
+
+    def configure(self, enabled=None, fps=None, stages=None):
+        """Change any of enabled / fps / stages; ValueError leaves everything as it was."""
+        new_stages = build_stages(stages) if stages is not None else None
+        if fps is not None and not 0 < fps <= MAX_FPS:
+            raise ValueError(f"fps must be in (0, {MAX_FPS}]")
+        with self._cond:
+            if new_stages is not None:
+                self._stages = new_stages
+            if fps is not None:
+                self.fps = fps
+            if enabled is not None:
+                if enabled and not self.enabled:
+                    # a tracked target is stale after a pause
+                    for stage in self._stages:
+                        if hasattr(stage, "reset"):
+                            stage.reset()
+                self.enabled = enabled
+                if not enabled:
+                    self._result = None
+            self._cond.notify_all()
+        return self.config()
+
+    def calibrate(self, regions) -> dict:
+        """HSV ranges for named colours from (x, y, w, h) boxes in the newest frame.
+
+        None if the camera has no frame; ValueError for a box off the frame.
+        """
+        handle = self.cam.acquire_frame()
+        if handle is None:
+            return None
+        with handle:
+            frame = handle.image
+            return calibrate(frame, regions) if frame is not None else None
+
+    def config(self) -> dict:
+        with self._cond:
+            return {"enabled": self.enabled, "fps": self.fps,
+                    "stages": [s.config() for s in self._stages]}
+
+    # --- Worker ---
+
+    def _run(self):
+        seen = 0
+        next_due = 0.0
+        while True:
+            with self._cond:
+                while self._running and not self._active():
+                    self._cond.wait()
+                if not self._running:
+                    return
+                stages, interval = self._stages, 1.0 / self.fps
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # Take the next capture rather than the current one: results are
+            # published no later, and describe a frame only detect_ms old
+            current = max(seen, self.cam.frame_seq)
+            if self.cam.wait_frame(current, CAPTURE_WAIT) == current:
+                continue
+            handle = self.cam.acquire_frame()
+            if handle is None:
+                continue
+            with handle:
+                if seen:
+                    self.frames_skipped += max(handle.seq - seen - 1, 0)
+                seen = handle.seq
+                next_due = time.monotonic() + interval
+                frame = handle.image
+                if frame is None:
+                    continue
+                result = self._process(handle, frame, stages)
+            if result is not None:
+                self._publish(*result)
+
+    def _active(self):
+        return self.enabled
+
+    def _process(self, handle, frame, stages):
+        """Run ``stages`` on a borrowed frame; the _publish() arguments, or None."""
+        t0 = time.monotonic()
+        detections = run_stages(stages, frame)
+        done = time.monotonic()
+        return (handle.seq, handle.t_capture, (done - t0) * 1000, detections,
+                (frame.shape[1], frame.shape[0]))
+
+    def _publish(self, frame_seq, t_capture, detect_ms, detections, size):
+        now = time.monotonic()
+        with self._cond:
+            if not self._active():
+                return
+            self._seq += 1
+            result = VisionResult(self._seq, frame_seq, time.time() - (now - t_capture),
+                                  detect_ms, (now - t_capture) * 1000, detections, size)
+            self._result = result
+            self.frames_processed += 1
+            self._detect_ms_sum += detect_ms
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for fn in listeners:
+            fn(result)
+
+    # --- Readers ---
+
+    def latest(self):
+        """The newest VisionResult, or None (nothing yet / disabled)."""
+        return self._result
+
+    def wait_result(self, after_seq=0, timeout=None):
+        """Block until a result newer than ``after_seq``; None on timeout or shutdown."""
+        with self._cond:
+            self._cond.wait_for(lambda: (self._result is not None
+                                         and self._result.seq != after_seq)
+                                or not self._running, timeout)
+            result = self._result
+        return result if result is not None and result.seq != after_seq else None
+
+    def add_listener(self, fn):
+        """Call ``fn(result)`` on the worker thread for every result; keep it quick."""
+        with self._cond:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        with self._cond:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            n = self.frames_processed
+            return {
+                "frames_processed": n,
+                "frames_skipped": self.frames_skipped,
+                "detect_ms_avg": round(self._detect_ms_sum / n, 2) if n else 0.0,
+                "result_seq": self._seq,
+                "stages": [stage.stats() for stage in self._stages
+                           if hasattr(stage, "stats")],
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2)